@@ -9,7 +9,8 @@ broker_url = 'redis://localhost:6379/0'
 # 结果后端配置
 result_backend = 'redis://localhost:6379/1'
 
-# 序列化配置
+# 序列化配置（技能 Worker 由环境变量 CELERY_TASK_SERIALIZATION 统一选择，如 msgpack+zstd 对应
+# task_serializer = 'msgpack'、result_serializer = 'msgpack+zstd'，需先调用 serialization.register_profiles()）
 task_serializer = 'json'
 result_serializer = 'json'
 accept_content = ['json']
@@ -31,7 +32,8 @@ task_acks_on_failure_or_timeout = True
 task_send_sent_event = True
 
 # 结果存储配置
-result_compression = 'gzip'
+# result_compression 对 Redis 结果后端不生效；需要压缩结果时使用序列化配置，
+# 如 CELERY_TASK_SERIALIZATION=msgpack+zstd（见 celery_tasks/serialization.py，Worker 与派发端须一致）
 result_extended = True
 
 # 任务执行配置
@@ -41,6 +43,20 @@ task_soft_time_limit = 3000  # 软限制（秒）
 # Worker 配置
 worker_prefetch_multiplier = 1
 
+# 队列与路由：按命令超时时间分到 fast / default / bulk 队列，
+# 短命令由专门的低延迟 Worker 消费，不会排在长任务后面
+task_default_queue = 'default'
+task_routes = ('celery_tasks.routing.route_task',)
+
+# 优先级（Redis Broker：0 最高，9 最低）
+# Worker 按 -Q 中的顺序消费队列（queue_order_strategy='priority'）
+task_default_priority = 5
+broker_transport_options = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+
 # 任务结果追踪
 task_track_started = True
 task_send_sent_event = True
@@ -0,0 +1,177 @@
+"""
+队列深度自动扩缩容
+Worker 把最近的任务耗时写入 Redis 列表，scripts/worker.py --autoscale 的监督循环
+定期读取队列积压（Broker 中的 LLEN）和最近耗时，估算需要的子进程数，
+再通过远程控制命令 pool_grow / pool_shrink 调整 prefork 池大小
+"""
+
+import os
+import sys
+import math
+import time
+
+from celery_tasks.redis_client import KEY_PREFIX, get_redis
+from celery_tasks.settings import BROKER_URL
+
+
+# 是否记录任务耗时（设为 0 关闭；--autoscale 估算积压时需要）
+DURATIONS_ENABLED = os.environ.get('CELERY_TASK_DURATIONS', '1').lower() not in ('0', 'false', 'no')
+
+# 最近任务耗时列表（最新的在前）
+DURATIONS_KEY = KEY_PREFIX + 'durations'
+
+# 保留的耗时记录条数
+DURATIONS_MAXLEN = 200
+
+# 估算平均耗时使用的最近记录条数
+DURATIONS_WINDOW = 50
+
+# 期望在多少秒内消化当前积压
+TARGET_DRAIN_SECONDS = 30
+
+# 队列持续为空多少秒后开始缩容
+SCALE_DOWN_DELAY = 60
+
+# Redis Broker 的优先级列表（见 settings.py 中的 broker_transport_options）
+PRIORITY_STEPS = range(10)
+PRIORITY_SEP = ':'
+
+
+def record_duration(pipe, duration):
+    """
+    记录一次任务耗时（写入 pipeline，由调用方 execute）
+
+    Args:
+        pipe: Redis pipeline
+        duration (float): 耗时（秒）
+    """
+    pipe.lpush(DURATIONS_KEY, round(duration, 3))
+    pipe.ltrim(DURATIONS_KEY, 0, DURATIONS_MAXLEN - 1)
+
+
+def recent_durations(count=DURATIONS_WINDOW, client=None):
+    """读取最近的任务耗时（秒）"""
+    client = client or get_redis()
+    return [float(v) for v in client.lrange(DURATIONS_KEY, 0, count - 1)]
+
+
+def queue_depth(queues, client=None):
+    """
+    统计 Broker 中等待执行的消息数（包含各优先级列表）
+
+    Args:
+        queues (list[str]): 队列名称
+        client (redis.Redis, optional): Broker 所在库的客户端
+
+    Returns:
+        int: 消息总数
+    """
+    client = client or get_redis(BROKER_URL)
+    with client.pipeline(transaction=False) as pipe:
+        for queue in queues:
+            for priority in PRIORITY_STEPS:
+                pipe.llen(f'{queue}{PRIORITY_SEP}{priority}' if priority else queue)
+        return sum(pipe.execute())
+
+
+def desired_processes(depth, durations, current, minimum, maximum,
+                      target_drain=TARGET_DRAIN_SECONDS):
+    """
+    估算需要的子进程数
+
+    积压消息按最近平均耗时折算为工作量，要求在 target_drain 秒内消化完；
+    有积压时不缩容，没有耗时记录时按每条消息 1 秒估算。
+
+    Args:
+        depth (int): 队列积压消息数
+        durations (list[float]): 最近任务耗时
+        current (int): 当前子进程数
+        minimum (int): 最小子进程数
+        maximum (int): 最大子进程数
+        target_drain (float): 期望消化积压的时间（秒）
+
+    Returns:
+        int: 目标子进程数
+    """
+    if depth <= 0:
+        return minimum
+
+    average = sum(durations) / len(durations) if durations else 1.0
+    wanted = math.ceil(depth * average / target_drain)
+    return max(minimum, min(maximum, max(wanted, current)))
+
+
+class Autoscaler:
+    """根据队列积压调整单个 Worker 节点的 prefork 池大小"""
+
+    def __init__(self, app, hostname, queues, minimum, maximum,
+                 target_drain=TARGET_DRAIN_SECONDS, scale_down_delay=SCALE_DOWN_DELAY):
+        """
+        初始化
+
+        Args:
+            app: Celery 应用（用于发送远程控制命令）
+            hostname (str): Worker 节点名称（如 celery@host）
+            queues (list[str]): Worker 消费的队列
+            minimum (int): 最小子进程数（Worker 以此并发数启动）
+            maximum (int): 最大子进程数
+            target_drain (float): 期望消化积压的时间（秒）
+            scale_down_delay (float): 队列持续为空多少秒后缩容
+        """
+        self.app = app
+        self.hostname = hostname
+        self.queues = list(queues)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_drain = target_drain
+        self.scale_down_delay = scale_down_delay
+        self.current = minimum
+        self._idle_since = None
+
+    def step(self):
+        """
+        执行一次扩缩容检查
+
+        Returns:
+            tuple: (队列积压, 调整后的子进程数)
+        """
+        depth = queue_depth(self.queues)
+        target = desired_processes(
+            depth, recent_durations(), self.current,
+            self.minimum, self.maximum, self.target_drain,
+        )
+
+        if target > self.current:
+            self._idle_since = None
+            self._resize(target - self.current, grow=True)
+        elif target < self.current:
+            # 队列空了一段时间才缩容，避免突发流量间隙反复抖动；每次只减少一个
+            now = time.monotonic()
+            if self._idle_since is None:
+                self._idle_since = now
+            elif now - self._idle_since >= self.scale_down_delay:
+                self._resize(1, grow=False)
+                self._idle_since = now
+        else:
+            self._idle_since = None
+
+        return depth, self.current
+
+    def _resize(self, n, grow):
+        """发送 pool_grow / pool_shrink 远程控制命令"""
+        command = self.app.control.pool_grow if grow else self.app.control.pool_shrink
+        try:
+            replies = command(n, destination=[self.hostname], reply=True, timeout=2)
+        except Exception as e:
+            print(f'[autoscale] Control error: {e}', file=sys.stderr)
+            return
+
+        for reply in replies or []:
+            outcome = reply.get(self.hostname) or {}
+            if 'ok' in outcome:
+                self.current += n if grow else -n
+                action = '扩容' if grow else '缩容'
+                print(f'[autoscale] {action}: {self.current} 个子进程', file=sys.stderr)
+            else:
+                # 例如所有子进程都在忙，无法缩容
+                print(f'[autoscale] {outcome.get("error", outcome)}', file=sys.stderr)
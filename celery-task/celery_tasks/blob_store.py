@@ -0,0 +1,179 @@
+"""
+输出 Blob 存储模块
+将超大的命令输出写入本地内容寻址存储（按 SHA-256 命名并压缩），
+任务结果中只保留引用和首尾预览，避免大结果占满 Redis 内存
+"""
+
+import os
+import hashlib
+import tempfile
+from pathlib import Path
+
+# zstd 压缩（可选依赖，未安装时回退到 gzip）
+try:
+    import zstandard
+    CODEC = 'zstd'
+except ImportError:
+    zstandard = None
+    CODEC = 'gzip'
+
+
+# Blob 存储目录
+BLOB_DIR = Path(__file__).parent.parent / 'data' / 'blobs'
+
+# 超过该大小（字节，UTF-8 编码后）的输出写入 Blob 存储
+BLOB_THRESHOLD = int(os.environ.get('CELERY_TASK_BLOB_THRESHOLD', 256 * 1024))
+
+# 结果中保留的预览长度（首尾各保留的字符数）
+PREVIEW_HEAD_CHARS = 2000
+PREVIEW_TAIL_CHARS = 2000
+
+# 流式写入时每次读取的字节数
+COPY_CHUNK_SIZE = 1024 * 1024
+
+_SUFFIX = {'zstd': '.zst', 'gzip': '.gz'}
+
+
+def blob_path(sha256, codec=CODEC):
+    """获取 Blob 文件路径（按哈希前两位分目录）"""
+    return BLOB_DIR / sha256[:2] / f'{sha256}{_SUFFIX[codec]}'
+
+
+def _open_writer(fileobj):
+    """打开压缩写入流"""
+    if CODEC == 'zstd':
+        return zstandard.ZstdCompressor(level=3).stream_writer(fileobj, closefd=False)
+    import gzip
+    return gzip.GzipFile(fileobj=fileobj, mode='wb', compresslevel=6)
+
+
+def _open_reader(fileobj, codec):
+    """打开解压读取流"""
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('读取 zstd Blob 需要安装 zstandard')
+        return zstandard.ZstdDecompressor().stream_reader(fileobj)
+    import gzip
+    return gzip.GzipFile(fileobj=fileobj, mode='rb')
+
+
+def put_stream(fileobj, encoding=None):
+    """
+    将二进制流写入 Blob 存储（边读边哈希边压缩，不整体载入内存）
+
+    Args:
+        fileobj: 可读的二进制文件对象
+        encoding (str, optional): 内容的文本编码，记录在引用中供 get_text 解码
+
+    Returns:
+        dict: Blob 引用 {'sha256', 'size', 'codec'[, 'encoding']}
+    """
+    BLOB_DIR.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_name = tempfile.mkstemp(dir=BLOB_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            writer = _open_writer(tmp)
+            while True:
+                chunk = fileobj.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                writer.write(chunk)
+            writer.close()
+
+        sha256 = digest.hexdigest()
+        path = blob_path(sha256)
+        if path.exists():
+            # 内容相同的 Blob 已存在，直接复用
+            os.unlink(tmp_name)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+    ref = {'sha256': sha256, 'size': size, 'codec': CODEC}
+    if encoding:
+        ref['encoding'] = encoding
+    return ref
+
+
+def put_bytes(data, encoding=None):
+    """将字节串写入 Blob 存储，返回 Blob 引用"""
+    import io
+    return put_stream(io.BytesIO(data), encoding)
+
+
+def get_bytes(ref):
+    """
+    读取 Blob 内容
+
+    Args:
+        ref (dict): put_stream/put_bytes 返回的 Blob 引用
+
+    Returns:
+        bytes: 原始内容
+
+    Raises:
+        FileNotFoundError: Blob 不存在（不在本机或已被清理）
+    """
+    path = blob_path(ref['sha256'], ref.get('codec', CODEC))
+    with open(path, 'rb') as f:
+        return _open_reader(f, ref.get('codec', CODEC)).read()
+
+
+def get_text(ref, encoding=None):
+    """读取 Blob 内容并解码为文本（默认使用引用中记录的编码）"""
+    encoding = encoding or ref.get('encoding', 'utf-8')
+    return get_bytes(ref).decode(encoding, errors='replace')
+
+
+def make_preview(head, tail, total_chars):
+    """
+    生成首尾预览文本
+
+    Args:
+        head (str): 输出开头部分
+        tail (str): 输出结尾部分
+        total_chars (int): 完整输出长度（字符）
+    """
+    omitted = total_chars - len(head) - len(tail)
+    if omitted <= 0:
+        return head + tail
+    return f'{head}\n\n... (省略 {omitted} 字符，完整输出见 Blob 存储) ...\n\n{tail}'
+
+
+def offload_text(text, encoding='utf-8', threshold=None):
+    """
+    超过阈值时将文本写入 Blob 存储
+
+    Args:
+        text (str): 完整输出
+        encoding (str): 写入编码
+        threshold (int, optional): 阈值（字节），默认 BLOB_THRESHOLD
+
+    Returns:
+        tuple: (结果中保留的文本, Blob 引用或 None)
+    """
+    threshold = BLOB_THRESHOLD if threshold is None else threshold
+    if not text or len(text) * 4 <= threshold:
+        # UTF-8 每字符最多 4 字节，可以不编码直接判断
+        return text, None
+
+    data = text.encode(encoding, errors='replace')
+    if len(data) <= threshold:
+        return text, None
+
+    ref = put_bytes(data, encoding)
+    preview = make_preview(
+        text[:PREVIEW_HEAD_CHARS],
+        text[-PREVIEW_TAIL_CHARS:],
+        len(text),
+    )
+    return preview, ref
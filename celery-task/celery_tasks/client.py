@@ -0,0 +1,135 @@
+"""
+轻量派发客户端
+只加载共享配置（settings.py），不导入 worker 模块，任务通过名称 send_task 派发；
+dispatch.py、常驻派发守护进程等共用
+"""
+
+import time
+from datetime import datetime, timezone
+
+# 轻量派发客户端（首次使用时创建）
+_client_app = None
+
+
+def get_client_app():
+    """
+    获取轻量派发客户端
+
+    celery 在首次调用时才导入；同一进程内复用 Broker/结果后端连接池。
+    """
+    global _client_app
+    if _client_app is None:
+        try:
+            from celery import Celery
+            from celery.signals import before_task_publish
+            from celery_tasks.serialization import register_profiles
+            from celery_tasks.settings import APP_NAME, CELERY_CONFIG
+        except ImportError as e:
+            raise RuntimeError(f"无法导入 celery: {e}")
+        register_profiles()
+        before_task_publish.connect(stamp_published_at, weak=False)
+        _client_app = Celery(APP_NAME, set_as_current=False)
+        _client_app.conf.update(CELERY_CONFIG)
+    return _client_app
+
+
+def stamp_published_at(headers=None, **kwargs):
+    """发布前在消息头中记录发布时间（Worker 据此统计排队时间）"""
+    if headers is not None:
+        headers.setdefault('published_at', time.time())
+
+
+def parse_eta(eta):
+    """解析 --eta 时间并添加时区（修复时区不匹配问题）"""
+    from zoneinfo import ZoneInfo
+    eta_dt = datetime.fromisoformat(eta)
+    return eta_dt.replace(tzinfo=ZoneInfo('Asia/Shanghai'))
+
+
+def build_schedule_options(delay=None, eta=None):
+    """根据 --delay / --eta 构建 apply_async 调度参数"""
+    if delay:
+        return {'countdown': delay}
+    if eta:
+        return {'eta': parse_eta(eta)}
+    return {}
+
+
+def schedule_delay(delay=None, eta=None):
+    """延迟任务距离执行时间的秒数（用于计算等待结果的超时）"""
+    if delay:
+        return delay
+    if eta:
+        return max(0.0, (parse_eta(eta) - datetime.now(timezone.utc)).total_seconds())
+    return 0
+
+
+def defer_to_scheduler(signatures, delay=None, eta=None):
+    """
+    延迟任务交给调度器（scheduler.py）：到期时才发布到队列，Worker 不再预取并持有 ETA 任务
+
+    Args:
+        signatures (list): 任务签名
+        delay (int, optional): 延迟秒数
+        eta (str, optional): 执行时间
+
+    Returns:
+        list[str] | None: 任务 ID；不是延迟任务、调度器已关闭或未运行时为 None
+            （调用方回退到 Celery countdown/eta）
+    """
+    if not (delay or eta):
+        return None
+    from celery_tasks import scheduler
+    if not scheduler.SCHEDULER_ENABLED or scheduler.read_heartbeat() is None:
+        return None
+    due = time.time() + delay if delay else parse_eta(eta).timestamp()
+    return scheduler.add_entries([scheduler.signature_entry(s, due) for s in signatures])
+
+
+# 批量任务描述中可直接传给 execute_command 的字段
+SPEC_TASK_KWARGS = (
+    'cache', 'cache_key', 'cache_ttl', 'cache_env', 'cache_inputs', 'cache_input_mode',
+    'singleflight', 'shell', 'warm',
+)
+
+
+# 批量任务描述中作为派发选项的字段
+SPEC_TASK_OPTIONS = ('queue', 'priority')
+
+
+def build_route_options(queue=None, priority=None):
+    """根据 --queue / --priority 构建派发选项（未指定队列时由 routing.py 按超时路由）"""
+    options = {'queue': queue, 'priority': priority}
+    return {k: v for k, v in options.items() if v is not None}
+
+
+def build_batch_signatures(app, specs, timeout=300, cwd=None, options=None):
+    """
+    将批量任务描述转换为 execute_command 签名
+
+    Args:
+        app: Celery 应用
+        specs (list[dict]): 任务描述（command、cwd、timeout、env、queue、priority
+            及 SPEC_TASK_KWARGS 中的字段）
+        timeout (int): 默认命令超时时间（单条任务可覆盖）
+        cwd (str, optional): 默认工作目录（单条任务可覆盖）
+        options (dict, optional): 默认派发选项 queue/priority（单条任务可覆盖）
+
+    Returns:
+        list: 任务签名列表
+    """
+    signatures = []
+    for spec in specs:
+        kwargs = {
+            'cwd': spec.get('cwd', cwd),
+            'timeout': spec.get('timeout', timeout),
+            'env_vars': spec.get('env'),
+        }
+        kwargs.update({k: spec.get(k) for k in SPEC_TASK_KWARGS})
+        kwargs = {k: v for k, v in kwargs.items() if v is not None}
+        task_options = dict(options or {})
+        task_options.update({k: spec[k] for k in SPEC_TASK_OPTIONS if spec.get(k) is not None})
+        signatures.append(app.signature(
+            'execute_command', args=(spec['command'],), kwargs=kwargs, **task_options
+        ))
+    return signatures
@@ -0,0 +1,232 @@
+"""
+命令工具
+命令指纹、命令前缀、执行方式等与具体存储无关的辅助函数（执行缓存、去重、资源统计、Worker 等共用）
+"""
+
+import os
+import json
+import shlex
+import hashlib
+
+
+# 命令前缀包含的词数（资源统计按前缀汇总，如 "make build"、"python gen_report.py"）
+PREFIX_WORDS = int(os.environ.get('CELERY_TASK_USAGE_PREFIX_WORDS', 2))
+
+
+def file_signature(path, mode='mtime'):
+    """
+    计算输入文件的签名
+
+    Args:
+        path (str): 文件路径
+        mode (str): mtime（修改时间+大小，开销小）或 hash（内容 SHA-256）
+
+    Returns:
+        str: 文件签名；文件不存在时为 'missing'
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return 'missing'
+
+    if mode != 'hash':
+        return f'{stat.st_mtime_ns}:{stat.st_size}'
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def command_fingerprint(command, cwd=None, env_vars=None, env=None, env_keys=None,
+                        input_files=None, input_mode='mtime'):
+    """
+    计算命令指纹：相同指纹的命令视为相同输入
+
+    Args:
+        command (str | list): 要执行的命令
+        cwd (str, optional): 工作目录
+        env_vars (dict, optional): 显式传入的环境变量（全部计入指纹）
+        env (dict, optional): 子进程的完整环境变量（用于读取 env_keys）
+        env_keys (list, optional): 额外计入指纹的环境变量名
+        input_files (list, optional): 计入指纹的输入文件（相对路径基于 cwd）
+        input_mode (str): 输入文件签名方式（mtime 或 hash）
+
+    Returns:
+        str: SHA-256 指纹
+    """
+    cwd = os.path.abspath(cwd or os.getcwd())
+    env = env or os.environ
+
+    inputs = {}
+    for path in input_files or []:
+        full_path = os.path.join(cwd, path)
+        inputs[path] = file_signature(full_path, input_mode)
+
+    material = {
+        'command': command,
+        'cwd': cwd,
+        'env_vars': env_vars or {},
+        'env': {key: env.get(key) for key in sorted(env_keys or [])},
+        'inputs': inputs,
+    }
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def command_prefix(command, words=None):
+    """
+    提取命令前缀（用于按命令类别汇总统计）
+
+    程序名只保留文件名，之后的参数遇到选项（以 - 开头）或 shell 操作符即停止，
+    例如 "/usr/bin/python gen.py --out x" → "python gen.py"，"ls -la" → "ls"。
+
+    Args:
+        command (str | list): 命令
+        words (int, optional): 前缀最多包含的词数
+
+    Returns:
+        str: 命令前缀
+    """
+    words = words or PREFIX_WORDS
+    if isinstance(command, (list, tuple)):
+        tokens = [str(t) for t in command]
+    else:
+        try:
+            tokens = shlex.split(command, posix=os.name != 'nt')
+        except ValueError:
+            tokens = command.split()
+    if not tokens:
+        return ''
+
+    prefix = [os.path.basename(tokens[0].strip('"\'')) or tokens[0]]
+    for token in tokens[1:words]:
+        if token.startswith('-') or token in ('|', '||', '&&', ';', '>', '<', '&'):
+            break
+        prefix.append(token)
+    return ' '.join(prefix)
+
+
+# 需要 shell 解释的字符（出现在引号外时 auto 模式仍经由 shell 执行）
+SHELL_METACHARACTERS = frozenset('|&;<>()$`\\*?[]{}~!#\n')
+
+# shell 内置命令：auto 模式下仍交给 shell（行为与原来一致，且不需要再启动一个程序）
+SHELL_BUILTINS = frozenset({
+    'echo', 'printf', 'true', 'false', 'test', '[', 'pwd', 'kill', ':',
+    'cd', 'export', 'unset', 'set', 'source', '.', 'exec', 'exit', 'ulimit', 'umask',
+})
+
+# 已解析的程序绝对路径（(程序名, PATH) → 路径，只缓存找到的程序）
+_executables = {}
+
+
+def command_text(command):
+    """把列表形式的命令转换为便于显示的字符串"""
+    if isinstance(command, (list, tuple)):
+        args = [str(arg) for arg in command]
+        if os.name == 'nt':
+            import subprocess
+            return subprocess.list2cmdline(args)
+        return shlex.join(args)
+    return command
+
+
+def split_command(command):
+    """
+    把不含 shell 语法的命令字符串拆分为参数列表
+
+    Returns:
+        list[str] | None: 参数列表；包含管道、重定向、变量、通配符、
+            VAR=value 前缀等 shell 语法或以内置命令开头时为 None
+    """
+    # 单引号内全部按字面处理；双引号内 $、`、\ 仍由 shell 展开
+    quote = None
+    for ch in command:
+        if quote == "'":
+            if ch == "'":
+                quote = None
+        elif quote == '"':
+            if ch == '"':
+                quote = None
+            elif ch in '$`\\':
+                return None
+        elif ch in '\'"':
+            quote = ch
+        elif ch in SHELL_METACHARACTERS:
+            return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    if not argv or '=' in argv[0] or argv[0] in SHELL_BUILTINS:
+        return None
+    return argv
+
+
+def resolve_executable(program, path=None):
+    """
+    在 PATH 中查找程序的绝对路径（结果按 PATH 缓存）
+
+    Returns:
+        str | None: 程序路径；包含目录的程序名原样返回，找不到时为 None
+    """
+    import shutil
+
+    if os.path.dirname(program):
+        return program
+    key = (program, path)
+    resolved = _executables.get(key)
+    if resolved is None:
+        resolved = shutil.which(program, path=path)
+        if resolved:
+            _executables[key] = resolved
+    return resolved
+
+
+def prepare_command(command, shell=True, env=None):
+    """
+    决定命令的执行方式
+
+    shell=True 经由 shell 执行；shell=False 或命令为列表时直接执行（字符串按 shlex 拆分）；
+    shell='auto' 在命令不含 shell 语法、且程序能在 PATH 中找到时直接执行，否则经由 shell
+    （echo、cd 等内置命令、找不到的程序仍交给 shell，行为和错误信息与之前一致）。
+
+    直接执行时以绝对路径指定程序并且不关闭继承的文件描述符（Python 创建的描述符默认不可继承），
+    CPython 在未指定 cwd 时据此使用 posix_spawn 启动子进程，指定 cwd 时使用 vfork，
+    省去 /bin/sh 的启动和命令解析。Windows 上 auto 仍使用 cmd.exe。
+
+    Args:
+        command (str | list): 命令
+        shell (bool | str): True、False 或 'auto'
+        env (dict, optional): 子进程环境变量（用于读取 PATH）
+
+    Returns:
+        tuple: (传给 Popen 的命令, Popen 选项 shell/executable/close_fds)
+    """
+    is_list = isinstance(command, (list, tuple))
+    if os.name == 'nt':
+        if is_list:
+            return [str(arg) for arg in command], {'shell': False}
+        return command, {'shell': shell is not False}
+
+    if is_list:
+        argv = [str(arg) for arg in command]
+    elif shell is True:
+        return command, {'shell': True}
+    elif shell == 'auto':
+        argv = split_command(command)
+        if argv is None:
+            return command, {'shell': True}
+    else:
+        argv = shlex.split(command)
+
+    if not argv:
+        raise ValueError('命令为空')
+    executable = resolve_executable(argv[0], (env or os.environ).get('PATH'))
+    if executable is None:
+        if shell == 'auto' and not is_list:
+            return command, {'shell': True}
+        # 程序不存在：由 Popen 抛出 FileNotFoundError
+        return argv, {'shell': False}
+    return argv, {'shell': False, 'executable': executable, 'close_fds': False}
@@ -0,0 +1,102 @@
+"""
+常驻派发守护进程客户端
+通过 Unix 域套接字（不支持 AF_UNIX 的平台使用本机 TCP）与 scripts/dispatch_daemon.py 通信。
+本模块只依赖标准库，dispatch.py 经由守护进程派发任务时无需导入 celery/redis。
+
+协议：每行一个 JSON 请求 {"op": ..., ...}，守护进程返回一行 JSON 响应
+{"ok": true, ...} 或 {"ok": false, "error": "..."}；同一连接可连续发送多个请求。
+"""
+
+import os
+import json
+import socket
+
+from celery_tasks.settings import DISPATCH_PORT, DISPATCH_SOCKET
+
+
+class DaemonError(RuntimeError):
+    """守护进程返回错误或连接中断"""
+
+
+def use_unix_socket():
+    """当前平台是否使用 Unix 域套接字"""
+    return hasattr(socket, 'AF_UNIX')
+
+
+def daemon_address():
+    """获取守护进程监听地址（用于显示）"""
+    if use_unix_socket():
+        return DISPATCH_SOCKET
+    return f'127.0.0.1:{DISPATCH_PORT}'
+
+
+class DaemonClient:
+    """守护进程客户端（一个连接，可发送多个请求）"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._reader = sock.makefile('rb')
+
+    @classmethod
+    def connect(cls, timeout=0.5):
+        """
+        连接守护进程
+
+        Args:
+            timeout (float): 连接超时（秒）
+
+        Returns:
+            DaemonClient | None: 守护进程未运行时返回 None
+        """
+        try:
+            if use_unix_socket():
+                if not os.path.exists(DISPATCH_SOCKET):
+                    return None
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(timeout)
+                sock.connect(DISPATCH_SOCKET)
+            else:
+                sock = socket.create_connection(('127.0.0.1', DISPATCH_PORT), timeout=timeout)
+        except OSError:
+            return None
+        sock.settimeout(None)
+        return cls(sock)
+
+    def request(self, op, timeout=None, **payload):
+        """
+        发送请求并等待响应
+
+        Args:
+            op (str): 操作名称（ping、health、submit、batch、status、wait、shutdown）
+            timeout (float, optional): 等待响应的超时（秒）
+            **payload: 请求参数（需可 JSON 序列化）
+
+        Returns:
+            dict: 响应内容
+
+        Raises:
+            DaemonError: 守护进程返回错误或连接中断
+        """
+        payload['op'] = op
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.sendall(json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n')
+            line = self._reader.readline()
+        except OSError as e:
+            raise DaemonError(f'守护进程连接中断: {e}')
+
+        if not line:
+            raise DaemonError('守护进程连接已关闭')
+
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise DaemonError(response.get('error', '未知错误'))
+        return response
+
+    def close(self):
+        """关闭连接"""
+        try:
+            self._reader.close()
+            self.sock.close()
+        except OSError:
+            pass
@@ -0,0 +1,137 @@
+"""
+执行结果缓存模块
+对确定性命令（报告生成、lint 等）按命令指纹缓存执行结果，
+相同输入再次派发时直接返回缓存结果，不再启动子进程。
+缓存存放在 Redis 中（多个 Worker 共享），按 TTL 过期，
+总大小超过上限时按最近访问时间做 LRU 淘汰
+"""
+
+import os
+import sys
+import json
+import time
+
+from celery_tasks.redis_client import KEY_PREFIX, get_redis
+
+
+# 缓存条目键前缀
+CACHE_KEY_PREFIX = KEY_PREFIX + 'cache:'
+
+# 最近访问时间索引（ZSET，用于 LRU 淘汰）
+CACHE_LRU_KEY = KEY_PREFIX + 'cache:lru'
+
+# 默认缓存时间（秒）
+DEFAULT_TTL = 3600
+
+# 各条目大小（HASH，键 → 字节数）与缓存总字节数
+CACHE_SIZES_KEY = KEY_PREFIX + 'cache:sizes'
+CACHE_BYTES_KEY = KEY_PREFIX + 'cache:bytes'
+
+# 缓存总大小上限（字节）：与 Broker 共用的 Redis 配置了 noeviction，不能让缓存占满内存
+MAX_BYTES = int(os.environ.get('CELERY_TASK_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# 单个条目的大小上限（字节），更大的结果不缓存
+MAX_ENTRY_BYTES = int(os.environ.get('CELERY_TASK_CACHE_MAX_ENTRY_BYTES', 256 * 1024))
+
+# 写入条目并按 LRU 淘汰到总大小不超过上限，返回被淘汰的缓存键
+# （脚本只访问 KEYS 中声明的键，被淘汰条目的内容由客户端在脚本返回后删除）
+# KEYS: 条目键、LRU、大小、总字节数；ARGV: 缓存键、内容、TTL、访问时间、上限
+PUT_SCRIPT = """
+local old = tonumber(redis.call('HGET', KEYS[3], ARGV[1]) or '0')
+local size = string.len(ARGV[2])
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[4], ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], size)
+local total = redis.call('INCRBY', KEYS[4], size - old)
+local evicted = {}
+while total > tonumber(ARGV[5]) do
+    local oldest = redis.call('ZPOPMIN', KEYS[2])
+    if #oldest == 0 then
+        break
+    end
+    local freed = tonumber(redis.call('HGET', KEYS[3], oldest[1]) or '0')
+    redis.call('HDEL', KEYS[3], oldest[1])
+    total = redis.call('DECRBY', KEYS[4], freed)
+    table.insert(evicted, oldest[1])
+end
+return evicted
+"""
+
+# 移除已过期条目的索引并扣减总字节数；KEYS: LRU、大小、总字节数；ARGV: 缓存键
+FORGET_SCRIPT = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+local size = redis.call('HGET', KEYS[2], ARGV[1])
+if size then
+    redis.call('HDEL', KEYS[2], ARGV[1])
+    redis.call('DECRBY', KEYS[3], size)
+end
+return 0
+"""
+
+
+def _entry_key(key):
+    """缓存条目的 Redis 键"""
+    return CACHE_KEY_PREFIX + key
+
+
+def get(key, client=None):
+    """
+    读取缓存结果
+
+    Args:
+        key (str): 缓存键（命令指纹或用户指定的键）
+        client (redis.Redis, optional): Redis 客户端
+
+    Returns:
+        dict | None: 缓存的结果，未命中时为 None
+    """
+    client = client or get_redis()
+    try:
+        payload = client.get(_entry_key(key))
+        if payload is None:
+            client.register_script(FORGET_SCRIPT)(
+                keys=[CACHE_LRU_KEY, CACHE_SIZES_KEY, CACHE_BYTES_KEY], args=[key])
+            return None
+        client.zadd(CACHE_LRU_KEY, {key: time.time()})
+        return json.loads(payload)
+    except Exception as e:
+        # 缓存不可用时按未命中处理
+        print(f'[cache] Read error: {e}', file=sys.stderr)
+        return None
+
+
+def put(key, result, ttl=None, client=None):
+    """
+    写入缓存结果，总大小超出上限时淘汰最久未访问的条目
+
+    输出已转存到 Blob 存储的结果不缓存：Blob 引用指向执行该任务的 Worker 本机磁盘，
+    其他主机上的 Worker 命中缓存时无法读取完整输出。
+
+    Args:
+        key (str): 缓存键
+        result (dict): 执行结果
+        ttl (int, optional): 缓存时间（秒）
+        client (redis.Redis, optional): Redis 客户端
+
+    Returns:
+        bool: 是否已写入缓存
+    """
+    if any(result.get(f'{name}_blob') for name in ('stdout', 'stderr')):
+        return False
+    payload = json.dumps(result, ensure_ascii=False).encode('utf-8')
+    if len(payload) > MAX_ENTRY_BYTES:
+        return False
+
+    client = client or get_redis()
+    try:
+        evicted = client.register_script(PUT_SCRIPT)(
+            keys=[_entry_key(key), CACHE_LRU_KEY, CACHE_SIZES_KEY, CACHE_BYTES_KEY],
+            args=[key, payload, int(ttl or DEFAULT_TTL), time.time(), MAX_BYTES],
+        )
+        evicted = [k.decode() if isinstance(k, bytes) else k for k in evicted]
+        if evicted:
+            client.delete(*[_entry_key(k) for k in evicted])
+        return key not in evicted
+    except Exception as e:
+        print(f'[cache] Write error: {e}', file=sys.stderr)
+        return False
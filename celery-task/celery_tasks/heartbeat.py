@@ -0,0 +1,105 @@
+"""
+Worker 心跳模块
+Worker 启动后定期向 Redis 写入带过期时间的心跳键，
+派发任务时只需一次 GET 即可判断 Worker 是否存活，无需 inspect 广播
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import threading
+
+from celery_tasks.redis_client import KEY_PREFIX, get_redis
+
+
+# 任意 Worker 存活的心跳键（各 Worker 共同刷新）
+HEARTBEAT_KEY = KEY_PREFIX + 'heartbeat'
+
+# 单个 Worker 的心跳键前缀
+WORKER_KEY_PREFIX = KEY_PREFIX + 'heartbeat:'
+
+# 心跳刷新间隔与过期时间（秒）
+HEARTBEAT_INTERVAL = 10
+HEARTBEAT_TTL = 30
+
+
+class HeartbeatPublisher:
+    """在后台线程中定期刷新 Worker 心跳"""
+
+    def __init__(self, hostname, interval=HEARTBEAT_INTERVAL, ttl=HEARTBEAT_TTL):
+        """
+        初始化心跳发布器
+
+        Args:
+            hostname (str): Worker 节点名称
+            interval (int): 刷新间隔（秒）
+            ttl (int): 心跳过期时间（秒）
+        """
+        self.hostname = hostname
+        self.interval = interval
+        self.ttl = ttl
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='heartbeat', daemon=True)
+
+    def start(self):
+        """启动心跳线程"""
+        self._thread.start()
+
+    def beat(self):
+        """写入一次心跳"""
+        payload = json.dumps({
+            'hostname': self.hostname,
+            'pid': os.getpid(),
+            'platform': platform.system(),
+            'timestamp': time.time(),
+        })
+        with get_redis().pipeline(transaction=False) as pipe:
+            pipe.set(HEARTBEAT_KEY, payload, ex=self.ttl)
+            pipe.set(WORKER_KEY_PREFIX + self.hostname, payload, ex=self.ttl)
+            pipe.execute()
+
+    def _run(self):
+        """后台循环：Redis 暂时不可用时继续重试"""
+        while not self._stop.is_set():
+            try:
+                self.beat()
+            except Exception as e:
+                print(f'[heartbeat] Publish error: {e}', file=sys.stderr)
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        """停止心跳并删除本 Worker 的心跳键"""
+        self._stop.set()
+        try:
+            client = get_redis()
+            client.delete(WORKER_KEY_PREFIX + self.hostname)
+            current = read_heartbeat(client)
+            if current and current.get('hostname') == self.hostname:
+                client.delete(HEARTBEAT_KEY)
+        except Exception:
+            pass
+
+
+def read_heartbeat(client=None):
+    """
+    读取最近的 Worker 心跳
+
+    Args:
+        client (redis.Redis, optional): Redis 客户端
+
+    Returns:
+        dict | None: 心跳信息（hostname、pid、timestamp 等），没有存活 Worker 时为 None
+
+    Raises:
+        redis.exceptions.ConnectionError: Redis 不可用
+    """
+    client = client or get_redis()
+    payload = client.get(HEARTBEAT_KEY)
+    if not payload:
+        return None
+    try:
+        return json.loads(payload)
+    except ValueError:
+        return None
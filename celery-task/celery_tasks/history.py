@@ -0,0 +1,395 @@
+"""
+任务历史模块
+Worker 把每个 execute_command 的结果追加到本地 SQLite 数据库（WAL 模式，data/history.db），
+不受结果后端 result_expires（24 小时）的限制：
+
+  tasks       按完成时间、状态、返回码、命令前缀建立索引
+  tasks_fts   stdout/stderr 和命令的全文索引（FTS5 trigram 分词：按子串匹配，中文同样适用；
+              SQLite 低于 3.34 时回退到 LIKE）
+
+已转存到 Blob 存储的输出只保存预览和引用；单个输出超过 HISTORY_OUTPUT_CHARS 时只保留首尾。
+超过 HISTORY_DAYS 天的记录由 Worker 定期删除（每个进程每 PRUNE_INTERVAL 秒最多一次）。
+查询（scripts/dispatch.py history）只读本地数据库，不访问 Redis。
+
+只使用标准库，派发端查询历史时不需要导入 celery。
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+
+# 历史数据库路径
+HISTORY_DB = Path(os.environ.get(
+    'CELERY_TASK_HISTORY_DB',
+    str(Path(__file__).parent.parent / 'data' / 'history.db'),
+))
+
+# 是否记录任务历史（设为 0 关闭）
+HISTORY_ENABLED = os.environ.get('CELERY_TASK_HISTORY', '1').lower() not in ('0', 'false', 'no')
+
+# 每个输出保存的最大字符数（超过时保留首尾各一半）
+HISTORY_OUTPUT_CHARS = int(os.environ.get('CELERY_TASK_HISTORY_OUTPUT_CHARS', 64 * 1024))
+
+# 历史保留天数（Worker 定期删除更早的记录，设为 0 不自动删除）
+HISTORY_DAYS = float(os.environ.get('CELERY_TASK_HISTORY_DAYS', 30))
+
+# 自动清理的间隔（秒）
+PRUNE_INTERVAL = 3600
+
+# 每批删除的条数（分批提交，不长时间占用写锁）
+PRUNE_BATCH = 1000
+
+# 写入冲突时的等待时间（毫秒，多个 Worker 进程同时写入）
+BUSY_TIMEOUT_MS = 5000
+
+# 任务状态
+STATUSES = ('success', 'failed', 'timeout', 'error')
+
+# 单独成列的结果字段（其余小字段保存在 extra JSON 中）
+COLUMN_FIELDS = frozenset({
+    'command', 'cwd', 'success', 'returncode', 'duration', 'stdout', 'stderr',
+    'stdout_blob', 'stderr_blob', 'command_prefix', 'timeline',
+})
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    task_id TEXT NOT NULL UNIQUE,
+    finished_at REAL NOT NULL,
+    started_at REAL,
+    duration REAL,
+    status TEXT NOT NULL,
+    returncode INTEGER,
+    command TEXT NOT NULL,
+    command_prefix TEXT,
+    cwd TEXT,
+    queue TEXT,
+    worker TEXT,
+    stdout TEXT,
+    stderr TEXT,
+    stdout_blob TEXT,
+    stderr_blob TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_finished ON tasks (finished_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, finished_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_returncode ON tasks (returncode, finished_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_prefix ON tasks (command_prefix, finished_at);
+"""
+
+# trigram 分词能匹配的最短搜索词（更短的词使用 LIKE）
+FTS_MIN_TERM = 3
+
+# 外部内容 FTS5 表：只保存索引，文本取自 tasks；由触发器同步
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+    command, stdout, stderr, content='tasks', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO tasks_fts (rowid, command, stdout, stderr)
+    VALUES (new.id, new.command, new.stdout, new.stderr);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, command, stdout, stderr)
+    VALUES ('delete', old.id, old.command, old.stdout, old.stderr);
+END;
+"""
+
+# 每个线程一个连接（SQLite 连接不能跨线程使用；prefork 子进程各自打开）
+_local = threading.local()
+
+# 本进程下一次自动清理的时间（time.monotonic()）
+_next_prune = 0.0
+
+
+def connect(path=None):
+    """
+    打开历史数据库（首次打开时建表）
+
+    Args:
+        path (str | Path, optional): 数据库路径，默认 HISTORY_DB
+
+    Returns:
+        sqlite3.Connection: 当前线程复用的连接
+    """
+    path = Path(path or HISTORY_DB)
+    key = (str(path), os.getpid())
+    conn = getattr(_local, 'connections', {}).get(key)
+    if conn is not None:
+        return conn
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    # WAL：写入不阻塞查询；NORMAL 在 WAL 下只在检查点时 fsync，断电最多丢失最近的事务
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    # INSERT OR REPLACE 删除旧行时也触发删除触发器，保持全文索引同步
+    conn.execute('PRAGMA recursive_triggers=ON')
+    conn.executescript(SCHEMA)
+    try:
+        conn.executescript(FTS_SCHEMA)
+    except sqlite3.OperationalError:
+        # SQLite 未编译 FTS5 或不支持 trigram：全文查询回退到 LIKE
+        pass
+
+    if not hasattr(_local, 'connections'):
+        _local.connections = {}
+    _local.connections[key] = conn
+    return conn
+
+
+def has_fts(conn):
+    """数据库是否有全文索引"""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'"
+    ).fetchone()
+    return row is not None
+
+
+def task_status(result):
+    """
+    按执行结果判断状态
+
+    Returns:
+        str: success、failed（返回码非 0）、timeout（命令超时）、error（启动失败或任务异常）
+    """
+    returncode = result.get('returncode')
+    if returncode == 0:
+        return 'success'
+    if returncode == -2:
+        return 'timeout'
+    if returncode in (-3, -4) or returncode is None:
+        return 'error'
+    return 'failed'
+
+
+def clip_output(text, limit=None):
+    """超过 limit 个字符的输出只保留首尾"""
+    limit = HISTORY_OUTPUT_CHARS if limit is None else limit
+    if not text or len(text) <= limit:
+        return text
+    half = limit // 2
+    return f'{text[:half]}\n... ({len(text) - limit} 字符已省略) ...\n{text[-half:]}'
+
+
+def record_result(task_id, result, queue=None, worker=None, conn=None):
+    """
+    追加一条任务结果（相同任务 ID 再次写入时覆盖，如任务重试）
+
+    Args:
+        task_id (str): 任务 ID
+        result (dict): execute_command 的返回值
+        queue (str, optional): 任务所在队列
+        worker (str, optional): 执行的 Worker 节点名
+        conn (sqlite3.Connection, optional): 数据库连接
+    """
+    from celery_tasks.command_utils import command_prefix, command_text
+
+    conn = conn or connect()
+    timeline = result.get('timeline') or {}
+    extra = {k: v for k, v in result.items() if k not in COLUMN_FIELDS}
+    blobs = {
+        name: json.dumps(result[f'{name}_blob']) if result.get(f'{name}_blob') else None
+        for name in ('stdout', 'stderr')
+    }
+    conn.execute(
+        'INSERT OR REPLACE INTO tasks (task_id, finished_at, started_at, duration, status, '
+        'returncode, command, command_prefix, cwd, queue, worker, stdout, stderr, '
+        'stdout_blob, stderr_blob, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (
+            task_id,
+            time.time(),
+            timeline.get('started'),
+            result.get('duration'),
+            task_status(result),
+            result.get('returncode'),
+            command_text(result['command']),
+            result.get('command_prefix') or command_prefix(result['command']),
+            result.get('cwd'),
+            queue,
+            worker,
+            clip_output(result.get('stdout')),
+            clip_output(result.get('stderr')),
+            blobs['stdout'],
+            blobs['stderr'],
+            json.dumps(extra, ensure_ascii=False, default=str),
+        ),
+    )
+
+
+def match_clauses(text, fts):
+    """
+    把搜索文本转换为查询条件：每个词都要在命令、stdout 或 stderr 中出现（不区分大小写）
+
+    Returns:
+        tuple: (FTS5 查询或 None, LIKE 条件列表, LIKE 参数列表)
+    """
+    terms = text.split()
+    fts_terms = [t for t in terms if fts and len(t) >= FTS_MIN_TERM]
+    like_terms = [t for t in terms if t not in fts_terms]
+
+    query = ' '.join('"' + t.replace('"', '""') + '"' for t in fts_terms) or None
+    clauses, params = [], []
+    for term in like_terms:
+        pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        clauses.append("(t.command LIKE ? ESCAPE '\\' OR t.stdout LIKE ? ESCAPE '\\' "
+                       "OR t.stderr LIKE ? ESCAPE '\\')")
+        params.extend([pattern] * 3)
+    return query, clauses, params
+
+
+def search(since=None, until=None, statuses=None, returncode=None, prefix=None,
+           match=None, limit=50, conn=None):
+    """
+    查询任务历史（按完成时间倒序）
+
+    Args:
+        since (float, optional): 完成时间下限（时间戳）
+        until (float, optional): 完成时间上限（时间戳）
+        statuses (list, optional): 状态（success/failed/timeout/error）
+        returncode (int, optional): 返回码
+        prefix (str, optional): 命令前缀（精确匹配）
+        match (str, optional): 在命令、stdout、stderr 中全文搜索
+        limit (int): 返回的最大条数
+        conn (sqlite3.Connection, optional): 数据库连接
+
+    Returns:
+        list[dict]: 任务记录（不含 stdout/stderr 全文以外的大字段）
+    """
+    conn = conn or connect()
+    clauses, params = [], []
+    table = 'tasks t'
+
+    if match:
+        query, like_clauses, like_params = match_clauses(match, has_fts(conn))
+        if query:
+            table = 'tasks_fts f JOIN tasks t ON t.id = f.rowid'
+            clauses.append('tasks_fts MATCH ?')
+            params.append(query)
+        clauses.extend(like_clauses)
+        params.extend(like_params)
+    if since is not None:
+        clauses.append('t.finished_at >= ?')
+        params.append(since)
+    if until is not None:
+        clauses.append('t.finished_at < ?')
+        params.append(until)
+    if statuses:
+        clauses.append(f"t.status IN ({', '.join('?' * len(statuses))})")
+        params.extend(statuses)
+    if returncode is not None:
+        clauses.append('t.returncode = ?')
+        params.append(returncode)
+    if prefix:
+        clauses.append('t.command_prefix = ?')
+        params.append(prefix)
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    rows = conn.execute(
+        f'SELECT t.* FROM {table} {where} ORDER BY t.finished_at DESC LIMIT ?',
+        (*params, limit),
+    ).fetchall()
+    return [row_to_dict(row) for row in rows]
+
+
+def get_task(task_id, conn=None):
+    """
+    按任务 ID 读取一条历史
+
+    Returns:
+        dict | None: 任务记录，不存在时为 None
+    """
+    conn = conn or connect()
+    row = conn.execute('SELECT * FROM tasks WHERE task_id = ?', (task_id,)).fetchone()
+    return row_to_dict(row) if row else None
+
+
+def row_to_dict(row):
+    """把数据库行还原为接近 execute_command 结果的字典"""
+    record = dict(row)
+    for name in ('stdout_blob', 'stderr_blob', 'extra'):
+        if record.get(name):
+            record[name] = json.loads(record[name])
+    record.update(record.pop('extra') or {})
+    record['success'] = record['status'] == 'success'
+    return record
+
+
+def prune(before, conn=None):
+    """
+    删除完成时间早于 before 的历史
+
+    Returns:
+        int: 删除的条数
+    """
+    conn = conn or connect()
+    total = 0
+    while True:
+        cursor = conn.execute(
+            'DELETE FROM tasks WHERE id IN (SELECT id FROM tasks WHERE finished_at < ? LIMIT ?)',
+            (before, PRUNE_BATCH),
+        )
+        total += cursor.rowcount
+        if cursor.rowcount < PRUNE_BATCH:
+            return total
+
+
+def prune_due(now=None):
+    """
+    本进程是否到了自动清理的时间（返回 True 时记下下一次清理的时间）
+
+    Args:
+        now (float, optional): time.monotonic() 的值
+    """
+    global _next_prune
+    if HISTORY_DAYS <= 0:
+        return False
+    now = time.monotonic() if now is None else now
+    if now < _next_prune:
+        return False
+    _next_prune = now + PRUNE_INTERVAL
+    return True
+
+
+def prune_expired(days=None, conn=None):
+    """
+    删除超过保留天数的历史
+
+    Args:
+        days (float, optional): 保留天数，默认 HISTORY_DAYS（不大于 0 时不删除）
+
+    Returns:
+        int: 删除的条数
+    """
+    days = HISTORY_DAYS if days is None else days
+    if days <= 0:
+        return 0
+    return prune(time.time() - days * 86400, conn)
+
+
+def stats(conn=None):
+    """
+    统计历史数据库
+
+    Returns:
+        dict: 总条数、各状态条数、最早/最晚完成时间、数据库大小
+    """
+    conn = conn or connect()
+    row = conn.execute('SELECT COUNT(*), MIN(finished_at), MAX(finished_at) FROM tasks').fetchone()
+    by_status = dict(conn.execute('SELECT status, COUNT(*) FROM tasks GROUP BY status').fetchall())
+    path = Path(conn.execute('PRAGMA database_list').fetchone()[2])
+    size = sum(p.stat().st_size for p in (path, Path(f'{path}-wal')) if p.exists())
+    return {
+        'count': row[0],
+        'oldest': row[1],
+        'newest': row[2],
+        'by_status': by_status,
+        'fts': has_fts(conn),
+        'path': str(path),
+        'size_bytes': size,
+    }
@@ -0,0 +1,233 @@
+"""
+Prometheus 风格的指标模块
+Worker 通过 Celery 信号把计数、耗时分布等写入 Redis（同一主机或多台主机上的
+所有 Worker 进程、prefork 子进程共用一份数据），任一 Worker 的 HTTP /metrics 端点
+读取 Redis 并输出 Prometheus 文本格式，可由本地 Prometheus 抓取或直接 curl 查看。
+
+端点端口由环境变量 CELERY_TASK_METRICS_PORT 或 scripts/worker.py --metrics-port 指定，
+未指定时不启动端点（指标仍会写入 Redis）。端点没有认证且会输出命令前缀和队列信息，
+默认只监听 127.0.0.1，需要远程抓取时用 CELERY_TASK_METRICS_HOST 或 --metrics-host 指定。环境变量 CELERY_TASK_METRICS=0 关闭指标记录。
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from celery_tasks.redis_client import KEY_PREFIX, get_redis
+
+
+# 计数器与仪表的当前值（Hash，字段为序列名，如 celery_task_tasks_total{state="SUCCESS"}）
+VALUES_KEY = KEY_PREFIX + 'metrics:values'
+
+# 直方图（Hash，字段为 <序列名>|<桶上限>、<序列名>|sum、<序列名>|count）
+HISTOGRAMS_KEY = KEY_PREFIX + 'metrics:histograms'
+
+# 指标名前缀
+METRIC_PREFIX = 'celery_task_'
+
+# 是否记录指标（设为 0 关闭）
+METRICS_ENABLED = os.environ.get('CELERY_TASK_METRICS', '1').lower() not in ('0', 'false', 'no')
+
+# 指标端点端口（未设置时不启动）
+METRICS_PORT = os.environ.get('CELERY_TASK_METRICS_PORT')
+
+# 指标端点监听地址
+METRICS_HOST = os.environ.get('CELERY_TASK_METRICS_HOST', '127.0.0.1')
+
+# 直方图桶上限（秒），覆盖亚秒级命令到小时级任务
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1, 2.5, 5, 10, 30, 60, 300, 1800, 3600,
+)
+
+# 指标定义：名称 → (类型, 说明)
+METRICS = {
+    'tasks_total': ('counter', '按任务名和最终状态统计的任务数'),
+    'returncode_total': ('counter', 'execute_command 子进程返回码分布'),
+    'tasks_in_flight': ('gauge', '各 Worker 正在执行的任务数'),
+    'task_duration_seconds': ('histogram', '任务执行耗时'),
+    'queue_wait_seconds': ('histogram', '任务从发布到开始执行的排队时间'),
+    'notification_latency_seconds': ('histogram', '通知从入队到发送完成的耗时'),
+}
+
+
+def _escape(value):
+    """转义标签值中的反斜杠和引号"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def series_name(name, labels=None):
+    """
+    生成序列名
+
+    Args:
+        name (str): 指标名（不含前缀）
+        labels (dict, optional): 标签
+
+    Returns:
+        str: 如 celery_task_tasks_total{state="SUCCESS"}
+    """
+    if not labels:
+        return METRIC_PREFIX + name
+    label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items()))
+    return f'{METRIC_PREFIX}{name}{{{label_text}}}'
+
+
+def inc(pipe, name, labels=None, amount=1):
+    """计数器/仪表增加 amount（写入 pipeline，由调用方 execute）"""
+    pipe.hincrbyfloat(VALUES_KEY, series_name(name, labels), amount)
+
+
+def set_value(pipe, name, labels=None, value=0):
+    """设置仪表的值"""
+    pipe.hset(VALUES_KEY, series_name(name, labels), value)
+
+
+def observe(pipe, name, value, labels=None, buckets=DEFAULT_BUCKETS):
+    """
+    记录一次直方图观测值（只增加所在的桶，输出时再累加为 Prometheus 的累积桶）
+
+    Args:
+        pipe: Redis pipeline
+        name (str): 指标名
+        value (float): 观测值（秒）
+        labels (dict, optional): 标签
+        buckets (tuple): 桶上限
+    """
+    series = series_name(name, labels)
+    bucket = next((b for b in buckets if value <= b), '+Inf')
+    pipe.hincrby(HISTOGRAMS_KEY, f'{series}|{bucket}', 1)
+    pipe.hincrbyfloat(HISTOGRAMS_KEY, f'{series}|sum', value)
+    pipe.hincrby(HISTOGRAMS_KEY, f'{series}|count', 1)
+
+
+def apply_calls(pipe, calls):
+    """把多个指标操作写入 pipeline"""
+    for func, *args in calls:
+        func(pipe, *args)
+
+
+def record(*calls):
+    """
+    记录多个指标操作（由后台线程与其他统计合并写入 Redis，见 telemetry.py）
+
+    Args:
+        *calls: (函数, 参数...) 元组，如 (inc, 'tasks_total', {'state': 'SUCCESS'})
+    """
+    if not METRICS_ENABLED:
+        return
+    from celery_tasks import telemetry
+    telemetry.record(apply_calls, calls)
+
+
+def _split_series(series):
+    """把序列名拆分为 (指标名, 标签文本)"""
+    name, _, labels = series.partition('{')
+    return name, labels[:-1] if labels else ''
+
+
+def _with_label(labels, extra):
+    """在标签文本中追加一个标签"""
+    return f'{{{labels},{extra}}}' if labels else f'{{{extra}}}'
+
+
+def render(client=None):
+    """
+    以 Prometheus 文本格式输出全部指标
+
+    Returns:
+        str: 指标文本
+    """
+    client = client or get_redis()
+    values = {k.decode(): float(v) for k, v in client.hgetall(VALUES_KEY).items()}
+    raw_histograms = {k.decode(): float(v) for k, v in client.hgetall(HISTOGRAMS_KEY).items()}
+
+    # 整理直方图：{序列名: {'buckets': {上限: 次数}, 'sum': x, 'count': n}}
+    histograms = {}
+    for field, value in raw_histograms.items():
+        series, _, part = field.rpartition('|')
+        entry = histograms.setdefault(series, {'buckets': {}, 'sum': 0.0, 'count': 0})
+        if part in ('sum', 'count'):
+            entry[part] = value
+        else:
+            entry['buckets'][part] = value
+
+    lines = []
+    for metric, (kind, help_text) in METRICS.items():
+        full_name = METRIC_PREFIX + metric
+        lines.append(f'# HELP {full_name} {help_text}')
+        lines.append(f'# TYPE {full_name} {kind}')
+
+        if kind != 'histogram':
+            for series, value in sorted(values.items()):
+                if _split_series(series)[0] == full_name:
+                    lines.append(f'{series} {value:g}')
+            continue
+
+        for series, entry in sorted(histograms.items()):
+            name, labels = _split_series(series)
+            if name != full_name:
+                continue
+            cumulative = 0
+            for bucket in DEFAULT_BUCKETS:
+                cumulative += entry['buckets'].get(str(bucket), 0)
+                le = _with_label(labels, 'le="%s"' % bucket)
+                lines.append(f'{name}_bucket{le} {cumulative:g}')
+            le = _with_label(labels, 'le="+Inf"')
+            lines.append(f'{name}_bucket{le} {entry["count"]:g}')
+            suffix = f'{{{labels}}}' if labels else ''
+            lines.append(f'{name}_sum{suffix} {entry["sum"]:g}')
+            lines.append(f'{name}_count{suffix} {entry["count"]:g}')
+
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """只提供 GET /metrics"""
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        try:
+            body = render().encode('utf-8')
+        except Exception as e:
+            self.send_error(503, f'metrics unavailable: {e}')
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 抓取请求不写入 Worker 日志
+        pass
+
+
+def start_server(port=None, host=None):
+    """
+    在后台线程中启动 /metrics 端点
+
+    Args:
+        port (int | str, optional): 端口，默认读取 CELERY_TASK_METRICS_PORT
+        host (str, optional): 监听地址，默认读取 CELERY_TASK_METRICS_HOST（127.0.0.1）
+
+    Returns:
+        ThreadingHTTPServer | None: 未配置端口或端口被占用时为 None
+    """
+    port = port or METRICS_PORT
+    host = host or METRICS_HOST
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+    except OSError as e:
+        # 同一主机上的多个 Worker 共用 Redis 中的指标，由任一 Worker 提供端点即可
+        print(f'[metrics] Endpoint not started on port {port}: {e}', file=sys.stderr)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    print(f'[metrics] Serving http://{host}:{port}/metrics', file=sys.stderr)
+    return server
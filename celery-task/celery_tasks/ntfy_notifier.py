@@ -4,6 +4,12 @@ ntfy 通知模块
 """
 
 import os
+import sys
+import time
+import heapq
+import queue
+import atexit
+import threading
 import requests
 from pathlib import Path
 from datetime import datetime
@@ -18,6 +24,21 @@ class NtfyNotifier:
         'server': 'http://127.0.0.1',  # ntfy 服务器地址
         'topic': 'celery-tasks',   # 默认主题
         'priority': 3,             # 默认优先级 (1-5)
+        'async': True,             # 是否由后台线程异步发送
+        'queue_size': 1000,        # 本地通知队列容量
+        'max_retries': 3,          # 发送失败重试次数
+        'retry_backoff': 1.0,      # 重试退避基数（秒，指数增长）
+        'timeout': 5,              # 单次请求超时（秒）
+        'digest': {},              # 汇总模式配置（见 DEFAULT_DIGEST_CONFIG）
+    }
+
+    # 汇总模式默认配置
+    DEFAULT_DIGEST_CONFIG = {
+        'enabled': False,          # 是否按时间窗口汇总任务完成通知
+        'window': 60,              # 汇总时间窗口（秒）
+        'immediate_priority': 5,   # 优先级不低于该值的通知仍立即发送（失败为 5）
+        'slowest': 5,              # 汇总中列出的最慢任务数
+        'failed_samples': 5,       # 汇总中列出的失败任务数
     }
 
     # 配置文件路径
@@ -27,6 +48,9 @@ class NtfyNotifier:
         """初始化通知器"""
         self.config = self.DEFAULT_CONFIG.copy()
         self._load_config()
+        self._session = None
+        self._sender = None
+        self._digest = None
 
     def _load_config(self):
         """加载配置文件"""
@@ -44,19 +68,85 @@ class NtfyNotifier:
                 # 配置文件读取失败，使用默认配置
                 pass
 
+        # 环境变量可临时开关通知（如基准测试时关闭）
+        enabled = os.environ.get('CELERY_TASK_NTFY_ENABLED')
+        if enabled is not None:
+            self.config['enabled'] = enabled.lower() in ('1', 'true', 'yes')
+
     def is_enabled(self):
         """检查通知是否启用"""
         return self.config.get('enabled', False)
 
+    def digest_config(self):
+        """获取汇总模式配置（与默认值合并）"""
+        config = self.DEFAULT_DIGEST_CONFIG.copy()
+        config.update(self.config.get('digest') or {})
+        return config
+
+    def _get_digest(self):
+        """获取汇总器（fork 后的子进程会重新创建）"""
+        if self._digest is None or self._digest.pid != os.getpid():
+            self._digest = DigestCollector(self, self.digest_config())
+        return self._digest
+
+    def is_async(self):
+        """检查是否使用后台线程异步发送"""
+        return bool(self.config.get('async', True))
+
+    def _get_session(self):
+        """获取复用连接的 HTTP Session（keep-alive 连接池）"""
+        if self._session is None:
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+        return self._session
+
+    def _get_sender(self):
+        """获取后台发送线程（fork 后的子进程会重新创建）"""
+        if self._sender is None or self._sender.pid != os.getpid():
+            self._session = None
+            self._sender = NotificationSender(self)
+        return self._sender
+
     def send(self, title, message, priority=None, topic=None):
         """
         发送通知
 
+        异步模式下只把通知放入本地队列（由后台线程发送），调用方不等待网络请求。
+
+        Args:
+            title (str): 通知标题
+            message (str): 通知内容
+            priority (int, optional): 优先级 (1-5)
+            topic (str, optional): 主题名称
+
+        Returns:
+            bool: 发送（或入队）是否成功
+        """
+        if not self.is_enabled():
+            return False
+
+        if self.is_async():
+            return self._get_sender().enqueue(title, message, priority, topic)
+
+        start = time.monotonic()
+        sent = self.send_now(title, message, priority, topic)
+        observe_latency(time.monotonic() - start, sent)
+        return sent
+
+    def send_now(self, title, message, priority=None, topic=None, retries=0):
+        """
+        同步发送通知
+
         Args:
             title (str): 通知标题
             message (str): 通知内容
             priority (int, optional): 优先级 (1-5)
             topic (str, optional): 主题名称
+            retries (int): 失败后的重试次数（指数退避）
 
         Returns:
             bool: 发送是否成功
@@ -64,6 +154,31 @@ class NtfyNotifier:
         if not self.is_enabled():
             return False
 
+        backoff = self.retry_backoff()
+        for attempt in range(retries + 1):
+            try:
+                self.post(title, message, priority, topic)
+                return True
+            except Exception as e:
+                # 发送失败不影响任务执行
+                if attempt < retries:
+                    time.sleep(backoff * (2 ** attempt))
+                else:
+                    print(f'[ntfy] Send failed after {attempt + 1} attempt(s): {e}',
+                          file=sys.stderr)
+        return False
+
+    def retry_backoff(self):
+        """重试退避基数（秒，第 n 次重试前等待 基数 × 2^n）"""
+        return float(self.config.get('retry_backoff', 1.0))
+
+    def post(self, title, message, priority=None, topic=None):
+        """
+        发送一次通知请求（不重试）
+
+        Raises:
+            Exception: 请求失败或服务端返回错误状态
+        """
         # 使用配置的优先级和主题
         priority = priority or self.config.get('priority', 3)
         topic = topic or self.config.get('topic', 'celery-tasks')
@@ -82,19 +197,22 @@ class NtfyNotifier:
         if priority:
             headers["Priority"] = str(priority)
 
-        try:
-            # 发送纯文本消息
-            response = requests.post(
-                f"{server}/{topic}",
-                data=full_message,
-                headers=headers,
-                timeout=5
-            )
-            response.raise_for_status()
-            return True
-        except Exception:
-            # 发送失败不影响任务执行
-            return False
+        # 发送纯文本消息（复用 keep-alive 连接）
+        response = self._get_session().post(
+            f"{server}/{topic}",
+            data=full_message.encode('utf-8'),
+            headers=headers,
+            timeout=self.config.get('timeout', 5)
+        )
+        response.raise_for_status()
+
+    def flush(self, timeout=10):
+        """发出当前汇总并等待队列中的通知发送完成"""
+        if self._digest is not None and self._digest.pid == os.getpid():
+            self._digest.flush()
+        if self._sender is not None and self._sender.pid == os.getpid():
+            return self._sender.flush(timeout)
+        return True
 
     def notify_task_complete(self, task_name, command, result):
         """
@@ -122,6 +240,13 @@ class NtfyNotifier:
             title = "❌ 任务失败"
             priority = 5
 
+        # 汇总模式：计入当前时间窗口，只有高优先级通知（默认为失败）仍立即发送
+        digest_config = self.digest_config()
+        if digest_config.get('enabled'):
+            self._get_digest().add(task_name, command, result)
+            if priority < int(digest_config.get('immediate_priority', 5)):
+                return True
+
         # 构建消息内容（截断输出为200字符）
         message = f"""任务: {task_name}
 命令: {command}
@@ -170,6 +295,223 @@ class NtfyNotifier:
         return self.send(title, message, priority=3)
 
 
+class DigestCollector:
+    """
+    任务完成通知汇总器
+
+    在时间窗口内累计成功/失败数量和耗时，窗口结束时发送一条汇总通知，
+    避免大批量任务逐条推送触发 ntfy 服务端限流。
+    """
+
+    def __init__(self, notifier, config):
+        """
+        初始化汇总器
+
+        Args:
+            notifier (NtfyNotifier): 用于发送汇总的通知器
+            config (dict): 汇总模式配置
+        """
+        self.notifier = notifier
+        self.pid = os.getpid()
+        self.window = max(1, float(config.get('window', 60)))
+        self.slowest_count = int(config.get('slowest', 5))
+        self.failed_samples = int(config.get('failed_samples', 5))
+        self._lock = threading.Lock()
+        self._reset()
+        self._thread = threading.Thread(target=self._run, name='ntfy-digest', daemon=True)
+        self._thread.start()
+
+    def _reset(self):
+        """开始新的时间窗口"""
+        self.window_start = datetime.now()
+        self.task_names = set()
+        self.ok = 0
+        self.failed = 0
+        self.total_duration = 0.0
+        self.slowest = []          # (duration, command) 小顶堆
+        self.failures = []         # (returncode, command)
+
+    def add(self, task_name, command, result):
+        """记录一个完成的任务"""
+        duration = float(result.get('duration') or 0)
+        with self._lock:
+            self.task_names.add(task_name)
+            self.total_duration += duration
+            if result.get('success', False):
+                self.ok += 1
+            else:
+                self.failed += 1
+                if len(self.failures) < self.failed_samples:
+                    self.failures.append((result.get('returncode'), command))
+
+            entry = (duration, command)
+            if len(self.slowest) < self.slowest_count:
+                heapq.heappush(self.slowest, entry)
+            elif self.slowest and entry > self.slowest[0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def _run(self):
+        """后台循环：每个时间窗口结束时发送汇总"""
+        while True:
+            time.sleep(self.window)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f'[ntfy] Digest error: {e}', file=sys.stderr)
+
+    def flush(self):
+        """
+        发送当前窗口的汇总（窗口内没有任务时不发送）
+
+        Returns:
+            bool: 是否发送（或入队）成功
+        """
+        with self._lock:
+            total = self.ok + self.failed
+            if total == 0:
+                self._reset()
+                return False
+            window_start = self.window_start
+            task_names = sorted(self.task_names)
+            ok, failed = self.ok, self.failed
+            total_duration = self.total_duration
+            slowest = sorted(self.slowest, reverse=True)
+            failures = list(self.failures)
+            self._reset()
+
+        window_end = datetime.now()
+        message = f"""时间窗口: {window_start.strftime('%H:%M:%S')} - {window_end.strftime('%H:%M:%S')}
+任务: {', '.join(task_names)}
+完成: {total:,}（✅ {ok:,} 成功 / ❌ {failed:,} 失败）
+平均耗时: {total_duration / total:.3f}秒"""
+
+        if slowest:
+            message += f"\n\n🐢 最慢的 {len(slowest)} 个任务:"
+            for duration, command in slowest:
+                message += f"\n{duration:.3f}秒  {command[:80]}"
+
+        if failures:
+            message += f"\n\n❌ 失败示例:"
+            for returncode, command in failures:
+                message += f"\n返回码 {returncode}  {command[:80]}"
+
+        title = "📊 任务汇总"
+        priority = 4 if failed else 2
+        return self.notifier.send(title, message, priority)
+
+
+class NotificationSender:
+    """
+    后台通知发送线程
+
+    任务只把通知放入本地队列，由守护线程逐条取出，通过同一个 keep-alive Session 发送。
+    ntfy 每个请求只发布一条消息，没有批量接口（合并通知见汇总模式）。
+    发送失败的通知按指数退避排入重试队列，等待重试期间继续发送后面的通知。
+    """
+
+    def __init__(self, notifier):
+        """
+        初始化发送线程
+
+        Args:
+            notifier (NtfyNotifier): 用于实际发送的通知器
+        """
+        self.notifier = notifier
+        self.pid = os.getpid()
+        self.max_retries = int(notifier.config.get('max_retries', 3))
+        self.queue = queue.Queue(maxsize=int(notifier.config.get('queue_size', 1000)))
+        self.dropped = 0
+        # 等待重试的通知：(重试时间, 序号, 通知, 已尝试次数) 小顶堆，只由发送线程访问
+        self._retries = []
+        self._retry_seq = 0
+        self._thread = threading.Thread(target=self._run, name='ntfy-sender', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def enqueue(self, title, message, priority=None, topic=None):
+        """
+        通知入队（不阻塞）
+
+        Returns:
+            bool: 是否入队成功（队列已满时丢弃）
+        """
+        try:
+            self.queue.put_nowait((title, message, priority, topic, time.monotonic()))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f'[ntfy] Queue full, notification dropped (total {self.dropped})',
+                  file=sys.stderr)
+            return False
+
+    def _run(self):
+        """后台循环：先发送到期的重试，再等待新通知（最多等到下一次重试）"""
+        while True:
+            now = time.monotonic()
+            if self._retries and self._retries[0][0] <= now:
+                _, _, item, attempts = heapq.heappop(self._retries)
+                self._attempt(item, attempts)
+                continue
+
+            timeout = self._retries[0][0] - now if self._retries else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            self._attempt(item, 0)
+
+    def _attempt(self, item, attempts):
+        """
+        发送一条通知；失败且未用完重试次数时排入重试队列，否则结束该通知
+
+        Args:
+            item (tuple): (title, message, priority, topic, 入队时间)
+            attempts (int): 之前已尝试的次数
+        """
+        title, message, priority, topic, enqueued_at = item
+        try:
+            self.notifier.post(title, message, priority, topic)
+            sent = True
+        except Exception as e:
+            if attempts < self.max_retries:
+                delay = self.notifier.retry_backoff() * (2 ** attempts)
+                self._retry_seq += 1
+                heapq.heappush(self._retries,
+                               (time.monotonic() + delay, self._retry_seq, item, attempts + 1))
+                return
+            print(f'[ntfy] Send failed after {attempts + 1} attempt(s): {e}', file=sys.stderr)
+            sent = False
+
+        observe_latency(time.monotonic() - enqueued_at, sent)
+        self.queue.task_done()
+
+    def flush(self, timeout=10):
+        """
+        等待队列清空，包括等待重试的通知（进程退出前调用）
+
+        Returns:
+            bool: 是否在超时前全部发送
+        """
+        if self.pid != os.getpid():
+            return True
+        deadline = time.time() + timeout
+        while self.queue.unfinished_tasks:
+            if time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+
+def observe_latency(seconds, sent):
+    """记录通知从入队（或开始发送）到发送完成的耗时指标"""
+    try:
+        from celery_tasks import metrics
+        metrics.record((metrics.observe, 'notification_latency_seconds', seconds,
+                        {'result': 'sent' if sent else 'failed'}))
+    except ImportError:
+        pass
+
+
 # 全局单例
 _notifier = None
 
@@ -0,0 +1,173 @@
+"""
+命令输出流模块
+将子进程的输出分块写入 Redis Stream（按任务 ID 区分），
+供 dispatch.py --follow 实时查看
+"""
+
+import sys
+import codecs
+import threading
+from collections import deque
+
+from celery_tasks.redis_client import KEY_PREFIX, get_redis
+
+
+# Redis Stream 键前缀
+STREAM_KEY_PREFIX = KEY_PREFIX + 'output:'
+
+# 每个任务最多保留的输出分块数（近似裁剪）
+STREAM_MAXLEN = 10000
+
+# 输出流结束后的过期时间（秒）
+STREAM_EXPIRE = 3600
+
+# 任务执行期间输出流的过期时间（秒，每次写入时刷新；
+# Worker 被强制终止、没有写入结束标记时由它回收输出流）
+STREAM_RUNNING_EXPIRE = 86400
+
+# 每次从管道读取的最大字节数
+READ_CHUNK_SIZE = 8192
+
+# 内存中保留的输出尾部长度（字符，用于结果预览）
+TAIL_CHARS = 64 * 1024
+
+
+def stream_key(task_id):
+    """获取任务输出流的 Redis 键"""
+    return f'{STREAM_KEY_PREFIX}{task_id}'
+
+
+class TailBuffer:
+    """只保留最近 max_chars 个字符的输出缓冲区"""
+
+    def __init__(self, max_chars=TAIL_CHARS):
+        self.max_chars = max_chars
+        self.total_chars = 0
+        self._chunks = deque()
+        self._size = 0
+
+    def append(self, text):
+        """追加输出，超出上限时丢弃最旧的部分"""
+        self._chunks.append(text)
+        self._size += len(text)
+        self.total_chars += len(text)
+        while self._size > self.max_chars and len(self._chunks) > 1:
+            self._size -= len(self._chunks.popleft())
+
+    def getvalue(self):
+        """获取保留的输出"""
+        return ''.join(self._chunks)[-self.max_chars:]
+
+
+class OutputStreamPublisher:
+    """将输出分块发布到 Redis Stream"""
+
+    def __init__(self, task_id, client=None):
+        """
+        初始化发布器
+
+        Args:
+            task_id (str): 任务 ID
+            client (redis.Redis, optional): Redis 客户端
+        """
+        self.key = stream_key(task_id)
+        self.client = client or get_redis()
+        self.enabled = True
+        self._lock = threading.Lock()
+
+    def _xadd(self, fields, expire=STREAM_RUNNING_EXPIRE):
+        """
+        写入一条记录并刷新过期时间，Redis 不可用时停止发布（不影响任务执行）
+
+        XADD 与 EXPIRE 在同一个管道中发送（一次往返），
+        输出流从第一次写入起就带有过期时间。
+        """
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                pipe = self.client.pipeline(transaction=False)
+                pipe.xadd(self.key, fields,
+                          maxlen=STREAM_MAXLEN, approximate=True)
+                pipe.expire(self.key, expire)
+                pipe.execute()
+        except Exception as e:
+            self.enabled = False
+            print(f'[stream] Publish error: {e}', file=sys.stderr)
+
+    def publish(self, name, data):
+        """发布一段输出（name 为 stdout 或 stderr）"""
+        self._xadd({'stream': name, 'data': data})
+
+    def close(self, returncode):
+        """发布结束标记并缩短过期时间"""
+        self._xadd({'event': 'eof', 'returncode': str(returncode)},
+                   expire=STREAM_EXPIRE)
+
+
+def pump_pipe(pipe, name, encoding, publisher, tail, spool=None):
+    """
+    增量读取管道并发布输出（在线程中运行）
+
+    Args:
+        pipe: 子进程的二进制输出管道
+        name (str): stdout 或 stderr
+        encoding (str): 输出编码
+        publisher (OutputStreamPublisher): 输出流发布器
+        tail (TailBuffer): 输出尾部缓冲区
+        spool (file, optional): 同时写入原始字节的临时文件（用于保存完整输出）
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    try:
+        while True:
+            data = pipe.read1(READ_CHUNK_SIZE)
+            if not data:
+                break
+            if spool is not None:
+                spool.write(data)
+            text = decoder.decode(data)
+            if text:
+                tail.append(text)
+                publisher.publish(name, text)
+        text = decoder.decode(b'', final=True)
+        if text:
+            tail.append(text)
+            publisher.publish(name, text)
+    finally:
+        pipe.close()
+
+
+def follow_stream(task_id, is_done=None, block_ms=2000, client=None):
+    """
+    实时读取任务输出流
+
+    Args:
+        task_id (str): 任务 ID
+        is_done (callable, optional): 无新输出时调用，返回 True 表示任务已结束
+            （用于未开启输出流的任务，避免无限等待）
+        block_ms (int): 每次阻塞读取的毫秒数
+        client (redis.Redis, optional): Redis 客户端
+
+    Yields:
+        tuple: (stream, data)，stream 为 stdout/stderr；
+            结束时产出 ('eof', returncode)
+    """
+    client = client or get_redis()
+    key = stream_key(task_id)
+    last_id = '0-0'
+
+    while True:
+        response = client.xread({key: last_id}, block=block_ms, count=500)
+        if not response:
+            if is_done is not None and is_done():
+                return
+            continue
+
+        for entry_id, fields in response[0][1]:
+            last_id = entry_id
+            fields = {k.decode(): v.decode('utf-8', errors='replace')
+                      for k, v in fields.items()}
+            if fields.get('event') == 'eof':
+                yield 'eof', int(fields.get('returncode', 0))
+                return
+            yield fields.get('stream', 'stdout'), fields.get('data', '')
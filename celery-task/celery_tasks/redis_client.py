@@ -0,0 +1,34 @@
+"""
+Redis 客户端工具
+为技能的辅助功能（输出流等）提供共享的 Redis 连接
+"""
+
+from celery_tasks.settings import RESULT_BACKEND
+
+# 辅助数据与任务结果存放在同一个 Redis 库（结果后端）
+REDIS_URL = RESULT_BACKEND
+
+# 技能使用的 Redis 键统一前缀
+KEY_PREFIX = 'celery_task:'
+
+# 按 URL 缓存的客户端（redis-py 连接池在 fork 后会自动重建连接）
+_clients = {}
+
+
+def get_redis(url=None):
+    """
+    获取 Redis 客户端
+
+    Args:
+        url (str, optional): Redis 地址，默认使用结果后端所在的库
+
+    Returns:
+        redis.Redis: 复用连接池的客户端
+    """
+    url = url or REDIS_URL
+    client = _clients.get(url)
+    if client is None:
+        import redis
+        client = redis.Redis.from_url(url)
+        _clients[url] = client
+    return client
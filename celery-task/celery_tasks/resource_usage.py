@@ -0,0 +1,160 @@
+"""
+任务资源统计模块
+通过 os.wait4 回收子进程，取得整个子进程树（子进程及其已回收的后代）的 rusage：
+CPU 用户态/内核态时间、峰值 RSS、块设备 I/O 和上下文切换次数。
+统计结果写入任务结果的 resources 字段，并按命令前缀累计到 Redis，供 scripts/report.py usage 汇总
+（环境变量 CELERY_TASK_USAGE=0 关闭累计）。
+
+注意：Linux 在 exec 时会保留 fork 出的进程此前的 RSS 峰值，因此 max_rss_kb 的下限
+约等于 Worker 进程自身的 RSS；只有超过这个值时才反映命令本身的内存占用
+"""
+
+import os
+import signal
+import platform
+import threading
+import subprocess
+
+from celery_tasks.redis_client import KEY_PREFIX, get_redis
+
+
+# 是否按命令前缀累计资源统计（设为 0 关闭；结果中的 resources 字段不受影响）
+USAGE_ENABLED = os.environ.get('CELERY_TASK_USAGE', '1').lower() not in ('0', 'false', 'no')
+
+# 按命令前缀累计的资源统计（Hash，每个前缀一个）
+USAGE_KEY_PREFIX = KEY_PREFIX + 'usage:'
+
+# 已出现的命令前缀集合
+USAGE_INDEX_KEY = KEY_PREFIX + 'usage_index'
+
+# 各命令前缀的峰值 RSS（ZSET，分数为 KB）
+USAGE_MAX_RSS_KEY = KEY_PREFIX + 'usage_max_rss'
+
+# 累计的数值字段
+USAGE_FIELDS = (
+    'count', 'wall', 'cpu_user', 'cpu_system',
+    'block_in', 'block_out', 'ctx_voluntary', 'ctx_involuntary',
+)
+
+# 当前平台是否支持 wait4（Windows 不支持，此时不统计资源）
+HAS_WAIT4 = hasattr(os, 'wait4')
+
+
+def usage_from_rusage(ru):
+    """把 resource.struct_rusage 转换为结果字段"""
+    # ru_maxrss 在 Linux 上以 KB 为单位，macOS 上以字节为单位
+    max_rss = ru.ru_maxrss // 1024 if platform.system() == 'Darwin' else ru.ru_maxrss
+    return {
+        'cpu_user': round(ru.ru_utime, 3),
+        'cpu_system': round(ru.ru_stime, 3),
+        'max_rss_kb': max_rss,
+        'block_in': ru.ru_inblock,
+        'block_out': ru.ru_oublock,
+        'ctx_voluntary': ru.ru_nvcsw,
+        'ctx_involuntary': ru.ru_nivcsw,
+    }
+
+
+def wait_with_usage(process, timeout=None):
+    """
+    等待子进程退出并取得资源统计
+
+    超时由定时器直接向子进程发送 SIGKILL；定时器与 wait4 之间用锁保护，
+    子进程被回收后不会再向（可能已被复用的）PID 发信号。
+
+    Args:
+        process (subprocess.Popen): 子进程
+        timeout (float, optional): 超时时间（秒）
+
+    Returns:
+        tuple: (返回码, 资源统计 dict 或 None)
+
+    Raises:
+        subprocess.TimeoutExpired: 超时（子进程已被终止并回收）
+    """
+    if not HAS_WAIT4:
+        return process.wait(timeout=timeout), None
+
+    lock = threading.Lock()
+    state = {'reaped': False, 'expired': False}
+
+    def kill():
+        with lock:
+            if not state['reaped']:
+                state['expired'] = True
+                os.kill(process.pid, signal.SIGKILL)
+
+    timer = None
+    if timeout is not None:
+        timer = threading.Timer(timeout, kill)
+        timer.daemon = True
+        timer.start()
+
+    try:
+        _, status, ru = os.wait4(process.pid, 0)
+    finally:
+        if timer is not None:
+            timer.cancel()
+
+    with lock:
+        state['reaped'] = True
+    # 告知 Popen 子进程已回收，避免之后的 wait()/poll() 再次 waitpid
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    if state['expired']:
+        raise subprocess.TimeoutExpired(process.args, timeout)
+    return process.returncode, usage_from_rusage(ru)
+
+
+def record_usage(pipe, prefix, duration, usage):
+    """
+    按命令前缀累计资源统计（写入 pipeline，由调用方 execute）
+
+    Args:
+        pipe: Redis pipeline
+        prefix (str): 命令前缀
+        duration (float): 执行耗时（秒）
+        usage (dict): 资源统计
+    """
+    key = USAGE_KEY_PREFIX + prefix
+    values = dict(usage, count=1, wall=duration)
+    for field in USAGE_FIELDS:
+        pipe.hincrbyfloat(key, field, values.get(field) or 0)
+    pipe.sadd(USAGE_INDEX_KEY, prefix)
+    pipe.zadd(USAGE_MAX_RSS_KEY, {prefix: usage.get('max_rss_kb') or 0}, gt=True)
+
+
+def read_usage(client=None):
+    """
+    读取全部命令前缀的累计资源统计
+
+    Returns:
+        list[dict]: 每个前缀一项（prefix、USAGE_FIELDS、max_rss_kb）
+    """
+    client = client or get_redis()
+    prefixes = sorted(p.decode() for p in client.smembers(USAGE_INDEX_KEY))
+    if not prefixes:
+        return []
+
+    with client.pipeline(transaction=False) as pipe:
+        for prefix in prefixes:
+            pipe.hgetall(USAGE_KEY_PREFIX + prefix)
+        totals = pipe.execute()
+    max_rss = {m.decode(): s for m, s in client.zrange(USAGE_MAX_RSS_KEY, 0, -1, withscores=True)}
+
+    rows = []
+    for prefix, values in zip(prefixes, totals):
+        row = {'prefix': prefix, 'max_rss_kb': int(max_rss.get(prefix, 0))}
+        for field in USAGE_FIELDS:
+            row[field] = float(values.get(field.encode(), 0))
+        rows.append(row)
+    return rows
+
+
+def reset_usage(client=None):
+    """清空累计的资源统计"""
+    client = client or get_redis()
+    prefixes = [p.decode() for p in client.smembers(USAGE_INDEX_KEY)]
+    keys = [USAGE_KEY_PREFIX + p for p in prefixes] + [USAGE_INDEX_KEY, USAGE_MAX_RSS_KEY]
+    client.delete(*keys)
+    return len(prefixes)
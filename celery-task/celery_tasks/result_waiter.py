@@ -0,0 +1,234 @@
+"""
+批量结果等待模块
+基于 asyncio 和 Redis pub/sub 同时等待大量任务结果：
+Redis 结果后端在写入结果时会向 celery-task-meta-<task_id> 频道发布同样的内容，
+订阅这些频道即可在任务完成时立即收到结果，无需逐个轮询
+"""
+
+import time
+import asyncio
+
+from celery_tasks.settings import RESULT_BACKEND
+
+
+# Celery Redis 结果后端的键/频道前缀
+TASK_META_PREFIX = 'celery-task-meta-'
+
+# 任务结束状态
+READY_STATES = frozenset({'SUCCESS', 'FAILURE', 'REVOKED'})
+
+# 每条 SUBSCRIBE/MGET 命令包含的任务数
+CHUNK_SIZE = 1000
+
+
+def decode_meta(payload):
+    """解码结果后端中的任务元数据（按 CELERY_TASK_SERIALIZATION 配置）"""
+    from celery_tasks.serialization import decode
+    return decode(payload)
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    """按固定大小切分列表"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+async def wait_for_results(task_ids, timeout=None, on_result=None, url=None):
+    """
+    并发等待一组任务完成
+
+    先订阅全部结果频道，再用 MGET 读取已经完成的任务（避免订阅前完成的任务被漏掉），
+    之后只需等待 pub/sub 推送。
+
+    Args:
+        task_ids (list[str]): 任务 ID 列表
+        timeout (float, optional): 整体超时（秒），None 表示一直等待
+        on_result (callable, optional): 每个任务完成时调用 on_result(task_id, meta, elapsed)
+        url (str, optional): 结果后端地址
+
+    Returns:
+        dict: {task_id: meta}，超时未完成的任务不在其中
+    """
+    import redis.asyncio as aioredis
+
+    pending = set(task_ids)
+    results = {}
+    start = time.monotonic()
+    client = aioredis.Redis.from_url(url or RESULT_BACKEND)
+    pubsub = client.pubsub()
+
+    def handle(task_id, payload):
+        if task_id not in pending or payload is None:
+            return
+        meta = decode_meta(payload)
+        if meta.get('status') not in READY_STATES:
+            return
+        pending.discard(task_id)
+        results[task_id] = meta
+        if on_result is not None:
+            on_result(task_id, meta, time.monotonic() - start)
+
+    try:
+        ids = list(pending)
+        for chunk in _chunks(ids):
+            await pubsub.subscribe(*[TASK_META_PREFIX + task_id for task_id in chunk])
+
+        for chunk in _chunks(ids):
+            values = await client.mget([TASK_META_PREFIX + task_id for task_id in chunk])
+            for task_id, payload in zip(chunk, values):
+                handle(task_id, payload)
+
+        while pending:
+            remaining = None
+            if timeout is not None:
+                remaining = timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    break
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=min(remaining, 1.0) if remaining is not None else 1.0,
+            )
+            if message is None or message.get('type') != 'message':
+                continue
+            channel = message['channel']
+            if isinstance(channel, bytes):
+                channel = channel.decode('utf-8')
+            task_id = channel[len(TASK_META_PREFIX):]
+            handle(task_id, message['data'])
+            # 已完成的任务不再需要订阅
+            if task_id not in pending:
+                await pubsub.unsubscribe(channel)
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
+
+    return results
+
+
+def wait_all(task_ids, timeout=None, on_result=None, url=None):
+    """wait_for_results 的同步封装"""
+    return asyncio.run(wait_for_results(task_ids, timeout, on_result, url))
+
+
+class ResultWatcher:
+    """
+    在同一个 pub/sub 连接上持续等待陆续派发的任务（压测等长时间运行的场景）
+
+    用法：
+        watcher = ResultWatcher()
+        future = await watcher.watch(task_id)   # 先订阅，再派发任务
+        meta = await future
+        await watcher.close()
+    """
+
+    def __init__(self, url=None):
+        self.url = url or RESULT_BACKEND
+        self._client = None
+        self._pubsub = None
+        self._lock = None
+        self._reader = None
+        self._closing = False
+        self._futures = {}
+        self._confirms = {}
+
+    async def watch(self, task_id, check=True):
+        """
+        订阅任务结果
+
+        Args:
+            task_id (str): 任务 ID
+            check (bool): 订阅后是否读取一次已有结果（任务可能在订阅前已派发并完成）
+
+        Returns:
+            asyncio.Future: 任务结束时返回元数据
+        """
+        import redis.asyncio as aioredis
+
+        if self._client is None:
+            self._client = aioredis.Redis.from_url(self.url)
+            self._pubsub = self._client.pubsub()
+            self._lock = asyncio.Lock()
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        confirmed = loop.create_future()
+        channel = TASK_META_PREFIX + task_id
+        self._futures[task_id] = future
+        self._confirms[channel] = confirmed
+        # 串行订阅：并发的首次订阅会各自建立连接，只有最后一个连接会被读取
+        async with self._lock:
+            await self._pubsub.subscribe(channel)
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read())
+        # 等待服务端确认订阅，之后派发的任务不会错过完成推送
+        await confirmed
+
+        if check and self._resolve(task_id, await self._client.get(TASK_META_PREFIX + task_id)):
+            await self._pubsub.unsubscribe(TASK_META_PREFIX + task_id)
+        return future
+
+    async def refresh(self):
+        """用 MGET 读取全部未结束任务的结果（补上错过推送的任务）"""
+        ids = list(self._futures)
+        for chunk in _chunks(ids):
+            values = await self._client.mget([TASK_META_PREFIX + task_id for task_id in chunk])
+            for task_id, payload in zip(chunk, values):
+                if self._resolve(task_id, payload):
+                    await self._pubsub.unsubscribe(TASK_META_PREFIX + task_id)
+
+    async def forget(self, task_id):
+        """不再等待任务（如派发失败），对应的 Future 由调用方处理"""
+        if self._futures.pop(task_id, None) is not None:
+            await self._pubsub.unsubscribe(TASK_META_PREFIX + task_id)
+
+    @property
+    def pending(self):
+        """尚未结束的任务数"""
+        return len(self._futures)
+
+    def _resolve(self, task_id, payload):
+        """收到结束状态时完成对应的 Future"""
+        future = self._futures.get(task_id)
+        if future is None or payload is None:
+            return False
+        meta = decode_meta(payload)
+        if meta.get('status') not in READY_STATES:
+            return False
+        del self._futures[task_id]
+        if not future.done():
+            future.set_result(meta)
+        return True
+
+    async def _read(self):
+        """读取 pub/sub 推送直到关闭"""
+        while not self._closing:
+            message = await self._pubsub.get_message(timeout=1.0)
+            if message is None:
+                continue
+            channel = message['channel']
+            if isinstance(channel, bytes):
+                channel = channel.decode('utf-8')
+            if message.get('type') == 'subscribe':
+                confirmed = self._confirms.pop(channel, None)
+                if confirmed is not None and not confirmed.done():
+                    confirmed.set_result(True)
+                continue
+            if message.get('type') != 'message':
+                continue
+            task_id = channel[len(TASK_META_PREFIX):]
+            if self._resolve(task_id, message['data']):
+                await self._pubsub.unsubscribe(channel)
+
+    async def close(self):
+        """取消未完成的等待并关闭连接"""
+        # 读取循环在 get_message 超时（1 秒）后退出；取消正在读取的任务可能导致连接无法关闭
+        self._closing = True
+        if self._reader is not None:
+            await self._reader
+        for future in list(self._futures.values()) + list(self._confirms.values()):
+            future.cancel()
+        self._futures.clear()
+        self._confirms.clear()
+        if self._client is not None:
+            await self._pubsub.aclose()
+            await self._client.aclose()
@@ -0,0 +1,49 @@
+"""
+任务路由
+按命令超时时间（预计耗时）把 execute_command 分到不同队列，
+避免长任务占满 Worker 时短命令排在后面等待：
+
+  fast     timeout <= FAST_TIMEOUT 的短命令（由专门的低延迟 Worker 消费）
+  default  其他命令
+  bulk     timeout >= BULK_TIMEOUT 的长任务
+
+派发时显式指定的队列和优先级（dispatch.py --queue/--priority）优先于路由规则。
+未指定优先级的消息会进入 Redis 的最高优先级列表，因此路由时补上默认优先级。
+"""
+
+from celery_tasks.settings import (
+    BULK_QUEUE, BULK_TIMEOUT, DEFAULT_PRIORITY, DEFAULT_QUEUE, FAST_QUEUE, FAST_TIMEOUT
+)
+
+
+def queue_for_timeout(timeout):
+    """
+    根据命令超时时间选择队列
+
+    Args:
+        timeout (int | None): 命令超时时间（秒），None 时按默认值 300 处理
+
+    Returns:
+        str: 队列名称
+    """
+    timeout = 300 if timeout is None else timeout
+    if timeout <= FAST_TIMEOUT:
+        return FAST_QUEUE
+    if timeout >= BULK_TIMEOUT:
+        return BULK_QUEUE
+    return DEFAULT_QUEUE
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """
+    Celery 路由函数（配置为 task_routes）
+
+    Returns:
+        dict | None: 路由选项，None 表示交给默认队列
+    """
+    if name != 'execute_command':
+        return None
+    return {
+        'queue': queue_for_timeout((kwargs or {}).get('timeout')),
+        'priority': DEFAULT_PRIORITY,
+    }
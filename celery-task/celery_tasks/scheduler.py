@@ -0,0 +1,446 @@
+"""
+延迟任务调度器模块
+--delay / --eta 的任务不再以 countdown/eta 直接发布到 Broker：Redis Broker 下 Worker 会预取
+并在内存中持有 ETA 任务，超过 visibility_timeout 后消息还会被重新投递，大量定时任务既占用
+Worker 内存又会重复执行。调度器把延迟任务保存在 Redis 中，到期时才发布到队列：
+
+  celery_task:schedule:due        ZSET  条目 ID → 到期时间戳
+  celery_task:schedule:entries    HASH  条目 ID → 任务描述（JSON：任务名、参数、派发选项、cron）
+  celery_task:schedule:inflight   ZSET  已领取、尚未确认发布的条目 → 租约到期时间
+  celery_task:schedule:heartbeat  调度器心跳（派发端据此决定是否使用调度器）
+
+到期条目由 Lua 脚本原子地从 due 移到 inflight（可同时运行多个调度器），发布后确认：一次性
+条目删除，cron 条目按表达式写回下一次的到期时间。调度器在领取后、确认前退出时，租约到期的
+条目重新放回 due（至少发布一次）。数据都在 Redis 中，调度器重启后继续调度；每轮只读取
+已到期的条目和最早的到期时间（O(log n)），十万级待调度条目的开销很小。
+
+一次性条目的 ID 即任务 ID，派发后可以直接用 --task-id 查询；cron 条目每次触发生成新的任务 ID。
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from celery_tasks.redis_client import KEY_PREFIX, get_redis
+from celery_tasks.settings import CELERY_CONFIG
+
+
+# 到期时间有序集合
+DUE_KEY = KEY_PREFIX + 'schedule:due'
+
+# 条目描述
+ENTRIES_KEY = KEY_PREFIX + 'schedule:entries'
+
+# 已领取未确认的条目（分数为租约到期时间）
+INFLIGHT_KEY = KEY_PREFIX + 'schedule:inflight'
+
+# 唤醒调度器的列表（新增条目时推入，调度器 BLPOP 等待）
+WAKE_KEY = KEY_PREFIX + 'schedule:wake'
+
+# 调度器心跳键
+HEARTBEAT_KEY = KEY_PREFIX + 'schedule:heartbeat'
+
+# 心跳刷新间隔与过期时间（秒）
+HEARTBEAT_INTERVAL = 2
+HEARTBEAT_TTL = 10
+
+# 每次领取的最大条目数
+CLAIM_BATCH = 500
+
+# 领取后确认发布的租约（秒），超时未确认的条目重新调度
+CLAIM_LEASE = 60
+
+# 没有即将到期的条目时的最长等待（秒，同时决定停止和心跳的响应速度）
+IDLE_WAIT = 1.0
+
+# 写入条目时每个命令包含的条目数
+WRITE_CHUNK = 1000
+
+# 是否让 --delay/--eta 使用调度器（设为 0 时总是使用 Celery countdown/eta）
+SCHEDULER_ENABLED = os.environ.get('CELERY_TASK_SCHEDULER', '1').lower() not in ('0', 'false', 'no')
+
+# cron 表达式使用的时区（与 Celery 配置一致）
+TIMEZONE = ZoneInfo(CELERY_CONFIG['timezone'])
+
+# 领取到期条目：due → inflight，返回 [ID, 描述, 到期时间, ...]
+CLAIM_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[3])
+local claimed = {}
+for i = 1, #ids, 2 do
+    local id = ids[i]
+    redis.call('ZREM', KEYS[1], id)
+    local payload = redis.call('HGET', KEYS[3], id)
+    if payload then
+        redis.call('ZADD', KEYS[2], ARGV[2], id)
+        table.insert(claimed, id)
+        table.insert(claimed, payload)
+        table.insert(claimed, ids[i + 1])
+    end
+end
+return claimed
+"""
+
+# cron 条目发布后写回下一次的到期时间（已被取消的条目不再写回）：ARGV 为 ID、时间交替
+RESCHEDULE_SCRIPT = """
+local count = 0
+for i = 1, #ARGV, 2 do
+    if redis.call('ZREM', KEYS[2], ARGV[i]) == 1 and redis.call('HEXISTS', KEYS[3], ARGV[i]) == 1 then
+        redis.call('ZADD', KEYS[1], ARGV[i + 1], ARGV[i])
+        count = count + 1
+    end
+end
+return count
+"""
+
+# 租约到期的条目放回 due（调度器在发布前后退出）
+REQUEUE_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, id in ipairs(ids) do
+    redis.call('ZREM', KEYS[1], id)
+    if redis.call('HEXISTS', KEYS[3], id) == 1 then
+        redis.call('ZADD', KEYS[2], ARGV[1], id)
+    end
+end
+return #ids
+"""
+
+
+def read_heartbeat(client=None):
+    """
+    读取调度器心跳
+
+    Returns:
+        dict | None: 心跳内容，调度器未运行时为 None
+    """
+    client = client or get_redis()
+    payload = client.get(HEARTBEAT_KEY)
+    if not payload:
+        return None
+    heartbeat = json.loads(payload)
+    if time.time() - heartbeat.get('timestamp', 0) > HEARTBEAT_TTL:
+        return None
+    return heartbeat
+
+
+def signature_entry(signature, due, entry_id=None, cron=None):
+    """
+    把任务签名转换为调度条目
+
+    Args:
+        signature: Celery 签名（任务名、参数、派发选项）
+        due (float): 到期时间戳
+        entry_id (str, optional): 条目 ID（一次性条目即任务 ID），默认取签名的 task_id 或新生成
+        cron (str, optional): cron 表达式（周期条目）
+
+    Returns:
+        dict: 调度条目
+    """
+    options = {
+        k: v for k, v in signature.options.items()
+        if k in ('queue', 'priority', 'routing_key', 'exchange', 'expires') and v is not None
+    }
+    entry = {
+        'id': entry_id or signature.options.get('task_id') or str(uuid.uuid4()),
+        'due': due,
+        'task': signature.task,
+        'args': list(signature.args),
+        'kwargs': dict(signature.kwargs),
+        'options': options,
+        'created': time.time(),
+    }
+    if cron:
+        entry['cron'] = cron
+    return entry
+
+
+def add_entries(entries, client=None):
+    """
+    写入调度条目并唤醒调度器
+
+    Args:
+        entries (list[dict]): signature_entry 的返回值
+        client (redis.Redis, optional): Redis 客户端
+
+    Returns:
+        list[str]: 条目 ID
+    """
+    client = client or get_redis()
+    with client.pipeline(transaction=True) as pipe:
+        for i in range(0, len(entries), WRITE_CHUNK):
+            chunk = entries[i:i + WRITE_CHUNK]
+            pipe.hset(ENTRIES_KEY, mapping={
+                entry['id']: json.dumps(entry, ensure_ascii=False, default=str) for entry in chunk
+            })
+            pipe.zadd(DUE_KEY, {entry['id']: entry['due'] for entry in chunk})
+        pipe.lpush(WAKE_KEY, 1)
+        pipe.ltrim(WAKE_KEY, 0, 0)
+        pipe.execute()
+    return [entry['id'] for entry in entries]
+
+
+def next_cron_time(expr, after=None):
+    """
+    计算 cron 表达式在 after 之后的下一次触发时间
+
+    Args:
+        expr (str): 五段式 cron 表达式（分 时 日 月 周），按 Celery 配置的时区解释
+        after (float, optional): 时间戳，默认当前时间
+
+    Returns:
+        int: 下一次触发的时间戳
+
+    Raises:
+        ValueError: 表达式无效
+    """
+    from celery.schedules import crontab
+
+    schedule = crontab.from_string(expr)
+    now = datetime.now(TIMEZONE)
+    schedule.nowfun = lambda: now
+    last = datetime.fromtimestamp(after if after is not None else now.timestamp(), TIMEZONE)
+    return round((now + schedule.remaining_estimate(last)).timestamp())
+
+
+def add_cron(signature, expr, entry_id=None, client=None):
+    """
+    添加 cron 周期条目
+
+    Returns:
+        dict: 调度条目（due 为第一次触发时间）
+
+    Raises:
+        ValueError: 表达式无效
+    """
+    entry = signature_entry(signature, next_cron_time(expr), entry_id=entry_id, cron=expr)
+    add_entries([entry], client=client)
+    return entry
+
+
+def cancel(entry_id, client=None):
+    """
+    取消调度条目
+
+    Returns:
+        bool: 条目存在并已删除
+    """
+    client = client or get_redis()
+    with client.pipeline(transaction=True) as pipe:
+        pipe.zrem(DUE_KEY, entry_id)
+        pipe.zrem(INFLIGHT_KEY, entry_id)
+        pipe.hdel(ENTRIES_KEY, entry_id)
+        _, _, deleted = pipe.execute()
+    return bool(deleted)
+
+
+def list_entries(limit=20, cron_only=False, client=None):
+    """
+    按到期时间列出待调度的条目
+
+    Args:
+        limit (int): 最大条数
+        cron_only (bool): 只列出 cron 条目（需要遍历全部条目）
+
+    Returns:
+        list[dict]: 调度条目（最早到期的在前）
+    """
+    client = client or get_redis()
+    if cron_only:
+        entries = []
+        for _, payload in client.hscan_iter(ENTRIES_KEY, count=WRITE_CHUNK):
+            entry = json.loads(payload)
+            if entry.get('cron'):
+                entries.append(entry)
+        scores = client.zmscore(DUE_KEY, [entry['id'] for entry in entries]) if entries else []
+        for entry, score in zip(entries, scores):
+            entry['due'] = score
+        entries.sort(key=lambda entry: entry['due'] or float('inf'))
+        return entries[:limit]
+
+    ids = client.zrange(DUE_KEY, 0, limit - 1, withscores=True)
+    if not ids:
+        return []
+    payloads = client.hmget(ENTRIES_KEY, [entry_id for entry_id, _ in ids])
+    entries = []
+    for (entry_id, due), payload in zip(ids, payloads):
+        if payload:
+            entry = json.loads(payload)
+            entry['due'] = due
+            entries.append(entry)
+    return entries
+
+
+def stats(client=None):
+    """
+    调度器统计
+
+    Returns:
+        dict: pending（待调度）、inflight（已领取未确认）、overdue（已到期未发布）、
+            next_due（最早到期时间）、heartbeat（调度器心跳，未运行时为 None）
+    """
+    client = client or get_redis()
+    now = time.time()
+    with client.pipeline(transaction=False) as pipe:
+        pipe.zcard(DUE_KEY)
+        pipe.zcard(INFLIGHT_KEY)
+        pipe.zcount(DUE_KEY, '-inf', now)
+        pipe.zrange(DUE_KEY, 0, 0, withscores=True)
+        pending, inflight, overdue, first = pipe.execute()
+    return {
+        'pending': pending,
+        'inflight': inflight,
+        'overdue': overdue,
+        'next_due': first[0][1] if first else None,
+        'heartbeat': read_heartbeat(client),
+    }
+
+
+class Scheduler:
+    """领取到期条目并发布到 Celery 队列"""
+
+    def __init__(self, app, batch=CLAIM_BATCH, lease=CLAIM_LEASE, client=None):
+        """
+        初始化调度器
+
+        Args:
+            app: Celery 应用（派发客户端）
+            batch (int): 每次领取的最大条目数
+            lease (int): 领取后确认发布的租约（秒）
+            client (redis.Redis, optional): Redis 客户端
+        """
+        self.app = app
+        self.batch = batch
+        self.lease = lease
+        self.client = client or get_redis()
+        self.hostname = socket.gethostname()
+        self.started_at = time.time()
+        self.released = 0
+        self.max_lag = 0.0
+        self._claim = self.client.register_script(CLAIM_SCRIPT)
+        self._reschedule = self.client.register_script(RESCHEDULE_SCRIPT)
+        self._requeue = self.client.register_script(REQUEUE_SCRIPT)
+        self._last_heartbeat = 0
+
+    def beat(self):
+        """写入心跳"""
+        payload = json.dumps({
+            'hostname': self.hostname,
+            'pid': os.getpid(),
+            'timestamp': time.time(),
+            'started_at': self.started_at,
+            'released': self.released,
+            'max_lag': round(self.max_lag, 3),
+        })
+        self.client.set(HEARTBEAT_KEY, payload, ex=HEARTBEAT_TTL)
+        self._last_heartbeat = time.time()
+
+    def requeue_expired(self):
+        """把租约到期的条目放回 due"""
+        return self._requeue(
+            keys=[INFLIGHT_KEY, DUE_KEY, ENTRIES_KEY], args=[time.time(), self.batch]
+        )
+
+    def release_due(self):
+        """
+        发布全部已到期的条目（每次领取 batch 条）
+
+        Returns:
+            int: 本次发布的条目数
+        """
+        now = time.time()
+        claimed = self._claim(
+            keys=[DUE_KEY, INFLIGHT_KEY, ENTRIES_KEY], args=[now, now + self.lease, self.batch]
+        )
+        if not claimed:
+            return 0
+
+        done, rescheduled = [], []
+        try:
+            with self.app.producer_or_acquire() as producer:
+                for i in range(0, len(claimed), 3):
+                    entry_id = claimed[i].decode('utf-8')
+                    entry = json.loads(claimed[i + 1])
+                    due = float(claimed[i + 2])
+                    cron = entry.get('cron')
+                    self.app.send_task(
+                        entry['task'],
+                        args=entry.get('args'),
+                        kwargs=entry.get('kwargs'),
+                        task_id=str(uuid.uuid4()) if cron else entry_id,
+                        producer=producer,
+                        **entry.get('options', {}),
+                    )
+                    self.max_lag = max(self.max_lag, now - due)
+                    if cron:
+                        # 错过的触发（调度器停止期间）不补发，从当前时间开始计算下一次
+                        next_due = next_cron_time(cron, due)
+                        if next_due <= now:
+                            next_due = next_cron_time(cron, now)
+                        rescheduled.extend([entry_id, next_due])
+                    else:
+                        done.append(entry_id)
+        finally:
+            # 已发布的条目立即确认；发布失败的条目留在 inflight，租约到期后重新调度
+            if done:
+                with self.client.pipeline(transaction=True) as pipe:
+                    pipe.zrem(INFLIGHT_KEY, *done)
+                    pipe.zrem(DUE_KEY, *done)
+                    pipe.hdel(ENTRIES_KEY, *done)
+                    pipe.execute()
+            if rescheduled:
+                self._reschedule(keys=[DUE_KEY, INFLIGHT_KEY, ENTRIES_KEY], args=rescheduled)
+            self.released += len(done) + len(rescheduled) // 2
+
+        return len(done) + len(rescheduled) // 2
+
+    def seconds_until_due(self):
+        """距最早的条目到期的秒数（没有条目时为 IDLE_WAIT）"""
+        first = self.client.zrange(DUE_KEY, 0, 0, withscores=True)
+        if not first:
+            return IDLE_WAIT
+        return max(first[0][1] - time.time(), 0)
+
+    def run(self, stop):
+        """
+        调度循环，直到 stop 被设置
+
+        Args:
+            stop (threading.Event): 停止信号
+        """
+        requeued = self.requeue_expired()
+        if requeued:
+            print(f'[scheduler] Requeued {requeued} unconfirmed entries', file=sys.stderr)
+        next_requeue = time.time() + self.lease / 2
+
+        while not stop.is_set():
+            try:
+                if time.time() - self._last_heartbeat >= HEARTBEAT_INTERVAL:
+                    self.beat()
+                if time.time() >= next_requeue:
+                    self.requeue_expired()
+                    next_requeue = time.time() + self.lease / 2
+
+                # 一次领取满额时说明还有到期条目，继续发布
+                if self.release_due() >= self.batch:
+                    continue
+
+                wait = min(self.seconds_until_due(), IDLE_WAIT)
+                if wait > 0:
+                    # 新增条目时被唤醒（BLPOP 超时为 0 表示一直等待，因此设置下限）
+                    self.client.blpop([WAKE_KEY], timeout=max(wait, 0.01))
+            except Exception as e:
+                print(f'[scheduler] Error: {e}', file=sys.stderr)
+                stop.wait(IDLE_WAIT)
+
+    def stop(self):
+        """删除本调度器的心跳"""
+        try:
+            current = read_heartbeat(self.client)
+            if current and current.get('pid') == os.getpid() and current.get('hostname') == self.hostname:
+                self.client.delete(HEARTBEAT_KEY)
+        except Exception as e:
+            print(f'[scheduler] Heartbeat cleanup error: {e}', file=sys.stderr)
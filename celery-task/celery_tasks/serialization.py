@@ -0,0 +1,168 @@
+"""
+结果序列化模块
+把 settings.SERIALIZATION_PROFILES 中的组合（msgpack+zstd、orjson+lz4 等）注册为 kombu 序列化器：
+编码后压缩、解压后解码，Worker 写入和派发端读取使用同一个序列化器名称。
+
+Celery 的 result_compression 只作用于部分结果后端，Redis 结果后端直接保存序列化后的字节，
+因此压缩放在序列化器内完成。结果中不记录序列化方式，Worker 与派发端通过同一个环境变量
+CELERY_TASK_SERIALIZATION 选择配置。
+
+批量等待结果（result_waiter.py）直接用 decode 解码，不需要导入 kombu。
+"""
+
+import json
+import zlib
+
+from celery_tasks.settings import SERIALIZATION, SERIALIZATION_PROFILES
+
+# 以下序列化和压缩库均为可选依赖，未安装时对应的配置不可用
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+# zstd 压缩级别（3 为 zstd 默认值，速度与压缩率的折中）
+ZSTD_LEVEL = 3
+
+# kombu 内置的序列化器（不压缩时直接使用，与之前写入的结果兼容）
+KOMBU_BUILTINS = ('json', 'msgpack')
+
+# 各序列化格式、压缩算法依赖的模块：名称 → (模块, pip 包名)
+REQUIREMENTS = {
+    'msgpack': (msgpack, 'msgpack'),
+    'orjson': (orjson, 'orjson'),
+    'zstd': (zstandard, 'zstandard'),
+    'lz4': (lz4_frame, 'lz4'),
+}
+
+# 是否已注册到 kombu
+_registered = False
+
+
+def _to_text(obj):
+    """无法直接序列化的值（datetime、Decimal、bytes 等）转换为字符串"""
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8', errors='replace')
+    return str(obj)
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_to_text).encode('utf-8')
+
+
+def _msgpack_dumps(obj):
+    return msgpack.packb(obj, use_bin_type=True, default=_to_text)
+
+
+def _msgpack_loads(data):
+    return msgpack.unpackb(data, raw=False)
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, default=_to_text, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _zstd_compress(data):
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+def _zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+# 序列化格式：名称 → (编码为 bytes, 从 bytes 解码)
+FORMATS = {
+    'json': (_json_dumps, json.loads),
+    'msgpack': (_msgpack_dumps, _msgpack_loads),
+    'orjson': (_orjson_dumps, lambda data: orjson.loads(data)),
+}
+
+# 压缩算法：名称 → (压缩, 解压)；gzip 与 kombu 一致，实际为 zlib 格式
+COMPRESSORS = {
+    'gzip': (zlib.compress, zlib.decompress),
+    'zstd': (_zstd_compress, _zstd_decompress),
+    'lz4': (lambda data: lz4_frame.compress(data), lambda data: lz4_frame.decompress(data)),
+}
+
+
+def profile_unavailable(profile):
+    """
+    检查序列化配置能否使用
+
+    Returns:
+        str | None: 不可用的原因（缺少的依赖），可用时为 None
+    """
+    if profile not in SERIALIZATION_PROFILES:
+        return f'未知的序列化配置: {profile}'
+    missing = []
+    for part in SERIALIZATION_PROFILES[profile]:
+        module, package = REQUIREMENTS.get(part, (json, None))
+        if module is None:
+            missing.append(package)
+    if missing:
+        return f'{profile} 需要安装 {", ".join(missing)}'
+    return None
+
+
+def encode(obj, profile=SERIALIZATION):
+    """按序列化配置编码（序列化后压缩）"""
+    fmt, compression = SERIALIZATION_PROFILES[profile]
+    data = FORMATS[fmt][0](obj)
+    if compression:
+        data = COMPRESSORS[compression][0](data)
+    return data
+
+
+def decode(payload, profile=SERIALIZATION):
+    """按序列化配置解码（解压后反序列化）"""
+    fmt, compression = SERIALIZATION_PROFILES[profile]
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    if compression:
+        payload = COMPRESSORS[compression][1](payload)
+    return FORMATS[fmt][1](payload)
+
+
+def register_profiles():
+    """
+    把可用的序列化配置注册为 kombu 序列化器（重复调用无副作用）
+
+    Raises:
+        RuntimeError: 当前配置（CELERY_TASK_SERIALIZATION）缺少依赖
+    """
+    global _registered
+    if _registered:
+        return
+    from kombu.serialization import register
+
+    for name in SERIALIZATION_PROFILES:
+        if name in KOMBU_BUILTINS or profile_unavailable(name):
+            continue
+        register(
+            name,
+            lambda obj, name=name: encode(obj, name),
+            lambda data, name=name: decode(data, name),
+            content_type=f'application/x-{name}',
+            content_encoding='binary',
+        )
+    _registered = True
+
+    reason = profile_unavailable(SERIALIZATION)
+    if reason:
+        raise RuntimeError(f'序列化配置不可用（CELERY_TASK_SERIALIZATION）: {reason}')
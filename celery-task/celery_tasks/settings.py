@@ -0,0 +1,112 @@
+"""
+Celery 共享配置
+Worker 和派发客户端共用同一份配置；本模块不导入 celery，
+派发端可以在不构建 Worker 应用的情况下低成本加载
+"""
+
+import os
+from pathlib import Path
+
+# Broker 与结果后端（可通过环境变量覆盖）
+BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/1')
+
+# 应用名称
+APP_NAME = 'celery_task'
+
+# 常驻派发守护进程地址（Unix 域套接字；不支持 AF_UNIX 的平台使用本机 TCP 端口）
+DISPATCH_SOCKET = os.environ.get(
+    'CELERY_TASK_DISPATCH_SOCKET',
+    str(Path(__file__).parent.parent / 'data' / 'dispatch.sock'),
+)
+DISPATCH_PORT = int(os.environ.get('CELERY_TASK_DISPATCH_PORT', 5556))
+
+# 队列（按命令预计耗时划分，见 routing.py）
+FAST_QUEUE = 'fast'
+DEFAULT_QUEUE = 'default'
+BULK_QUEUE = 'bulk'
+ALL_QUEUES = (FAST_QUEUE, DEFAULT_QUEUE, BULK_QUEUE)
+
+# 路由阈值：timeout 不超过 FAST_TIMEOUT 秒的命令进入 fast 队列，
+# 不少于 BULK_TIMEOUT 秒的进入 bulk 队列
+FAST_TIMEOUT = int(os.environ.get('CELERY_TASK_FAST_TIMEOUT', 60))
+BULK_TIMEOUT = int(os.environ.get('CELERY_TASK_BULK_TIMEOUT', 1800))
+
+# 默认优先级（Redis Broker：0 最高，9 最低）
+DEFAULT_PRIORITY = 5
+
+# 结果序列化配置：名称 → (序列化格式, 压缩算法)
+# Celery 的 result_compression 对 Redis 结果后端不生效，压缩在序列化器内完成（见 serialization.py）
+SERIALIZATION_PROFILES = {
+    'json': ('json', None),
+    'json+gzip': ('json', 'gzip'),
+    'msgpack': ('msgpack', None),
+    'msgpack+zstd': ('msgpack', 'zstd'),
+    'orjson': ('orjson', None),
+    'orjson+lz4': ('orjson', 'lz4'),
+}
+
+# 当前使用的序列化配置（结果中不记录序列化方式，Worker 与派发端必须一致）
+SERIALIZATION = os.environ.get('CELERY_TASK_SERIALIZATION', 'json')
+if SERIALIZATION not in SERIALIZATION_PROFILES:
+    raise ValueError(
+        f"未知的序列化配置 CELERY_TASK_SERIALIZATION={SERIALIZATION}"
+        f"（可选: {', '.join(SERIALIZATION_PROFILES)}）"
+    )
+
+# 任务消息只用序列化格式（消息很小，不压缩），结果使用完整配置
+TASK_SERIALIZER = SERIALIZATION_PROFILES[SERIALIZATION][0]
+
+# 基础配置
+CELERY_CONFIG = dict(
+    # Broker 配置
+    broker_url=BROKER_URL,
+    result_backend=RESULT_BACKEND,
+
+    # 序列化配置
+    task_serializer=TASK_SERIALIZER,
+    result_serializer=SERIALIZATION,
+    accept_content=sorted({'json', TASK_SERIALIZER}),
+    result_accept_content=sorted({'json', SERIALIZATION}),
+
+    # 时区配置
+    timezone='Asia/Shanghai',
+    enable_utc=True,
+
+    # 队列与路由
+    task_default_queue=DEFAULT_QUEUE,
+    task_routes=('celery_tasks.routing.route_task',),
+
+    # 优先级：Redis 为每个队列按优先级拆分列表，0 最高、9 最低；
+    # Worker 按 -Q 中的顺序消费队列（fast 优先）
+    task_default_priority=DEFAULT_PRIORITY,
+    broker_transport_options={
+        'priority_steps': list(range(10)),
+        'sep': ':',
+        'queue_order_strategy': 'priority',
+    },
+
+    # 任务确认策略（防止任务丢失）
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+
+    # 结果配置
+    result_expires=86400,  # 24小时
+    result_extended=True,
+
+    # 任务追踪
+    task_track_started=True,
+    task_send_sent_event=True,
+
+    # 任务时间限制
+    task_time_limit=3600,
+    task_soft_time_limit=3000,
+
+    # Worker 配置
+    worker_prefetch_multiplier=1,
+    worker_max_tasks_per_child=1000,
+
+    # 日志配置
+    worker_log_format='[%(asctime)s: %(levelname)s/%(processName)s] %(message)s',
+    worker_task_log_format='[%(asctime)s: %(levelname)s/%(processName)s][%(task_name)s(%(task_id)s)] %(message)s',
+)
@@ -0,0 +1,172 @@
+"""
+单飞（single-flight）去重模块
+多个任务同时执行完全相同的命令（命令、工作目录、环境变量指纹相同）时，
+只有第一个任务（leader）真正启动子进程，其余任务（follower）等待并直接使用它的结果。
+
+Redis 键：
+  celery_task:singleflight:<指纹>            租约，值为 leader 的任务 ID，执行期间定期续期
+  celery_task:singleflight:result:<任务ID>    leader 的执行结果（短时间保留）
+  celery_task:singleflight:done:<指纹>        完成通知频道
+leader 异常退出时租约会在 LEASE_TTL 秒内过期，等待中的 follower 接管执行。
+"""
+
+import sys
+import json
+import time
+import threading
+
+from celery_tasks.redis_client import KEY_PREFIX, get_redis
+
+
+# 租约键前缀
+LEASE_KEY_PREFIX = KEY_PREFIX + 'singleflight:'
+
+# leader 结果键前缀
+RESULT_KEY_PREFIX = KEY_PREFIX + 'singleflight:result:'
+
+# 完成通知频道前缀
+DONE_CHANNEL_PREFIX = KEY_PREFIX + 'singleflight:done:'
+
+# 租约过期时间（秒），leader 每 LEASE_TTL/3 秒续期一次
+LEASE_TTL = 30
+
+# leader 结果保留时间（秒）
+RESULT_TTL = 300
+
+# follower 检查租约状态的间隔（秒）
+POLL_INTERVAL = 1.0
+
+# 仅当租约仍属于自己时续期/释放
+_REFRESH_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """一次命令执行的单飞协调"""
+
+    def __init__(self, fingerprint, task_id, lease_ttl=LEASE_TTL, client=None):
+        """
+        初始化
+
+        Args:
+            fingerprint (str): 命令指纹
+            task_id (str): 当前任务 ID
+            lease_ttl (int): 租约过期时间（秒）
+            client (redis.Redis, optional): Redis 客户端
+        """
+        self.fingerprint = fingerprint
+        self.task_id = task_id
+        self.lease_ttl = lease_ttl
+        self.client = client or get_redis()
+        self.lease_key = LEASE_KEY_PREFIX + fingerprint
+        self.channel = DONE_CHANNEL_PREFIX + fingerprint
+        self.is_leader = False
+        self.leader_task_id = None
+        self._stop = threading.Event()
+        self._refresher = None
+
+    def _try_acquire(self):
+        """尝试获取租约，返回当前持有者的任务 ID"""
+        with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(self.lease_key, self.task_id, nx=True, ex=self.lease_ttl)
+            pipe.get(self.lease_key)
+            acquired, holder = pipe.execute()
+
+        if acquired:
+            self.is_leader = True
+            self.leader_task_id = self.task_id
+            self._refresher = threading.Thread(
+                target=self._refresh, name='singleflight-lease', daemon=True)
+            self._refresher.start()
+            return self.task_id
+        return holder.decode() if holder else None
+
+    def _refresh(self):
+        """leader 执行期间定期续期租约"""
+        refresh = self.client.register_script(_REFRESH_SCRIPT)
+        while not self._stop.wait(self.lease_ttl / 3):
+            try:
+                refresh(keys=[self.lease_key], args=[self.task_id, self.lease_ttl])
+            except Exception as e:
+                print(f'[singleflight] Refresh error: {e}', file=sys.stderr)
+
+    def join(self, timeout):
+        """
+        加入执行：成为 leader，或等待 leader 的结果
+
+        Args:
+            timeout (float): 作为 follower 的最长等待时间（秒）
+
+        Returns:
+            dict | None: leader 的执行结果；返回 None 时由当前任务自己执行
+                （is_leader 为 True 表示已成为 leader，否则为等待超时）
+        """
+        holder = self._try_acquire()
+        if self.is_leader:
+            return None
+
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                if holder:
+                    self.leader_task_id = holder
+                result = self._leader_result()
+                if result is not None:
+                    return result
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                pubsub.get_message(timeout=min(POLL_INTERVAL, remaining))
+
+                result = self._leader_result()
+                if result is not None:
+                    return result
+
+                # 租约消失且没有结果：leader 已异常退出，尝试接管
+                holder = self._try_acquire()
+                if self.is_leader:
+                    return None
+        finally:
+            pubsub.close()
+
+    def _leader_result(self):
+        """读取已知 leader 的执行结果"""
+        if not self.leader_task_id:
+            return None
+        payload = self.client.get(RESULT_KEY_PREFIX + self.leader_task_id)
+        return json.loads(payload) if payload else None
+
+    def complete(self, result):
+        """
+        leader 发布执行结果并释放租约
+
+        Args:
+            result (dict): 执行结果
+        """
+        if not self.is_leader:
+            return
+        self._stop.set()
+        try:
+            with self.client.pipeline(transaction=False) as pipe:
+                pipe.set(RESULT_KEY_PREFIX + self.task_id,
+                         json.dumps(result, ensure_ascii=False), ex=RESULT_TTL)
+                pipe.publish(self.channel, self.task_id)
+                pipe.execute()
+            self.client.register_script(_RELEASE_SCRIPT)(
+                keys=[self.lease_key], args=[self.task_id])
+        except Exception as e:
+            print(f'[singleflight] Publish error: {e}', file=sys.stderr)
@@ -0,0 +1,50 @@
+"""
+统计工具
+耗时分位数等汇总计算（基准测试、等待结果、延迟报告共用）
+"""
+
+
+def percentile(values, pct):
+    """
+    计算分位数（线性插值）
+
+    Args:
+        values (list): 数值列表
+        pct (float): 分位（0-100）
+
+    Returns:
+        float | None: 分位数，列表为空时为 None
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values, percentiles=(50, 95, 99)):
+    """
+    汇总一组数值
+
+    Args:
+        values (list): 数值列表
+        percentiles (tuple): 需要计算的分位
+
+    Returns:
+        dict: count、min、max、mean 及 p50/p95/p99 等
+    """
+    summary = {'count': len(values)}
+    if not values:
+        return summary
+    summary.update({
+        'min': min(values),
+        'max': max(values),
+        'mean': sum(values) / len(values),
+    })
+    for pct in percentiles:
+        summary[f'p{pct}'] = percentile(values, pct)
+    return summary
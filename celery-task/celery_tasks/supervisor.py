@@ -0,0 +1,303 @@
+"""
+多 Worker 监督模块
+按声明式配置（config/workers.yml）启动多个 Worker 进程：每个进程消费指定队列、
+使用指定并发池，并绑定到指定 CPU 核心；崩溃后按指数退避重启，
+所有进程的输出加上 [名称] 前缀后汇总到同一个日志
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import threading
+import subprocess
+from pathlib import Path
+
+
+# 默认配置文件
+SPEC_FILE = Path(__file__).parent.parent / 'config' / 'workers.yml'
+
+# 默认重启策略
+DEFAULT_RESTART = {
+    'backoff': 1,        # 首次重启前等待（秒）
+    'max_backoff': 60,   # 最长等待（秒）
+    'reset_after': 60,   # 连续运行超过该时间后重置等待时间（秒）
+}
+
+# 停止时等待 Worker 热关闭的时间（秒），超时后强制结束
+STOP_TIMEOUT = 30
+
+
+def parse_cpus(value):
+    """
+    解析 CPU 集合
+
+    Args:
+        value: None、整数、整数列表或 "0-3,6" 形式的字符串
+
+    Returns:
+        set[int] | None: CPU 编号集合，None 表示不绑定
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, int):
+        return {value}
+    if isinstance(value, (list, tuple)):
+        return {int(v) for v in value}
+
+    cpus = set()
+    for part in str(value).split(','):
+        part = part.strip()
+        if '-' in part:
+            low, high = part.split('-', 1)
+            cpus.update(range(int(low), int(high) + 1))
+        elif part:
+            cpus.add(int(part))
+    return cpus
+
+
+def load_specs(path=None):
+    """
+    读取 Worker 配置（YAML，未安装 PyYAML 时可使用 JSON 文件）
+
+    Args:
+        path (str, optional): 配置文件路径，默认 config/workers.yml
+
+    Returns:
+        tuple: (Worker 配置列表, 重启策略)
+
+    Raises:
+        ValueError: 配置格式错误
+    """
+    path = Path(path or SPEC_FILE)
+    text = path.read_text(encoding='utf-8')
+
+    if path.suffix == '.json':
+        config = json.loads(text)
+    else:
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError('读取 YAML 配置需要 PyYAML（pip install pyyaml），或改用 JSON 配置文件')
+        config = yaml.safe_load(text) or {}
+
+    workers = config.get('workers') or []
+    if not workers:
+        raise ValueError(f'配置中没有 workers: {path}')
+
+    specs = []
+    names = set()
+    for i, worker in enumerate(workers, 1):
+        name = worker.get('name')
+        if not name:
+            raise ValueError(f'第 {i} 个 Worker 缺少 name')
+        if name in names:
+            raise ValueError(f'Worker 名称重复: {name}')
+        names.add(name)
+
+        queues = worker.get('queues') or ['default']
+        if isinstance(queues, str):
+            queues = [q.strip() for q in queues.split(',') if q.strip()]
+
+        specs.append({
+            'name': name,
+            'queues': list(queues),
+            'pool': worker.get('pool', 'prefork'),
+            'concurrency': worker.get('concurrency'),
+            'cpus': parse_cpus(worker.get('cpus')),
+        })
+
+    restart = DEFAULT_RESTART.copy()
+    restart.update(config.get('restart') or {})
+    return specs, restart
+
+
+def available_cpus(cpus):
+    """
+    将配置的 CPU 集合限制在本进程可用的核心内（核心数少于配置时不致启动失败）
+
+    Returns:
+        set[int] | None: 可用的 CPU 集合；不绑定、平台不支持或没有可用核心时为 None
+    """
+    if not cpus or not hasattr(os, 'sched_getaffinity'):
+        return None
+    return (cpus & os.sched_getaffinity(0)) or None
+
+
+def spawn(cmd, cpus=None, **kwargs):
+    """
+    启动子进程，并在 fork 前把当前线程绑定到 cpus，使子进程（及其 prefork 子进程）继承 CPU 亲和性
+
+    Args:
+        cmd (list): 命令
+        cpus (set[int], optional): CPU 集合
+        **kwargs: 传给 subprocess.Popen 的参数
+
+    Returns:
+        subprocess.Popen: 子进程
+    """
+    if not cpus or not hasattr(os, 'sched_setaffinity'):
+        return subprocess.Popen(cmd, **kwargs)
+
+    previous = os.sched_getaffinity(0)
+    try:
+        os.sched_setaffinity(0, cpus)
+    except OSError:
+        # 核心不可用（如被 cgroup 限制）：不绑定
+        return subprocess.Popen(cmd, **kwargs)
+    try:
+        return subprocess.Popen(cmd, **kwargs)
+    finally:
+        os.sched_setaffinity(0, previous)
+
+
+class WorkerProcess:
+    """一个受监督的 Worker 进程"""
+
+    def __init__(self, spec, cmd, restart):
+        self.spec = spec
+        self.name = spec['name']
+        self.cmd = cmd
+        self.restart = restart
+        self.process = None
+        self.started_at = None
+        self.restarts = 0
+        self.backoff = restart['backoff']
+        self.next_start = 0
+
+    def start(self, log):
+        """启动进程，输出交给 log 逐行汇总"""
+        cpus = available_cpus(self.spec['cpus'])
+        if self.spec['cpus'] and cpus != self.spec['cpus']:
+            log.write('supervisor', f'{self.name} 配置的 CPU {sorted(self.spec["cpus"])} '
+                      + (f'部分不可用，只绑定 {sorted(cpus)}' if cpus else '不可用，不绑定 CPU'))
+        self.process = spawn(
+            self.cmd,
+            cpus,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+        )
+        self.started_at = time.monotonic()
+        threading.Thread(
+            target=log.pump, args=(self.name, self.process.stdout),
+            name=f'log-{self.name}', daemon=True,
+        ).start()
+        log.write('supervisor', f'已启动 {self.name} (PID {self.process.pid}'
+                  + (f', CPU {sorted(cpus)})' if cpus else ')'))
+
+    def launch(self, log):
+        """启动进程；失败时记录日志并按退避时间安排重试（不影响其他 Worker）"""
+        try:
+            self.start(log)
+        except OSError as e:
+            log.write('supervisor', f'{self.name} 启动失败: {e}')
+            self.next_start = time.monotonic() + self.backoff
+            self.backoff = min(self.backoff * 2, self.restart['max_backoff'])
+
+    def check(self, log):
+        """进程退出时安排按退避时间重启"""
+        now = time.monotonic()
+        if self.process is None:
+            if now >= self.next_start:
+                self.restarts += 1
+                self.launch(log)
+            return
+
+        returncode = self.process.poll()
+        if returncode is None:
+            return
+
+        uptime = now - self.started_at
+        if uptime >= self.restart['reset_after']:
+            self.backoff = self.restart['backoff']
+        log.write('supervisor', f'{self.name} 已退出（返回码 {returncode}，运行 {uptime:.0f} 秒），'
+                  f'{self.backoff} 秒后重启')
+        self.process = None
+        self.next_start = now + self.backoff
+        self.backoff = min(self.backoff * 2, self.restart['max_backoff'])
+
+    def stop(self):
+        """请求热关闭（等待当前任务完成）"""
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+    def wait(self, deadline):
+        """等待进程退出，超过 deadline 时强制结束"""
+        if self.process is None:
+            return
+        try:
+            self.process.wait(timeout=max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class ConsolidatedLog:
+    """把多个进程的输出加上前缀后写入标准输出和（可选）日志文件"""
+
+    def __init__(self, path=None):
+        self._lock = threading.Lock()
+        self._file = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(path, 'a', encoding='utf-8', buffering=1)
+
+    def write(self, name, line):
+        """写入一行"""
+        text = f'[{name}] {line.rstrip()}\n'
+        with self._lock:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+            if self._file:
+                self._file.write(text)
+
+    def pump(self, name, pipe):
+        """逐行读取子进程输出直到 EOF"""
+        with pipe:
+            for raw in iter(pipe.readline, b''):
+                self.write(name, raw.decode('utf-8', errors='replace'))
+
+    def close(self):
+        """关闭日志文件"""
+        if self._file:
+            self._file.close()
+
+
+def supervise(specs, restart, build_command, log_file=None, poll_interval=1.0):
+    """
+    启动并监督全部 Worker，直到 Ctrl+C 或 SIGTERM
+
+    Args:
+        specs (list[dict]): Worker 配置（load_specs 的返回值）
+        restart (dict): 重启策略
+        build_command (callable): build_command(spec) 返回 Worker 启动命令
+        log_file (str, optional): 汇总日志文件
+        poll_interval (float): 检查进程状态的间隔（秒）
+    """
+    log = ConsolidatedLog(log_file)
+    workers = [WorkerProcess(spec, build_command(spec), restart) for spec in specs]
+    stopping = threading.Event()
+
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+
+    try:
+        for worker in workers:
+            worker.launch(log)
+        while not stopping.is_set():
+            for worker in workers:
+                worker.check(log)
+            stopping.wait(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log.write('supervisor', '正在停止全部 Worker...')
+        for worker in workers:
+            worker.stop()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for worker in workers:
+            worker.wait(deadline)
+        log.write('supervisor', '全部 Worker 已停止')
+        log.close()
@@ -0,0 +1,140 @@
+"""
+任务统计写入模块
+任务的统计数据不在任务执行线程中写入，而是放入进程内队列，由后台线程合并写入：
+每轮把队列中的全部 Redis 写操作放进同一个 pipeline（一次往返），再依次执行本地写入
+（如 SQLite 任务历史）。
+毫秒级任务的执行线程只付出入队的开销；Worker（子）进程退出前会写完队列。
+"""
+
+import os
+import sys
+import time
+import queue
+import atexit
+import threading
+
+from celery_tasks.redis_client import get_redis
+
+
+# 队列容量（Redis 长时间不可用时丢弃新的统计，不占满 Worker 内存）
+QUEUE_SIZE = 10000
+
+# 每轮最多合并的写操作数
+MAX_BATCH = 1000
+
+# 写入类型：加入 Redis pipeline 的操作、本地函数调用
+REDIS, CALL = 'redis', 'call'
+
+
+class TelemetryWriter:
+    """后台统计写入线程（每个进程一个，fork 后的子进程会重新创建）"""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name='telemetry-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def submit(self, kind, func, args):
+        """
+        写操作入队（不阻塞）
+
+        Returns:
+            bool: 是否入队成功（队列已满时丢弃）
+        """
+        try:
+            self.queue.put_nowait((kind, func, args))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                print(f'[telemetry] Queue full, {self.dropped} write(s) dropped', file=sys.stderr)
+            return False
+
+    def _run(self):
+        """后台循环：阻塞等待第一个写操作，再取出队列中已有的其余写操作一起写入"""
+        while True:
+            ops = [self.queue.get()]
+            while len(ops) < MAX_BATCH:
+                try:
+                    ops.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(ops)
+            finally:
+                for _ in ops:
+                    self.queue.task_done()
+
+    def _write(self, ops):
+        """在一个 pipeline 中执行全部 Redis 写操作，再执行本地写入"""
+        redis_ops = [(func, args) for kind, func, args in ops if kind == REDIS]
+        if redis_ops:
+            try:
+                with get_redis().pipeline(transaction=False) as pipe:
+                    for func, args in redis_ops:
+                        func(pipe, *args)
+                    pipe.execute()
+            except Exception as e:
+                print(f'[telemetry] Redis write error: {e}', file=sys.stderr)
+
+        for kind, func, args in ops:
+            if kind != CALL:
+                continue
+            try:
+                func(*args)
+            except Exception as e:
+                print(f'[telemetry] Write error in {func.__name__}: {e}', file=sys.stderr)
+
+    def flush(self, timeout=10):
+        """
+        等待队列中的写操作完成（进程退出前调用）
+
+        Returns:
+            bool: 是否在超时前全部写入
+        """
+        if self.pid != os.getpid():
+            return True
+        deadline = time.time() + timeout
+        while self.queue.unfinished_tasks:
+            if time.time() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+
+# 当前进程的写入线程
+_writer = None
+
+
+def get_writer():
+    """获取当前进程的写入线程（首次使用时启动）"""
+    global _writer
+    if _writer is None or _writer.pid != os.getpid():
+        _writer = TelemetryWriter()
+    return _writer
+
+
+def record(func, *args):
+    """
+    异步执行 Redis 写操作
+
+    Args:
+        func (callable): func(pipe, *args)，向 pipeline 中添加写命令
+        *args: 参数
+    """
+    return get_writer().submit(REDIS, func, args)
+
+
+def call(func, *args):
+    """异步执行本地写入（如 SQLite 任务历史），异常只打印错误"""
+    return get_writer().submit(CALL, func, args)
+
+
+def flush(timeout=10):
+    """等待当前进程已提交的写操作完成"""
+    if _writer is None:
+        return True
+    return _writer.flush(timeout)
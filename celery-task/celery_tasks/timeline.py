@@ -0,0 +1,79 @@
+"""
+任务延迟分解模块
+记录任务从发布到通知的各个时间点，找出慢在排队、Worker 准备、子进程还是通知：
+
+  published          派发端发布消息（消息头 published_at）
+  received           Worker 从 Broker 收到消息（task_received 信号，主进程写入请求 received_at）
+  started            任务开始执行
+  subprocess_start   启动子进程
+  subprocess_end     子进程结束
+  notified           完成通知已发送（异步模式下为放入发送队列）
+
+时间点写入结果的 timeline 字段，同时保存在 Redis 的定长列表中，供 scripts/report.py latency 汇总
+"""
+
+import os
+import json
+
+from celery_tasks.redis_client import KEY_PREFIX, get_redis
+
+
+# 是否把时间线保存到最近任务列表（设为 0 关闭；结果中的 timeline 字段不受影响）
+TIMELINE_ENABLED = os.environ.get('CELERY_TASK_TIMELINE', '1').lower() not in ('0', 'false', 'no')
+
+# 最近任务的时间线列表（最新的在前）
+TIMELINES_KEY = KEY_PREFIX + 'timelines'
+
+# 保留的时间线条数
+TIMELINES_MAXLEN = 1000
+
+# 延迟阶段：(名称, 说明, 起点, 终点)
+PHASES = (
+    ('queue', '排队', 'ready', 'received'),
+    ('dispatch', 'Worker 调度', 'received', 'started'),
+    ('prepare', '执行准备', 'started', 'subprocess_start'),
+    ('subprocess', '子进程', 'subprocess_start', 'subprocess_end'),
+    ('finish', '收尾与通知', 'subprocess_end', 'notified'),
+    ('total', '端到端', 'ready', 'notified'),
+)
+
+
+def record_timeline(pipe, entry):
+    """
+    保存一条任务时间线（写入 pipeline，由调用方 execute）
+
+    Args:
+        pipe: Redis pipeline
+        entry (dict): task_id、command_prefix 及各时间点
+    """
+    pipe.lpush(TIMELINES_KEY, json.dumps(entry, ensure_ascii=False))
+    pipe.ltrim(TIMELINES_KEY, 0, TIMELINES_MAXLEN - 1)
+
+
+def recent_timelines(count=TIMELINES_MAXLEN, client=None):
+    """读取最近的任务时间线（最新的在前）"""
+    client = client or get_redis()
+    return [json.loads(item) for item in client.lrange(TIMELINES_KEY, 0, count - 1)]
+
+
+def phase_durations(timeline):
+    """
+    计算各阶段耗时
+
+    定时任务（eta）的排队从 ETA 开始计算，缺少起点或终点的阶段不计入。
+
+    Args:
+        timeline (dict): 时间线
+
+    Returns:
+        dict: {阶段名称: 耗时（秒）}
+    """
+    points = dict(timeline)
+    if points.get('published') is not None:
+        points['ready'] = max(points['published'], points.get('eta') or 0)
+
+    durations = {}
+    for name, _, start, end in PHASES:
+        if points.get(start) is not None and points.get(end) is not None:
+            durations[name] = max(points[end] - points[start], 0.0)
+    return durations
@@ -0,0 +1,625 @@
+"""
+预热解释器池模块
+Python 脚本命令（python script.py ...、python -m module ...）不再每次启动新的解释器：
+
+  Worker 主进程启动时拉起一个常驻的 zygote 进程，预先导入配置的模块（pandas、numpy 等）；
+  每个任务通过 Unix Socket 把请求和 stdout/stderr 管道（SCM_RIGHTS）交给 zygote，
+  zygote fork 出子进程，在子进程中切换工作目录和环境变量后用 runpy 执行脚本，
+  子进程退出后把返回码和 wait4 资源统计发回 Worker。
+
+与 multiprocessing 的 forkserver 一样，zygote 保持单线程、只负责 fork，脚本运行在独立的
+子进程中，互不影响，也不会污染 zygote 的状态。结果与普通执行完全相同（returncode、stdout、
+stderr、resources），只是省去了解释器启动和重量级模块的导入。
+
+只支持 Linux/macOS；只有使用技能虚拟环境 Python（与 Worker 同一个 bin 目录）的命令会进入预热池，
+带解释器选项（-u、-X 等）的命令、流式执行的任务仍按原方式执行。预热池不可用（未启用、
+zygote 尚在导入模块或已退出）时自动回退到普通执行。
+
+Socket 位于 mkdtemp 创建的私有目录（权限 0700，名称不可预测）中，并在 umask 0o077 下绑定；
+zygote 和 Worker 还会用 SO_PEERCRED 确认对端是同一用户（Linux）。Socket 路径只在 Worker
+进程间传递，不出现在命令的环境变量中。
+
+注意：脚本看到的 sys.modules 中已包含预先导入的模块；脚本启动的非守护线程会在退出前等待结束。
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import tempfile
+import subprocess
+from pathlib import Path
+
+
+# 是否启用预热解释器池（scripts/worker.py --warm）
+WARM_ENABLED = os.environ.get('CELERY_TASK_WARM', '').lower() in ('1', 'true', 'yes')
+
+# zygote 预先导入的模块（逗号分隔，scripts/worker.py --warm-preload）
+PRELOAD_MODULES = [
+    name.strip() for name in os.environ.get('CELERY_TASK_WARM_PRELOAD', '').split(',') if name.strip()
+]
+
+# zygote 的 Socket 路径（Worker 主进程启动 zygote 后写入，prefork 子进程继承）
+SOCKET_ENV = 'CELERY_TASK_WARM_SOCKET'
+
+# 当前平台是否支持预热池（需要 fork 和 SCM_RIGHTS 传递文件描述符）
+HAS_WARM_POOL = hasattr(os, 'fork') and hasattr(socket, 'send_fds')
+
+# zygote 检查 Worker 是否仍在运行的间隔（秒，Worker 被强制终止后 zygote 随之退出）
+PARENT_CHECK_INTERVAL = 5
+
+# zygote 读取请求的超时时间（秒）
+REQUEST_TIMEOUT = 5
+
+# 超时终止脚本后等待输出读取线程结束的最长时间（秒）
+READER_JOIN_TIMEOUT = 5
+
+
+class WarmPoolUnavailable(Exception):
+    """预热池不可用（脚本尚未启动，可以回退到普通执行）"""
+
+
+# ---------------------------------------------------------------------------
+# Worker 端
+# ---------------------------------------------------------------------------
+
+# Worker 主进程启动的 zygote 进程
+_zygote = None
+
+# zygote Socket 所在的私有目录（stop_zygote 时删除）
+_socket_dir = None
+
+
+def peer_uid(sock):
+    """
+    Unix Socket 对端进程的 uid
+
+    Returns:
+        int | None: uid；平台不支持 SO_PEERCRED 时为 None（仅靠目录权限保护）
+    """
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    import struct
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    return struct.unpack('3i', creds)[1]
+
+
+def is_foreign_peer(sock):
+    """对端是否属于其他用户"""
+    uid = peer_uid(sock)
+    return uid is not None and uid != os.getuid()
+
+
+def start_zygote(preload=None):
+    """
+    启动 zygote 进程，并把 Socket 路径写入环境变量（由之后创建的 prefork 子进程继承）
+
+    Args:
+        preload (list, optional): 预先导入的模块，默认 PRELOAD_MODULES
+
+    Returns:
+        str | None: Socket 路径；当前平台不支持时为 None
+    """
+    global _zygote, _socket_dir
+    if not HAS_WARM_POOL:
+        print('[warm] Warm pool is not supported on this platform', file=sys.stderr)
+        return None
+
+    preload = PRELOAD_MODULES if preload is None else preload
+    # 私有目录：其他用户无法连接，也无法抢先创建同名 Socket
+    _socket_dir = tempfile.mkdtemp(prefix='celery-task-warm-')
+    path = os.path.join(_socket_dir, 'zygote.sock')
+    command = [sys.executable, '-m', 'celery_tasks.warm_pool', '--socket', path]
+    if preload:
+        command.extend(['--preload', ','.join(preload)])
+
+    _zygote = subprocess.Popen(
+        command,
+        cwd=str(Path(__file__).parent.parent),
+        stdin=subprocess.DEVNULL,
+    )
+    os.environ[SOCKET_ENV] = path
+    print(f'[warm] Zygote started: pid={_zygote.pid} socket={path} '
+          f'preload={",".join(preload) or "-"}', file=sys.stderr)
+    return path
+
+
+def stop_zygote(timeout=5):
+    """停止 zygote 进程（正在运行的脚本不受影响）"""
+    global _zygote, _socket_dir
+    if _zygote is None:
+        return
+    _zygote.terminate()
+    try:
+        _zygote.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _zygote.kill()
+        _zygote.wait()
+    _zygote = None
+    if _socket_dir:
+        import shutil
+        shutil.rmtree(_socket_dir, ignore_errors=True)
+        _socket_dir = None
+
+
+def warm_argv(command, env=None, cwd=None):
+    """
+    判断命令能否在预热池中执行
+
+    Args:
+        command (str | list): 命令
+        env (dict, optional): 子进程环境变量（用于在 PATH 中查找 python）
+        cwd (str, optional): 工作目录（用于解析相对路径的解释器）
+
+    Returns:
+        list[str] | None: 解释器之后的参数（script.py args... 或 -m module args...）；
+            不适用时为 None
+    """
+    from celery_tasks.command_utils import resolve_executable, split_command
+
+    if isinstance(command, (list, tuple)):
+        argv = [str(arg) for arg in command]
+    else:
+        argv = split_command(command)
+    if not argv or len(argv) < 2 or not os.path.basename(argv[0]).startswith('python'):
+        return None
+
+    program = resolve_executable(argv[0], (env or os.environ).get('PATH'))
+    if program is None:
+        return None
+    # 只接受技能虚拟环境的解释器（同一个 bin 目录，不解析符号链接）
+    program = os.path.abspath(os.path.join(cwd or os.getcwd(), program))
+    if os.path.dirname(program) != os.path.dirname(os.path.abspath(sys.executable)):
+        return None
+    # 不存在的解释器交给普通执行报错，不能用 Worker 的解释器代为执行
+    if not os.access(program, os.X_OK):
+        return None
+
+    args = argv[1:]
+    if args[0] == '-m':
+        return args if len(args) >= 2 else None
+    if args[0].startswith('-'):
+        return None
+    return args
+
+
+def _recv_line(sock, buffer):
+    """从 Socket 读取一行 JSON 消息（buffer 保存已读取但未处理的数据）"""
+    while b'\n' not in buffer:
+        data = sock.recv(65536)
+        if not data:
+            raise ConnectionError('预热池连接中断')
+        buffer.extend(data)
+    index = buffer.index(b'\n')
+    line = bytes(buffer[:index])
+    del buffer[:index + 1]
+    return json.loads(line)
+
+
+def run_warm(argv, cwd=None, env=None, encoding='utf-8', timeout=300, socket_path=None):
+    """
+    在预热池中执行 Python 脚本并收集输出
+
+    Args:
+        argv (list): 解释器之后的参数（warm_argv 的返回值）
+        cwd (str, optional): 工作目录
+        env (dict, optional): 环境变量
+        encoding (str): 输出编码
+        timeout (float): 超时时间（秒）
+        socket_path (str, optional): zygote Socket 路径（默认读取环境变量）
+
+    Returns:
+        dict: returncode、stdout、stderr、resources（与 run_captured 相同）
+
+    Raises:
+        WarmPoolUnavailable: 预热池不可用（脚本尚未启动）
+        subprocess.TimeoutExpired: 超时（子进程已被终止，output/stderr 为已收集的输出字节）
+    """
+    import threading
+    from types import SimpleNamespace
+    from celery_tasks.resource_usage import usage_from_rusage
+
+    path = socket_path or os.environ.get(SOCKET_ENV)
+    if not path:
+        raise WarmPoolUnavailable('预热池未启用')
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError as e:
+        sock.close()
+        raise WarmPoolUnavailable(f'无法连接预热池: {e}') from e
+    if is_foreign_peer(sock):
+        sock.close()
+        raise WarmPoolUnavailable(f'预热池 Socket 属于其他用户: {path}')
+
+    with sock:
+        if env is None:
+            env = {k: v for k, v in os.environ.items() if k != SOCKET_ENV}
+        request = json.dumps({
+            'argv': list(argv),
+            'cwd': cwd or os.getcwd(),
+            'env': dict(env),
+        }).encode('utf-8') + b'\n'
+
+        (stdout_r, stdout_w), (stderr_r, stderr_w) = os.pipe(), os.pipe()
+        try:
+            socket.send_fds(sock, [request], [stdout_w, stderr_w])
+        except OSError as e:
+            os.close(stdout_r)
+            os.close(stderr_r)
+            raise WarmPoolUnavailable(f'发送请求失败: {e}') from e
+        finally:
+            # 写端已交给子进程，Worker 必须关闭自己的副本才能在子进程退出时读到 EOF
+            os.close(stdout_w)
+            os.close(stderr_w)
+
+        chunks = {'stdout': [], 'stderr': []}
+
+        def drain(name, fd):
+            # 分块读取：超时时已读到的部分输出仍可返回
+            with open(fd, 'rb') as stream:
+                for chunk in iter(lambda: stream.read1(65536), b''):
+                    chunks[name].append(chunk)
+
+        readers = [
+            threading.Thread(target=drain, args=(name, fd), daemon=True)
+            for name, fd in (('stdout', stdout_r), ('stderr', stderr_r))
+        ]
+        for reader in readers:
+            reader.start()
+
+        buffer = bytearray()
+        try:
+            started = _recv_line(sock, buffer)
+        except (OSError, ValueError) as e:
+            raise WarmPoolUnavailable(f'预热池无响应: {e}') from e
+        if 'error' in started:
+            raise WarmPoolUnavailable(started['error'])
+
+        # 脚本已启动：之后的连接错误不再回退，避免脚本被执行两次
+        expired = False
+        sock.settimeout(timeout)
+        try:
+            status = _recv_line(sock, buffer)
+        except socket.timeout:
+            expired = True
+            sock.settimeout(None)
+            sock.sendall(b'kill\n')
+            status = _recv_line(sock, buffer)
+
+    if expired:
+        # zygote 已终止脚本的进程组；脱离进程组的进程可能仍持有管道，不无限等待
+        deadline = time.monotonic() + READER_JOIN_TIMEOUT
+        for reader in readers:
+            reader.join(timeout=max(deadline - time.monotonic(), 0))
+        raise subprocess.TimeoutExpired(['python', *argv], timeout, output=b''.join(chunks['stdout']),
+                                        stderr=b''.join(chunks['stderr']))
+
+    for reader in readers:
+        reader.join()
+
+    def decode(data):
+        # 与 text=True 一致：统一换行符
+        text = data.decode(encoding, errors='replace')
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+
+    return {
+        'returncode': status['returncode'],
+        'stdout': decode(b''.join(chunks['stdout'])),
+        'stderr': decode(b''.join(chunks['stderr'])),
+        'resources': usage_from_rusage(SimpleNamespace(**status['rusage'])),
+    }
+
+
+# ---------------------------------------------------------------------------
+# zygote 端（只使用标准库，避免在 fork 前导入不必要的模块）
+# ---------------------------------------------------------------------------
+
+# 发回 Worker 的 rusage 字段
+RUSAGE_FIELDS = (
+    'ru_utime', 'ru_stime', 'ru_maxrss', 'ru_inblock', 'ru_oublock', 'ru_nvcsw', 'ru_nivcsw',
+)
+
+
+def preload_modules(names):
+    """导入预加载模块，导入失败只记录日志"""
+    import importlib
+
+    loaded = []
+    for name in names:
+        started = time.time()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f'[warm] Preload {name} failed: {e}', file=sys.stderr)
+            continue
+        loaded.append(name)
+        print(f'[warm] Preloaded {name} in {time.time() - started:.2f}s', file=sys.stderr)
+    return loaded
+
+
+def _read_request(conn):
+    """读取一条请求和随附的两个管道写端"""
+    conn.settimeout(REQUEST_TIMEOUT)
+    data, fds, _, _ = socket.recv_fds(conn, 65536, 2)
+    buffer = bytearray(data)
+    while b'\n' not in buffer:
+        data = conn.recv(65536)
+        if not data:
+            break
+        buffer.extend(data)
+    conn.settimeout(None)
+    try:
+        if len(fds) != 2:
+            raise ValueError('请求缺少 stdout/stderr 管道')
+        return json.loads(bytes(buffer).split(b'\n', 1)[0]), fds
+    except Exception:
+        for fd in fds:
+            os.close(fd)
+        raise
+
+
+def _send(conn, message):
+    """向 Worker 发送一行 JSON 消息（Worker 已断开时忽略）"""
+    try:
+        conn.sendall(json.dumps(message).encode('utf-8') + b'\n')
+    except OSError:
+        pass
+
+
+def _exit_code(exc):
+    """与解释器一致地把 SystemExit 转换为退出码"""
+    code = exc.code
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code & 0xFF
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _run_script(request, fds):
+    """
+    在 fork 出的子进程中执行脚本
+
+    Returns:
+        int: 退出码
+    """
+    import io
+    import atexit
+    import runpy
+    import threading
+    import traceback
+
+    # 独立的进程组：超时时连同脚本启动的子进程一起终止
+    os.setpgid(0, 0)
+    signal.set_wakeup_fd(-1)
+    for signum in (signal.SIGCHLD, signal.SIGTERM):
+        signal.signal(signum, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(fds[0], 1)
+    os.dup2(fds[1], 2)
+    for fd in (devnull, *fds):
+        os.close(fd)
+
+    os.chdir(request['cwd'])
+    os.environ.clear()
+    os.environ.update(request['env'])
+
+    # 与新启动的解释器一致：按 PYTHONIOENCODING（或区域设置）重建标准流，stdout 为块缓冲
+    encoding, _, errors = os.environ.get('PYTHONIOENCODING', '').partition(':')
+    if not encoding:
+        import locale
+        encoding = locale.getpreferredencoding(False)
+    sys.stdin = io.TextIOWrapper(io.FileIO(0, 'r', closefd=False), encoding=encoding)
+    sys.stdout = io.TextIOWrapper(
+        io.FileIO(1, 'w', closefd=False), encoding=encoding, errors=errors or 'strict',
+        write_through=bool(os.environ.get('PYTHONUNBUFFERED')),
+    )
+    sys.stderr = io.TextIOWrapper(
+        io.FileIO(2, 'w', closefd=False), encoding=encoding, errors='backslashreplace',
+        line_buffering=True,
+    )
+
+    argv = request['argv']
+    pythonpath = [p for p in os.environ.get('PYTHONPATH', '').split(os.pathsep) if p]
+    try:
+        if argv[0] == '-m':
+            sys.argv = argv[1:]
+            sys.path[0] = os.getcwd()
+            sys.path[1:1] = pythonpath
+            runpy.run_module(argv[1], run_name='__main__', alter_sys=True)
+        else:
+            sys.argv = list(argv)
+            sys.path[0] = os.path.dirname(os.path.abspath(argv[0]))
+            sys.path[1:1] = pythonpath
+            runpy.run_path(argv[0], run_name='__main__')
+        code = 0
+    except SystemExit as e:
+        code = _exit_code(e)
+    except BaseException as e:
+        # 与解释器一致：回溯从脚本开始，不包含 zygote 和 runpy 的栈帧
+        tb = e.__traceback__
+        while tb is not None and (tb.tb_frame.f_code.co_filename == __file__
+                                  or tb.tb_frame.f_code.co_filename.startswith('<frozen runpy')):
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb)
+        code = 1
+
+    # 解释器退出时的收尾：等待非守护线程、执行 atexit 回调、刷新输出
+    for thread in threading.enumerate():
+        if thread is not threading.main_thread() and not thread.daemon:
+            thread.join()
+    atexit._run_exitfuncs()
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except Exception:
+            pass
+    return code
+
+
+def serve(socket_path, preload=()):
+    """
+    zygote 主循环：预加载模块后监听 Socket，为每个请求 fork 一个子进程
+
+    单线程运行（fork 前没有其他线程持有锁），用 SIGCHLD 唤醒主循环回收子进程。
+
+    Args:
+        socket_path (str): 监听的 Unix Socket 路径
+        preload (list): 预先导入的模块
+    """
+    import selectors
+
+    parent = os.getppid()
+    preload_modules(preload)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # 与 dispatch_daemon 相同：Socket 仅当前用户可访问
+    old_umask = os.umask(0o077)
+    try:
+        listener.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    listener.listen(128)
+
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda *args: None)
+
+    def terminate(*args):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, terminate)
+
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ, 'accept')
+    selector.register(wake_r, selectors.EVENT_READ, 'wake')
+    # 正在运行的子进程 {pid: 与 Worker 的连接}
+    children = {}
+
+    def spawn(conn):
+        request, fds = _read_request(conn)
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                code = 1
+                try:
+                    listener.close()
+                    os.close(wake_r)
+                    os.close(wake_w)
+                    for other in (conn, *children.values()):
+                        other.close()
+                    code = _run_script(request, fds)
+                except BaseException:
+                    import traceback
+                    traceback.print_exc()
+                finally:
+                    os._exit(code)
+        finally:
+            # 管道写端只由子进程持有（子进程以 os._exit 退出，不会执行到这里）
+            for fd in fds:
+                os.close(fd)
+        return pid
+
+    def reap():
+        while True:
+            try:
+                pid, status, ru = os.wait4(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            conn = children.pop(pid, None)
+            if conn is None:
+                continue
+            _send(conn, {
+                'returncode': os.waitstatus_to_exitcode(status),
+                'rusage': {field: getattr(ru, field) for field in RUSAGE_FIELDS},
+            })
+            try:
+                selector.unregister(conn)
+            except KeyError:
+                # Worker 已断开，连接此前已从 selector 中移除
+                pass
+            conn.close()
+
+    print(f'[warm] Zygote ready: {socket_path}', file=sys.stderr)
+    try:
+        while True:
+            if os.getppid() != parent:
+                print('[warm] Worker exited, zygote stopping', file=sys.stderr)
+                break
+            for key, _ in selector.select(PARENT_CHECK_INTERVAL):
+                if key.data == 'accept':
+                    conn, _ = listener.accept()
+                    # 读取请求前确认对端是同一用户
+                    if is_foreign_peer(conn):
+                        print(f'[warm] Rejected connection from uid {peer_uid(conn)}', file=sys.stderr)
+                        conn.close()
+                        continue
+                    try:
+                        pid = spawn(conn)
+                    except Exception as e:
+                        _send(conn, {'error': f'启动脚本失败: {e}'})
+                        conn.close()
+                        continue
+                    children[pid] = conn
+                    selector.register(conn, selectors.EVENT_READ, pid)
+                    _send(conn, {'pid': pid})
+                elif key.data == 'wake':
+                    try:
+                        while os.read(wake_r, 512):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    reap()
+                else:
+                    # Worker 请求终止（超时）或已断开：终止子进程所在的进程组
+                    pid = key.data
+                    if pid not in children:
+                        continue
+                    try:
+                        data = key.fileobj.recv(64)
+                    except OSError:
+                        data = b''
+                    try:
+                        os.killpg(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                    if not data:
+                        selector.unregister(key.fileobj)
+            # 处理 SIGCHLD 之前已经退出的子进程
+            reap()
+    finally:
+        listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    """zygote 入口：python -m celery_tasks.warm_pool --socket PATH [--preload a,b]"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='预热解释器池 zygote 进程')
+    parser.add_argument('--socket', required=True, help='监听的 Unix Socket 路径')
+    parser.add_argument('--preload', default='', help='预先导入的模块，逗号分隔')
+    args = parser.parse_args()
+
+    serve(args.socket, [name.strip() for name in args.preload.split(',') if name.strip()])
+
+
+if __name__ == '__main__':
+    main()
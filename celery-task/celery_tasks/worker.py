@@ -6,61 +6,470 @@ Celery Worker 配置和任务定义
 import os
 import sys
 import subprocess
+import time
 import platform
-from datetime import timedelta
+from datetime import datetime, timedelta
 from pathlib import Path
 from celery import Celery
+from celery.signals import (
+    task_postrun, task_prerun, task_received, task_revoked,
+    worker_init, worker_process_shutdown, worker_ready, worker_shutdown
+)
+
+from celery_tasks.serialization import register_profiles
+from celery_tasks.settings import APP_NAME, CELERY_CONFIG
+from celery_tasks.workflow import CommandFailed, failure_summary
 
 # 获取技能虚拟环境的 Python 路径（用于执行任务）
 SKILL_PYTHON = sys.executable
 SKILL_VENV_DIR = Path(sys.executable).parent.parent
 
-# 创建 Celery 应用
-app = Celery('celery_task')
+# 注册 msgpack+zstd 等结果序列化器（派发客户端同样注册，见 serialization.py）
+register_profiles()
+
+# 创建 Celery 应用（配置与派发客户端共用，见 settings.py）
+app = Celery(APP_NAME)
+app.conf.update(CELERY_CONFIG)
+
+
+def offload_output(result, encoding='utf-8', threshold=None):
+    """
+    将结果中超大的 stdout/stderr 写入 Blob 存储，结果只保留预览和引用
+
+    Args:
+        result (dict): 执行结果（原地修改）
+        encoding (str): 输出编码
+        threshold (int, optional): 阈值（字节）
+    """
+    from celery_tasks.blob_store import offload_text
+
+    for name in ('stdout', 'stderr'):
+        try:
+            text, ref = offload_text(result.get(name), encoding, threshold)
+        except Exception as e:
+            # Blob 写入失败时保留原始输出
+            print(f'[blob] Store error: {e}', file=sys.stderr)
+            continue
+        if ref:
+            result[name] = text
+            result[f'{name}_blob'] = ref
+
+
+def _spooled_output(spool, tail, encoding, threshold):
+    """
+    根据流式执行的完整输出（临时文件）生成结果字段
+
+    Returns:
+        tuple: (结果中保留的文本, Blob 引用或 None)
+    """
+    from celery_tasks import blob_store
+
+    threshold = blob_store.BLOB_THRESHOLD if threshold is None else threshold
+    size = spool.tell()
+    spool.seek(0)
+
+    if size <= threshold:
+        return spool.read().decode(encoding, errors='replace'), None
+
+    head = spool.read(blob_store.PREVIEW_HEAD_CHARS).decode(encoding, errors='ignore')
+    spool.seek(0)
+    ref = blob_store.put_stream(spool, encoding)
+    preview = blob_store.make_preview(
+        head,
+        tail.getvalue()[-blob_store.PREVIEW_TAIL_CHARS:],
+        tail.total_chars,
+    )
+    return preview, ref
+
+
+# 子进程的基础环境变量（首次执行命令时生成）
+_base_env = None
+
 
-# 基础配置
-app.conf.update(
-    # Broker 配置
-    broker_url='redis://localhost:6379/0',
-    result_backend='redis://localhost:6379/1',
+def task_env(env_vars=None):
+    """
+    生成子进程的环境变量
+
+    基础环境（os.environ 加上 Windows 上技能虚拟环境的 Scripts 目录，去掉预热池 Socket 路径）只生成一次；
+    Worker 启动后对 os.environ 的修改不会再传给子进程。
+
+    Args:
+        env_vars (dict, optional): 额外的环境变量
+
+    Returns:
+        dict: 未指定 env_vars 时直接返回缓存的基础环境（调用方不得修改）
+    """
+    global _base_env
+    if _base_env is None:
+        from celery_tasks.warm_pool import SOCKET_ENV
+        env = os.environ.copy()
+        # 预热池 Socket 只供 Worker 使用，不传给命令
+        env.pop(SOCKET_ENV, None)
+        # 在 Windows 上，确保 PATH 优先使用技能虚拟环境
+        if platform.system() == 'Windows':
+            scripts_dir = str(SKILL_VENV_DIR / 'Scripts')
+            # 将技能虚拟环境的 Scripts 目录放在 PATH 最前面
+            path_list = [scripts_dir]
+            if 'PATH' in env:
+                path_list.append(env['PATH'])
+            env['PATH'] = os.pathsep.join(path_list)
+        _base_env = env
+    if env_vars:
+        return {**_base_env, **env_vars}
+    return _base_env
 
-    # 序列化配置
-    task_serializer='json',
-    result_serializer='json',
-    accept_content=['json'],
 
-    # 时区配置
-    timezone='Asia/Shanghai',
-    enable_utc=True,
+# 超时终止子进程后等待输出读取线程结束的最长时间（秒）
+READER_JOIN_TIMEOUT = 5
 
-    # 任务确认策略（防止任务丢失）
-    task_acks_late=True,
-    task_reject_on_worker_lost=True,
 
-    # 结果配置
-    result_expires=86400,  # 24小时
-    result_compression='gzip',
-    result_extended=True,
+def kill_process_group(process):
+    """终止子进程所在的进程组（超时后清理命令派生的孙进程，仅 POSIX）"""
+    if os.name != 'posix':
+        return
+    import signal
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
 
-    # 任务追踪
-    task_track_started=True,
-    task_send_sent_event=True,
 
-    # 任务时间限制
-    task_time_limit=3600,
-    task_soft_time_limit=3000,
+def join_readers(readers, timeout=READER_JOIN_TIMEOUT):
+    """
+    在共同的截止时间内等待读取线程结束
 
-    # Worker 配置
-    worker_prefetch_multiplier=1,
-    worker_max_tasks_per_child=1000,
+    Returns:
+        list: 仍未结束的读取线程
+    """
+    deadline = time.monotonic() + timeout
+    for reader in readers:
+        reader.join(timeout=max(deadline - time.monotonic(), 0))
+    return [reader for reader in readers if reader.is_alive()]
 
-    # 日志配置
-    worker_log_format='[%(asctime)s: %(levelname)s/%(processName)s] %(message)s',
-    worker_task_log_format='[%(asctime)s: %(levelname)s/%(processName)s][%(task_name)s(%(task_id)s)] %(message)s',
+
+# 写入执行缓存、单飞共享的结果字段（不含本次派发相关的 command/cwd 等）
+CACHED_FIELDS = (
+    'success', 'returncode', 'stdout', 'stderr', 'duration',
+    'stdout_truncated', 'stderr_truncated', 'stdout_blob', 'stderr_blob',
 )
 
 
-@app.task(bind=True, name='execute_command')
+def lookup_cache(command, cwd, env, env_vars, cache_key=None, cache_env=None,
+                 cache_inputs=None, cache_input_mode='mtime'):
+    """
+    计算缓存键并查询执行缓存
+
+    Returns:
+        tuple: (缓存键, 缓存的结果或 None)；无法计算指纹时返回 (None, None)
+    """
+    from celery_tasks import exec_cache
+    from celery_tasks.command_utils import command_fingerprint
+
+    try:
+        key = cache_key or command_fingerprint(
+            command,
+            cwd=cwd,
+            env_vars=env_vars,
+            env=env,
+            env_keys=cache_env,
+            input_files=cache_inputs,
+            input_mode=cache_input_mode,
+        )
+    except Exception as e:
+        print(f'[cache] Fingerprint error: {e}', file=sys.stderr)
+        return None, None
+    return key, exec_cache.get(key)
+
+
+def task_timeline(request, started):
+    """
+    构建任务时间线的起始部分：发布时间（消息头）、ETA、Worker 收到消息的时间
+
+    Returns:
+        dict: published、eta、received、started（缺失的时间点省略）
+    """
+    timeline = {'started': started}
+    published_at = getattr(request, 'published_at', None)
+    if published_at:
+        timeline['published'] = float(published_at)
+    if request.eta:
+        try:
+            timeline['eta'] = datetime.fromisoformat(str(request.eta)).timestamp()
+        except ValueError:
+            pass
+    # 主进程收到消息时写入请求（见 record_received），随请求传给 prefork 子进程
+    received = getattr(request, 'received_at', None)
+    if received:
+        timeline['received'] = float(received)
+    return timeline
+
+
+def save_timeline(task_id, result):
+    """保存时间线到最近任务列表（scripts/report.py latency 使用；后台线程写入）"""
+    from celery_tasks import telemetry
+    from celery_tasks.command_utils import command_prefix
+    from celery_tasks.timeline import TIMELINE_ENABLED, record_timeline
+
+    if not TIMELINE_ENABLED:
+        return
+    telemetry.record(record_timeline, {
+        'task_id': task_id,
+        'command_prefix': result.get('command_prefix') or command_prefix(result['command']),
+        'success': result.get('success'),
+        **result['timeline'],
+    })
+
+
+def save_history(request, result):
+    """把结果追加到本地任务历史（dispatch.py history 查询；后台线程写入并定期清理过期记录）"""
+    from celery_tasks import history, telemetry
+
+    if not history.HISTORY_ENABLED:
+        return
+    delivery_info = request.delivery_info or {}
+    telemetry.call(
+        history.record_result,
+        request.id,
+        result,
+        delivery_info.get('routing_key'),
+        request.hostname,
+    )
+    if history.prune_due():
+        telemetry.call(history.prune_expired)
+
+
+def join_flight(command, cwd, env_vars, task_id, timeout):
+    """
+    加入单飞去重
+
+    Returns:
+        tuple: (SingleFlight 或 None, leader 的结果或 None)；
+            Redis 不可用时返回 (None, None)，任务照常执行
+    """
+    from celery_tasks.command_utils import command_fingerprint
+    from celery_tasks.singleflight import LEASE_TTL, SingleFlight
+
+    try:
+        flight = SingleFlight(command_fingerprint(command, cwd=cwd, env_vars=env_vars), task_id)
+        # leader 最多执行 timeout 秒，多等一个租约周期以便接管
+        return flight, flight.join(timeout + LEASE_TTL)
+    except Exception as e:
+        print(f'[singleflight] Join error: {e}', file=sys.stderr)
+        return None, None
+
+
+def replay_stream(task_id, cached):
+    """将缓存的输出发布到输出流，使 --follow 在缓存命中时也能正常结束"""
+    from celery_tasks.output_stream import OutputStreamPublisher, stream_key
+
+    publisher = OutputStreamPublisher(task_id)
+    for name in ('stdout', 'stderr'):
+        if cached.get(name):
+            publisher.publish(name, cached[name])
+    publisher.close(cached.get('returncode'))
+    return stream_key(task_id)
+
+
+def run_streaming(command, task_id, shell=True, cwd=None, env=None,
+                  encoding='utf-8', timeout=300, blob_threshold=None,
+                  executable=None, close_fds=True):
+    """
+    以流式方式执行命令：增量读取输出并实时发布到 Redis Stream
+
+    完整输出写入磁盘临时文件而非内存，超过阈值时转存到 Blob 存储。
+
+    Args:
+        command (str | list): 要执行的命令
+        task_id (str): 任务 ID（作为输出流的键）
+        shell (bool): 是否使用 shell 执行
+        cwd (str, optional): 工作目录
+        env (dict, optional): 环境变量
+        encoding (str): 输出编码
+        timeout (int): 命令超时时间（秒）
+        blob_threshold (int, optional): 转存 Blob 的阈值（字节）
+        executable (str, optional): 程序绝对路径（直接执行时，见 prepare_command）
+        close_fds (bool): 是否关闭继承的文件描述符
+
+    Returns:
+        dict: returncode、stdout/stderr、Blob 引用、截断标记及资源统计
+
+    Raises:
+        subprocess.TimeoutExpired: 命令超时（子进程已被终止）
+    """
+    import tempfile
+    import threading
+    from celery_tasks.output_stream import (
+        OutputStreamPublisher, TailBuffer, pump_pipe, stream_key
+    )
+    from celery_tasks.resource_usage import wait_with_usage
+
+    publisher = OutputStreamPublisher(task_id)
+    tails = {'stdout': TailBuffer(), 'stderr': TailBuffer()}
+    spools = {'stdout': tempfile.TemporaryFile(), 'stderr': tempfile.TemporaryFile()}
+
+    # POSIX 下经由 shell 执行的命令自成进程组，超时时连同孙进程一起终止，读取线程才能读到 EOF；
+    # 直接执行（argv）不新建会话，保留 posix_spawn/vfork 启动路径
+    new_session = bool(shell) and os.name == 'posix'
+    process = subprocess.Popen(
+        command,
+        shell=shell,
+        cwd=cwd,
+        env=env,
+        executable=executable,
+        close_fds=close_fds,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=new_session,
+    )
+
+    readers = [
+        threading.Thread(
+            target=pump_pipe,
+            args=(pipe, name, encoding, publisher, tails[name], spools[name]),
+            daemon=True,
+        )
+        for name, pipe in (('stdout', process.stdout), ('stderr', process.stderr))
+    ]
+    for reader in readers:
+        reader.start()
+
+    # 仍在写入临时文件的读取线程（超时后未能结束时不关闭其临时文件）
+    busy = set()
+    try:
+        try:
+            returncode, usage = wait_with_usage(process, timeout)
+        except subprocess.TimeoutExpired:
+            # 子进程已被终止；孙进程（或脱离进程组的进程）可能仍持有管道，不无限等待
+            if new_session:
+                kill_process_group(process)
+            alive = join_readers(readers)
+            busy.update(name for name, reader in zip(('stdout', 'stderr'), readers)
+                        if reader in alive)
+            publisher.close(-2)
+            raise
+
+        for reader in readers:
+            reader.join()
+        publisher.close(returncode)
+
+        streamed = {
+            'returncode': returncode,
+            'stream_key': stream_key(task_id),
+            'resources': usage,
+        }
+        for name in ('stdout', 'stderr'):
+            text, ref = _spooled_output(spools[name], tails[name], encoding, blob_threshold)
+            streamed[name] = text
+            streamed[f'{name}_truncated'] = ref is not None
+            if ref:
+                streamed[f'{name}_blob'] = ref
+        return streamed
+    finally:
+        for name, spool in spools.items():
+            if name not in busy:
+                spool.close()
+
+
+def run_captured(command, shell=True, cwd=None, env=None, encoding='utf-8',
+                 timeout=300, capture_output=True, executable=None, close_fds=True):
+    """
+    执行命令并一次性收集输出，同时通过 wait4 取得子进程的资源统计
+
+    Returns:
+        dict: returncode、stdout、stderr、resources（不支持 wait4 的平台为 None）
+
+    Raises:
+        subprocess.TimeoutExpired: 命令超时（子进程已被终止，output/stderr 为已收集的输出字节）
+    """
+    import threading
+    from celery_tasks.resource_usage import wait_with_usage
+
+    pipe = subprocess.PIPE if capture_output else None
+    # POSIX 下经由 shell 执行的命令自成进程组，超时时连同 shell 派生的孙进程一起终止；
+    # 直接执行（argv）不新建会话，CPython 才会使用 posix_spawn/vfork 启动子进程
+    new_session = bool(shell) and os.name == 'posix'
+    process = subprocess.Popen(
+        command,
+        shell=shell,
+        cwd=cwd,
+        env=env,
+        executable=executable,
+        close_fds=close_fds,
+        stdout=pipe,
+        stderr=pipe,
+        start_new_session=new_session,
+    )
+
+    chunks = {'stdout': [], 'stderr': []}
+
+    def drain(name, stream):
+        # 分块读取：超时时已读到的部分输出仍可返回
+        with stream:
+            for chunk in iter(lambda: stream.read1(65536), b''):
+                chunks[name].append(chunk)
+
+    readers = []
+    if capture_output:
+        readers = [
+            threading.Thread(target=drain, args=(name, stream), daemon=True)
+            for name, stream in (('stdout', process.stdout), ('stderr', process.stderr))
+        ]
+        for reader in readers:
+            reader.start()
+
+    try:
+        returncode, usage = wait_with_usage(process, timeout)
+    except subprocess.TimeoutExpired as e:
+        # 孙进程（或脱离进程组的进程）可能仍持有管道，只等待有限时间，已读到的输出随异常返回
+        if new_session:
+            kill_process_group(process)
+        join_readers(readers)
+        raise subprocess.TimeoutExpired(e.cmd, e.timeout, output=b''.join(chunks['stdout']),
+                                        stderr=b''.join(chunks['stderr'])) from None
+
+    for reader in readers:
+        reader.join()
+
+    return {
+        'returncode': returncode,
+        'stdout': decode_output(b''.join(chunks['stdout']), encoding),
+        'stderr': decode_output(b''.join(chunks['stderr']), encoding),
+        'resources': usage,
+    }
+
+
+def decode_output(data, encoding='utf-8'):
+    """解码子进程输出，与 text=True 一致：统一换行符"""
+    if not data:
+        return ''
+    text = data.decode(encoding, errors='replace')
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def run_warm_command(command, cwd, env, encoding, timeout, timeline):
+    """
+    在预热解释器池中执行 Python 脚本命令
+
+    Returns:
+        dict | None: 与 run_captured 相同的结果；命令不适用或预热池不可用时为 None
+    """
+    from celery_tasks import warm_pool
+
+    if not os.environ.get(warm_pool.SOCKET_ENV):
+        return None
+    argv = warm_pool.warm_argv(command, env, cwd)
+    if argv is None:
+        return None
+    timeline['subprocess_start'] = time.time()
+    try:
+        return warm_pool.run_warm(argv, cwd=cwd, env=env, encoding=encoding, timeout=timeout)
+    except warm_pool.WarmPoolUnavailable as e:
+        print(f'[warm] Fallback to normal execution: {e}', file=sys.stderr)
+        return None
+
+
+# CommandFailed 是预期的失败（工作流短路），Worker 日志中不打印异常堆栈
+@app.task(bind=True, name='execute_command', throws=(CommandFailed,))
 def execute_command(
     self,
     command,
@@ -69,26 +478,55 @@ def execute_command(
     env_vars=None,
     shell=True,
     encoding='utf-8',
-    capture_output=True
+    capture_output=True,
+    stream=False,
+    blob_threshold=None,
+    cache=False,
+    cache_key=None,
+    cache_ttl=None,
+    cache_env=None,
+    cache_inputs=None,
+    cache_input_mode='mtime',
+    singleflight=False,
+    command_prefix=None,
+    warm=True,
+    raise_on_failure=False
 ):
     """
     执行终端命令的通用任务
 
     Args:
         self: Celery 任务实例
-        command (str): 要执行的命令
+        command (str | list): 要执行的命令（列表形式直接执行，不经过 shell）
         cwd (str, optional): 工作目录
         timeout (int): 命令超时时间（秒）
         env_vars (dict, optional): 环境变量字典
-        shell (bool): 是否使用 shell 执行
+        shell (bool | str): 是否使用 shell 执行；'auto' 表示命令不含 shell 语法时
+            直接执行（posix_spawn/vfork，省去 /bin/sh 的启动和解析），否则使用 shell
         encoding (str): 输出编码
         capture_output (bool): 是否捕获输出
+        stream (bool): 是否将输出实时发布到 Redis Stream
+        blob_threshold (int, optional): 输出超过该字节数时转存到本地 Blob 存储，
+            结果中只保留首尾预览和引用（默认 256KB）
+        cache (bool): 是否启用执行缓存（相同指纹的命令直接返回缓存结果）
+        cache_key (str, optional): 自定义缓存键（指定时启用缓存，不再计算指纹）
+        cache_ttl (int, optional): 缓存时间（秒，默认 3600）
+        cache_env (list, optional): 额外计入指纹的环境变量名（env_vars 总是计入）
+        cache_inputs (list, optional): 计入指纹的输入文件（相对路径基于 cwd）
+        cache_input_mode (str): 输入文件签名方式：mtime（修改时间+大小）或 hash（内容哈希）
+        singleflight (bool): 是否对同时执行的相同命令去重（后到的任务等待并共用先到任务的结果）
+        command_prefix (str, optional): 资源统计汇总使用的命令前缀（默认取程序名和第一个参数）
+        warm (bool): Worker 启用了预热解释器池时，是否在池中执行 Python 脚本命令
+        raise_on_failure (bool): 命令失败时抛出 CommandFailed（结果已记录），使 chain 中
+            后续任务不再执行、chord 回调以 ChordError 结束（DAG 工作流使用）
 
     Returns:
         dict: 执行结果
     """
-    import time
+    from celery_tasks.command_utils import command_text, prepare_command
+
     start_time = time.time()
+    timeline = task_timeline(self.request, start_time)
 
     result = {
         'command': command,
@@ -97,53 +535,118 @@ def execute_command(
         'skill_python': SKILL_PYTHON,  # 记录使用的 Python 路径
     }
 
-    # 准备环境变量：确保子进程使用技能虚拟环境
-    env = os.environ.copy()
+    # 准备环境变量：确保子进程使用技能虚拟环境（基础环境已缓存，不再每次复制 os.environ）
+    env = task_env(env_vars)
 
-    # 在 Windows 上，确保 PATH 优先使用技能虚拟环境
-    if platform.system() == 'Windows':
-        scripts_dir = str(SKILL_VENV_DIR / 'Scripts')
-        # 将技能虚拟环境的 Scripts 目录放在 PATH 最前面
-        path_list = [scripts_dir]
-        if 'PATH' in env:
-            path_list.append(env['PATH'])
-        env['PATH'] = os.pathsep.join(path_list)
+    # 执行缓存：命中时直接返回缓存结果，不启动子进程
+    entry_key, cached = None, None
+    if cache or cache_key:
+        entry_key, cached = lookup_cache(
+            command, cwd, env, env_vars,
+            cache_key=cache_key,
+            cache_env=cache_env,
+            cache_inputs=cache_inputs,
+            cache_input_mode=cache_input_mode,
+        )
 
-    if env_vars:
-        env.update(env_vars)
+    # 单飞去重：相同命令正在执行时等待其结果
+    flight, shared = None, None
+    if singleflight and cached is None:
+        flight, shared = join_flight(command, cwd, env_vars, self.request.id, timeout)
 
     try:
-        # 执行命令
-        process = subprocess.run(
-            command,
-            shell=shell,
-            cwd=cwd,
-            env=env,
-            capture_output=capture_output,
-            text=True,
-            encoding=encoding,
-            timeout=timeout,
-        )
+        if cached is not None:
+            result.update(cached)
+            result.update({
+                'cache': 'hit',
+                'cache_key': entry_key,
+                'original_duration': cached.get('duration'),
+                'duration': round(time.time() - start_time, 3),
+            })
+            if stream:
+                result['stream_key'] = replay_stream(self.request.id, cached)
+        elif shared is not None:
+            result.update({k: shared[k] for k in CACHED_FIELDS if k in shared})
+            result.update({
+                'singleflight': 'follower',
+                'leader_task_id': flight.leader_task_id,
+                'original_duration': shared.get('duration'),
+                'duration': round(time.time() - start_time, 3),
+            })
+            if stream:
+                result['stream_key'] = replay_stream(self.request.id, shared)
+        elif stream:
+            # 流式执行：输出实时发布，完整输出写入临时文件
+            args, popen_options = prepare_command(command, shell, env)
+            result['exec_mode'] = 'shell' if popen_options['shell'] else 'argv'
+            timeline['subprocess_start'] = time.time()
+            streamed = run_streaming(
+                args,
+                self.request.id,
+                cwd=cwd,
+                env=env,
+                encoding=encoding,
+                timeout=timeout,
+                blob_threshold=blob_threshold,
+                **popen_options,
+            )
+            timeline['subprocess_end'] = time.time()
+            duration = time.time() - start_time
+            returncode = streamed.pop('returncode')
+            result.update({
+                'success': returncode == 0,
+                'returncode': returncode,
+                'duration': round(duration, 3),
+                **streamed,
+            })
+        else:
+            # 执行命令：Python 脚本优先交给预热解释器池（Worker 以 --warm 启动时）
+            captured = None
+            if warm and capture_output:
+                captured = run_warm_command(command, cwd, env, encoding, timeout, timeline)
+            if captured is not None:
+                result['exec_mode'] = 'warm'
+            else:
+                args, popen_options = prepare_command(command, shell, env)
+                result['exec_mode'] = 'shell' if popen_options['shell'] else 'argv'
+                timeline['subprocess_start'] = time.time()
+                captured = run_captured(
+                    args,
+                    cwd=cwd,
+                    env=env,
+                    encoding=encoding,
+                    timeout=timeout,
+                    capture_output=capture_output,
+                    **popen_options,
+                )
+            timeline['subprocess_end'] = time.time()
 
-        duration = time.time() - start_time
+            duration = time.time() - start_time
 
-        result.update({
-            'success': process.returncode == 0,
-            'returncode': process.returncode,
-            'stdout': process.stdout if capture_output else '',
-            'stderr': process.stderr if capture_output else '',
-            'duration': round(duration, 3),
-        })
+            result.update({
+                'success': captured['returncode'] == 0,
+                'returncode': captured['returncode'],
+                'stdout': captured['stdout'],
+                'stderr': captured['stderr'],
+                'duration': round(duration, 3),
+                'resources': captured['resources'],
+            })
+            offload_output(result, encoding, blob_threshold)
 
-    except subprocess.TimeoutExpired:
+    except subprocess.TimeoutExpired as e:
         duration = time.time() - start_time
+        # 超时前已产生的输出（流式执行的输出已实时发布，这里为空）
+        stderr = decode_output(e.stderr, encoding)
+        if stderr and not stderr.endswith('\n'):
+            stderr += '\n'
         result.update({
             'success': False,
             'returncode': -2,
-            'stdout': '',
-            'stderr': f'命令执行超时（超过 {timeout} 秒）',
+            'stdout': decode_output(e.output, encoding),
+            'stderr': stderr + f'命令执行超时（超过 {timeout} 秒）',
             'duration': round(duration, 3),
         })
+        offload_output(result, encoding, blob_threshold)
 
     except FileNotFoundError as e:
         duration = time.time() - start_time
@@ -165,22 +668,63 @@ def execute_command(
             'duration': round(duration, 3),
         })
 
+    # 超时或启动失败时子进程结束时间取异常处理时刻
+    if 'subprocess_start' in timeline:
+        timeline.setdefault('subprocess_end', start_time + result['duration'])
+
+    # 按命令前缀累计资源统计（缓存命中、单飞 follower 没有启动子进程，不计入）
+    if result.get('resources'):
+        from celery_tasks import telemetry
+        from celery_tasks.command_utils import command_prefix as extract_prefix
+        from celery_tasks.resource_usage import USAGE_ENABLED, record_usage
+        result['command_prefix'] = command_prefix or extract_prefix(command)
+        if USAGE_ENABLED:
+            telemetry.record(record_usage, result['command_prefix'], result['duration'],
+                             result['resources'])
+
+    if flight is not None and flight.is_leader:
+        result['singleflight'] = 'leader'
+        flight.complete({k: result[k] for k in CACHED_FIELDS if k in result})
+
+    # 只缓存成功的结果，失败的命令下次仍会重新执行（follower 的结果已由 leader 缓存）；
+    # 超过条目大小上限或输出已转存 Blob 的结果也不缓存（cache_stored 为 False）
+    if entry_key and cached is None and shared is None:
+        result['cache'] = 'miss'
+        result['cache_key'] = entry_key
+        if result.get('success'):
+            from celery_tasks import exec_cache
+            result['cache_stored'] = exec_cache.put(
+                entry_key,
+                {k: result[k] for k in CACHED_FIELDS if k in result},
+                ttl=cache_ttl,
+            )
+
     # 发送任务完成通知
     try:
         from celery_tasks.ntfy_notifier import notify_task_complete
-        import sys
-        sent = notify_task_complete('execute_command', command, result)
+        sent = notify_task_complete('execute_command', command_text(command), result)
         # 输出通知发送状态到 stderr（会显示在 Worker 日志中）
+        # 异步模式下只表示已放入发送队列，实际发送由后台线程完成
         print(f'[ntfy] Notification sent: {sent}', file=sys.stderr)
     except ImportError as e:
         # ntfy 模块不可用，忽略
-        import sys
         print(f'[ntfy] Import error: {e}', file=sys.stderr)
     except Exception as e:
         # 通知发送失败不影响任务结果
-        import sys
         print(f'[ntfy] Send error: {e}', file=sys.stderr)
 
+    # 延迟分解：异步通知模式下 notified 为放入发送队列的时间
+    timeline['notified'] = time.time()
+    result['timeline'] = timeline
+    save_timeline(self.request.id, result)
+    save_history(self.request, result)
+
+    if raise_on_failure and not result.get('success'):
+        raise CommandFailed(
+            f"命令失败（返回码 {result.get('returncode')}）: {command_text(command)}",
+            failure_summary(result),
+        )
+
     return result
 
 
@@ -192,3 +736,155 @@ def ping():
         'message': 'Celery Worker is running!',
         'platform': platform.system(),
     }
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def flush_notifications(**kwargs):
+    """Worker（子）进程退出前，发送完队列中尚未发出的通知，并写完统计"""
+    try:
+        from celery_tasks.ntfy_notifier import get_notifier
+        get_notifier().flush(timeout=10)
+    except Exception as e:
+        print(f'[ntfy] Flush error: {e}', file=sys.stderr)
+
+    from celery_tasks import telemetry
+    if not telemetry.flush(timeout=10):
+        print('[telemetry] Flush timed out, some statistics were not written', file=sys.stderr)
+
+
+@task_postrun.connect
+def record_task_duration(sender=None, retval=None, **kwargs):
+    """记录命令实际执行耗时（缓存命中、单飞 follower 除外），供自动扩缩容估算积压"""
+    if getattr(sender, 'name', None) != 'execute_command' or not isinstance(retval, dict):
+        return
+    if 'original_duration' in retval or retval.get('duration') is None:
+        return
+    from celery_tasks import telemetry
+    from celery_tasks.autoscale import DURATIONS_ENABLED, record_duration
+    if DURATIONS_ENABLED:
+        telemetry.record(record_duration, retval['duration'])
+
+
+@task_received.connect
+def record_received(request=None, **kwargs):
+    """
+    记录 Worker 收到消息的时间
+
+    写入请求字典（任务中为 request.received_at），prefork 下随请求一起传给子进程，
+    不需要经过 Redis。
+    """
+    if getattr(request, 'name', None) != 'execute_command':
+        return
+    request_dict = getattr(request, 'request_dict', None)
+    if request_dict is not None:
+        request_dict['received_at'] = time.time()
+
+
+# 正在执行的任务开始时间（task_id → monotonic 时间，用于耗时直方图）
+_task_started = {}
+
+
+def queue_wait_seconds(request, now):
+    """根据消息头中的发布时间计算排队时间（定时任务从 ETA 开始计算）"""
+    published_at = getattr(request, 'published_at', None)
+    if not published_at:
+        return None
+    ready_at = float(published_at)
+    if request.eta:
+        try:
+            ready_at = max(ready_at, datetime.fromisoformat(str(request.eta)).timestamp())
+        except ValueError:
+            pass
+    return max(now - ready_at, 0.0)
+
+
+@task_prerun.connect
+def metrics_task_prerun(task_id=None, task=None, **kwargs):
+    """指标：正在执行的任务数、排队时间"""
+    from celery_tasks import metrics
+
+    _task_started[task_id] = time.monotonic()
+    calls = [(metrics.inc, 'tasks_in_flight', {'worker': task.request.hostname or ''})]
+    wait = queue_wait_seconds(task.request, time.time())
+    if wait is not None:
+        calls.append((metrics.observe, 'queue_wait_seconds', wait, {'task': task.name}))
+    metrics.record(*calls)
+
+
+@task_postrun.connect
+def metrics_task_postrun(task_id=None, task=None, retval=None, state=None, **kwargs):
+    """指标：任务数（按状态）、耗时、返回码"""
+    from celery_tasks import metrics
+
+    calls = [
+        (metrics.inc, 'tasks_in_flight', {'worker': task.request.hostname or ''}, -1),
+        (metrics.inc, 'tasks_total', {'task': task.name, 'state': state or 'UNKNOWN'}),
+    ]
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        calls.append((metrics.observe, 'task_duration_seconds',
+                      time.monotonic() - started, {'task': task.name}))
+    if task.name == 'execute_command' and isinstance(retval, dict):
+        calls.append((metrics.inc, 'returncode_total', {'code': retval.get('returncode')}))
+    metrics.record(*calls)
+
+
+@task_revoked.connect
+def metrics_task_revoked(request=None, **kwargs):
+    """指标：执行前被撤销的任务"""
+    from celery_tasks import metrics
+
+    name = getattr(getattr(request, 'task', None), 'name', None) or getattr(request, 'name', '')
+    metrics.record((metrics.inc, 'tasks_total', {'task': name, 'state': 'REVOKED'}))
+
+
+@worker_init.connect
+def start_warm_pool(**kwargs):
+    """启用预热解释器池时，在创建 prefork 子进程之前启动 zygote（子进程继承其 Socket 路径）"""
+    from celery_tasks import warm_pool
+
+    if not warm_pool.WARM_ENABLED:
+        return
+    try:
+        warm_pool.start_zygote()
+    except Exception as e:
+        print(f'[warm] Start error: {e}', file=sys.stderr)
+
+
+@worker_shutdown.connect
+def stop_warm_pool(**kwargs):
+    """Worker 关闭时停止 zygote"""
+    from celery_tasks import warm_pool
+
+    warm_pool.stop_zygote()
+
+
+# Worker 心跳（派发时的快速健康检查使用）
+_heartbeat = None
+
+
+@worker_ready.connect
+def start_heartbeat(sender=None, **kwargs):
+    """Worker 就绪后开始定期写入 Redis 心跳"""
+    global _heartbeat
+    import socket
+    hostname = getattr(sender, 'hostname', None) or socket.gethostname()
+    try:
+        from celery_tasks.heartbeat import HeartbeatPublisher
+        _heartbeat = HeartbeatPublisher(hostname)
+        _heartbeat.start()
+    except Exception as e:
+        print(f'[heartbeat] Start error: {e}', file=sys.stderr)
+
+    # 指标端点（配置了端口时启动）；Worker 重启后清零其正在执行的任务数
+    from celery_tasks import metrics
+    metrics.record((metrics.set_value, 'tasks_in_flight', {'worker': hostname}, 0))
+    metrics.start_server()
+
+
+@worker_shutdown.connect
+def stop_heartbeat(**kwargs):
+    """Worker 关闭时删除心跳，派发端会立即回退到完整检查"""
+    if _heartbeat is not None:
+        _heartbeat.stop()
@@ -0,0 +1,478 @@
+"""
+DAG 工作流模块
+把声明式的依赖图（YAML/JSON）转换为 execute_command 的 Celery chain / group / chord：
+
+  nodes:
+    fetch:     {command: python fetch.py}
+    analyze-a: {command: python analyze.py a, needs: [fetch]}
+    analyze-b: {command: python analyze.py b, needs: [fetch]}
+    report:    {command: python report.py, needs: [analyze-a, analyze-b]}
+
+  → chain(fetch, chord(group(analyze-a, analyze-b), report))
+
+转换按串并联分解：互不相连的部分组成 group 并行执行；与其余全部节点都有先后关系的节点
+把图切成前后两段组成 chain（group 之后接任务时 Celery 自动升级为 chord）。无法精确分解的
+部分按层切分，后一层等待前一层全部完成（report 中列出这些额外等待）。
+
+每个节点以 raise_on_failure=True 派发：命令失败时任务抛出 CommandFailed，Celery 不再执行
+chain 中后续的任务，chord 的回调以 ChordError 结束，依赖它的节点即被短路。
+节点声明 allow_failure: true 时失败不影响后续节点。
+
+模块级只使用标准库（celery 在构建签名时才导入），Worker 抛出 CommandFailed 时导入开销很小。
+"""
+
+import json
+import asyncio
+import uuid
+from pathlib import Path
+
+
+# 节点中除 command、needs 之外可用的字段（传给 execute_command 或作为派发选项）
+NODE_FIELDS = frozenset({
+    'cwd', 'timeout', 'env', 'queue', 'priority', 'allow_failure',
+    'cache', 'cache_key', 'cache_ttl', 'cache_env', 'cache_inputs', 'cache_input_mode',
+    'singleflight', 'shell', 'warm',
+})
+
+# 失败结果中随 CommandFailed 返回的 stderr 长度（字符）
+FAILURE_STDERR_CHARS = 2000
+
+
+class CommandFailed(Exception):
+    """
+    工作流节点的命令失败（返回码非 0、超时或启动失败）
+
+    args: (说明, 结果摘要)，结果摘要包含 returncode、duration、timeline、stderr 末尾，
+    派发端从结果后端的异常信息中读取，生成耗时报告
+    """
+
+
+def failure_summary(result):
+    """从 execute_command 结果中提取随 CommandFailed 返回的摘要"""
+    stderr = result.get('stderr') or ''
+    return {
+        'returncode': result.get('returncode'),
+        'duration': result.get('duration'),
+        'timeline': result.get('timeline'),
+        'stderr': stderr[-FAILURE_STDERR_CHARS:],
+    }
+
+
+def load_workflow(path):
+    """
+    读取工作流文件（YAML，未安装 PyYAML 时可使用 JSON 文件）
+
+    nodes 可以是 {名称: 节点} 映射，也可以是带 name 字段的列表；
+    defaults 中的字段作为每个节点的默认值。
+
+    Returns:
+        dict: {'name': 名称, 'nodes': {名称: 节点}}（节点按文件中的顺序）
+
+    Raises:
+        ValueError: 格式错误、依赖不存在或存在环
+    """
+    path = Path(path)
+    text = path.read_text(encoding='utf-8')
+
+    if path.suffix == '.json':
+        config = json.loads(text)
+    else:
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError('读取 YAML 工作流需要 PyYAML（pip install pyyaml），或改用 JSON 文件')
+        config = yaml.safe_load(text) or {}
+
+    if not isinstance(config, dict):
+        raise ValueError(f'工作流文件应为映射: {path}')
+
+    raw_nodes = config.get('nodes') or []
+    if isinstance(raw_nodes, dict):
+        raw_nodes = [{'name': name, **(spec or {})} for name, spec in raw_nodes.items()]
+    if not raw_nodes:
+        raise ValueError(f'工作流中没有 nodes: {path}')
+
+    defaults = config.get('defaults') or {}
+    unknown = set(defaults) - NODE_FIELDS
+    if unknown:
+        raise ValueError(f"defaults 中有未知字段: {', '.join(sorted(unknown))}")
+
+    nodes = {}
+    for i, raw in enumerate(raw_nodes, 1):
+        if isinstance(raw, str):
+            raw = {'name': raw}
+        name = str(raw.get('name') or '')
+        if not name:
+            raise ValueError(f'第 {i} 个节点缺少 name')
+        if name in nodes:
+            raise ValueError(f'节点名称重复: {name}')
+        if not raw.get('command'):
+            raise ValueError(f'节点 {name} 缺少 command')
+        unknown = set(raw) - NODE_FIELDS - {'name', 'command', 'needs'}
+        if unknown:
+            raise ValueError(f"节点 {name} 有未知字段: {', '.join(sorted(unknown))}")
+
+        needs = raw.get('needs') or []
+        if isinstance(needs, str):
+            needs = [needs]
+        node = {**defaults, **{k: v for k, v in raw.items() if k not in ('name', 'needs')}}
+        node['needs'] = [str(n) for n in needs]
+        nodes[name] = node
+
+    for name, node in nodes.items():
+        for dep in node['needs']:
+            if dep not in nodes:
+                raise ValueError(f'节点 {name} 依赖的 {dep} 不存在')
+            if dep == name:
+                raise ValueError(f'节点 {name} 依赖自身')
+
+    topological_order(nodes)
+    return {'name': config.get('name') or path.stem, 'nodes': nodes}
+
+
+def topological_order(nodes):
+    """
+    按依赖排序节点（同层保持文件中的顺序）
+
+    Raises:
+        ValueError: 依赖存在环
+    """
+    indegree = {name: len(set(node['needs'])) for name, node in nodes.items()}
+    dependents = {name: [] for name in nodes}
+    for name, node in nodes.items():
+        for dep in set(node['needs']):
+            dependents[dep].append(name)
+
+    ready = [name for name in nodes if indegree[name] == 0]
+    order = []
+    while ready:
+        name = ready.pop(0)
+        order.append(name)
+        for child in dependents[name]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                ready.append(child)
+
+    if len(order) < len(nodes):
+        cycle = [name for name in nodes if indegree[name] > 0]
+        raise ValueError(f"依赖存在环: {', '.join(cycle)}")
+    return order
+
+
+def ancestors_of(nodes, order=None):
+    """每个节点的全部祖先（直接和间接依赖）"""
+    ancestors = {}
+    for name in order or topological_order(nodes):
+        found = set()
+        for dep in nodes[name]['needs']:
+            found.add(dep)
+            found |= ancestors[dep]
+        ancestors[name] = found
+    return ancestors
+
+
+def plan_workflow(nodes):
+    """
+    把依赖图分解为串并联结构
+
+    Returns:
+        tuple: (计划树, 每个节点在计划中实际等待的节点集合)
+            计划树: ('node', 名称) | ('chain', [子树]) | ('group', [子树])
+    """
+    order = topological_order(nodes)
+    position = {name: i for i, name in enumerate(order)}
+    ancestors = ancestors_of(nodes, order)
+    descendants = {name: set() for name in nodes}
+    for name, found in ancestors.items():
+        for ancestor in found:
+            descendants[ancestor].add(name)
+
+    def ordered(names):
+        return sorted(names, key=position.get)
+
+    def components(names):
+        """子图（只看子图内部的依赖）的弱连通分量"""
+        remaining = set(names)
+        parts = []
+        for start in ordered(names):
+            if start not in remaining:
+                continue
+            part, stack = set(), [start]
+            while stack:
+                name = stack.pop()
+                if name not in remaining:
+                    continue
+                remaining.discard(name)
+                part.add(name)
+                neighbours = (set(nodes[name]['needs']) | {
+                    child for child in names if name in nodes[child]['needs']
+                }) & remaining
+                stack.extend(neighbours)
+            parts.append(part)
+        return parts
+
+    def build(names):
+        if len(names) == 1:
+            return ('node', next(iter(names)))
+
+        parts = components(names)
+        if len(parts) > 1:
+            return ('group', [build(part) for part in parts])
+
+        # 与子图中其余全部节点都有先后关系的节点：在它前后切开，结果精确
+        pivots = [
+            name for name in ordered(names)
+            if names - {name} <= ancestors[name] | descendants[name]
+        ]
+        if pivots:
+            steps, before = [], set(names)
+            for pivot in pivots:
+                segment = before & ancestors[pivot]
+                if segment:
+                    steps.append(build(segment))
+                steps.append(('node', pivot))
+                before = before & descendants[pivot]
+            if before:
+                steps.append(build(before))
+            return flatten(('chain', steps))
+
+        # 无法精确分解：子图的起点作为一层，其余节点等待这一层全部完成
+        sources = {name for name in names if not set(nodes[name]['needs']) & names}
+        return flatten(('chain', [build(sources), build(names - sources)]))
+
+    tree = build(set(nodes))
+    waits = {}
+    collect_waits(tree, frozenset(), waits)
+    return tree, waits
+
+
+def flatten(tree):
+    """合并嵌套的 chain"""
+    kind, parts = tree
+    if kind != 'chain':
+        return tree
+    steps = []
+    for part in parts:
+        steps.extend(part[1] if part[0] == 'chain' else [part])
+    return ('chain', steps)
+
+
+def tree_nodes(tree):
+    """计划树中的全部节点名称"""
+    kind, value = tree
+    if kind == 'node':
+        return {value}
+    found = set()
+    for part in value:
+        found |= tree_nodes(part)
+    return found
+
+
+def collect_waits(tree, prior, waits):
+    """记录每个节点开始前必须完成的节点（chain 中排在前面的全部节点）"""
+    kind, value = tree
+    if kind == 'node':
+        waits[value] = set(prior)
+    elif kind == 'group':
+        for part in value:
+            collect_waits(part, prior, waits)
+    else:
+        for part in value:
+            collect_waits(part, prior, waits)
+            prior = prior | tree_nodes(part)
+
+
+def describe_plan(tree):
+    """计划树的文字描述：a → [b | c] → d"""
+    kind, value = tree
+    if kind == 'node':
+        return value
+    if kind == 'group':
+        return '[' + ' | '.join(describe_plan(part) for part in value) + ']'
+    return '(' + ' → '.join(describe_plan(part) for part in value) + ')'
+
+
+def extra_waits(nodes, waits):
+    """计划中比声明的依赖多出的等待（无法精确分解时）"""
+    ancestors = ancestors_of(nodes)
+    return {
+        name: sorted(waits[name] - ancestors[name])
+        for name in nodes
+        if waits[name] - ancestors[name]
+    }
+
+
+def build_canvas(app, workflow, timeout=300, cwd=None, options=None):
+    """
+    构建工作流的 Celery 签名
+
+    Args:
+        app: Celery 应用
+        workflow (dict): load_workflow 的返回值
+        timeout (int): 默认命令超时时间（节点可覆盖）
+        cwd (str, optional): 默认工作目录（节点可覆盖）
+        options (dict, optional): 默认派发选项 queue/priority（节点可覆盖）
+
+    Returns:
+        tuple: (签名, {节点名称: 任务 ID}, 计划树, 节点实际等待的节点)
+    """
+    from celery import chain, group
+    from celery_tasks.client import build_batch_signatures
+
+    nodes = workflow['nodes']
+    tree, waits = plan_workflow(nodes)
+    names = list(nodes)
+    signatures = build_batch_signatures(
+        app, [nodes[name] for name in names], timeout=timeout, cwd=cwd, options=options
+    )
+
+    # 预先分配任务 ID，派发端据此等待每个节点；immutable：不把上游结果作为参数传入
+    task_ids = {}
+    by_name = {}
+    for name, signature in zip(names, signatures):
+        task_ids[name] = str(uuid.uuid4())
+        if not nodes[name].get('allow_failure'):
+            signature.kwargs['raise_on_failure'] = True
+        by_name[name] = signature.set(task_id=task_ids[name], immutable=True)
+
+    def to_canvas(part):
+        kind, value = part
+        if kind == 'node':
+            return by_name[value]
+        if kind == 'group':
+            return group([to_canvas(p) for p in value])
+        return chain(*[to_canvas(p) for p in value])
+
+    return to_canvas(tree), task_ids, tree, waits
+
+
+def node_result(meta):
+    """
+    把结果后端中的任务元数据转换为节点结果
+
+    Returns:
+        dict: status（success/failed/error）、allowed（失败不影响后续节点）、
+            returncode、duration、timeline、stderr
+    """
+    result = meta.get('result')
+    if meta.get('status') == 'SUCCESS' and isinstance(result, dict):
+        # 失败但任务成功结束：节点声明了 allow_failure，不影响后续节点
+        return {
+            'status': 'success' if result.get('success') else 'failed',
+            'allowed': not result.get('success'),
+            'returncode': result.get('returncode'),
+            'duration': result.get('duration'),
+            'timeline': result.get('timeline') or {},
+            'stderr': (result.get('stderr') or '')[-FAILURE_STDERR_CHARS:],
+        }
+
+    exc = result if isinstance(result, dict) else {}
+    args = exc.get('exc_message') or []
+    if exc.get('exc_type') == 'CommandFailed' and len(args) > 1 and isinstance(args[1], dict):
+        summary = args[1]
+        return {
+            'status': 'failed',
+            'returncode': summary.get('returncode'),
+            'duration': summary.get('duration'),
+            'timeline': summary.get('timeline') or {},
+            'stderr': summary.get('stderr') or '',
+        }
+
+    message = args[0] if isinstance(args, list) and args else args
+    return {
+        'status': 'error',
+        'returncode': None,
+        'duration': None,
+        'timeline': {},
+        'stderr': f"{exc.get('exc_type') or meta.get('status')}: {message}",
+    }
+
+
+async def wait_for_nodes(task_ids, waits, timeout=None, on_node=None, on_subscribed=None):
+    """
+    等待工作流节点结束
+
+    节点失败后，计划中等待它的节点不会再执行，标记为 skipped；
+    其余节点全部结束（或超时）后返回。
+
+    Args:
+        task_ids (dict): {节点名称: 任务 ID}
+        waits (dict): 每个节点开始前必须成功的节点
+        timeout (float, optional): 整体超时（秒）
+        on_node (callable, optional): 每个节点结束时调用 on_node(名称, 结果)
+        on_subscribed (callable, optional): 全部节点订阅完成后调用（在此派发工作流）
+
+    Returns:
+        dict: {节点名称: 结果}，超时未结束的节点 status 为 pending
+    """
+    import time
+    from celery_tasks.result_waiter import ResultWatcher
+
+    watcher = ResultWatcher()
+    results = {}
+    start = time.monotonic()
+    try:
+        futures = {}
+        for name, task_id in task_ids.items():
+            futures[await watcher.watch(task_id)] = name
+        if on_subscribed is not None:
+            on_subscribed()
+
+        live = set(task_ids)
+        while live:
+            # 依赖失败的节点不会执行（chain 中断或 chord 回调以 ChordError 结束）
+            for name in list(live):
+                blocked = [dep for dep in waits[name]
+                           if dep in results and results[dep]['status'] != 'success'
+                           and not results[dep].get('allowed')]
+                if blocked:
+                    live.discard(name)
+                    results[name] = {'status': 'skipped', 'blocked_by': blocked}
+                    if on_node is not None:
+                        on_node(name, results[name])
+            if not live:
+                break
+
+            remaining = None
+            if timeout is not None:
+                remaining = timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    break
+            pending = [f for f, name in futures.items() if name in live]
+            done, _ = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                name = futures[future]
+                live.discard(name)
+                results[name] = node_result(future.result())
+                if on_node is not None:
+                    on_node(name, results[name])
+
+        for name in live:
+            results[name] = {'status': 'pending'}
+    finally:
+        await watcher.close()
+    return results
+
+
+def critical_path(nodes, results):
+    """
+    按实际耗时计算关键路径（耗时之和最大的依赖链；跳过的节点耗时为 0）
+
+    Returns:
+        tuple: (节点名称列表, 耗时之和)
+    """
+    best = {}
+    for name in topological_order(nodes):
+        weight = (results.get(name) or {}).get('duration') or 0
+        previous = max(nodes[name]['needs'], key=lambda dep: best[dep][1], default=None)
+        if previous is None:
+            best[name] = ([name], weight)
+        else:
+            path, total = best[previous]
+            best[name] = (path + [name], total + weight)
+    if not best:
+        return [], 0
+    path, total = max(best.values(), key=lambda item: item[1])
+    return path, round(total, 3)
@@ -0,0 +1,708 @@
+#!/usr/bin/env python
+"""
+性能基准测试脚本
+测量任务派发链路的关键耗时，结果可输出为 JSON，便于在不同提交之间对比
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+
+
+# 添加技能路径
+skill_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(skill_dir))
+
+from celery_tasks.settings import SERIALIZATION_PROFILES
+from celery_tasks.stats import summarize
+
+
+# roundtrip 测试的并发池
+ROUNDTRIP_POOLS = ('solo', 'prefork', 'threads', 'gevent')
+
+# in-memory 模式支持的并发池：结果后端不跨进程；内存 Broker 使用阻塞轮询循环，
+# 其他线程的任务确认要等轮询超时后才执行，threads 池的结果没有参考意义
+IN_MEMORY_POOLS = ('solo',)
+
+# 基准测试专用队列（避免任务被正在运行的 Worker 消费）
+BENCHMARK_QUEUE = 'benchmark'
+
+# 等待 Worker 就绪的时间（秒）
+WORKER_READY_TIMEOUT = 60
+
+# serializers 测试默认执行的命令（输出较多的常见命令，用其结果作为真实负载）
+SERIALIZER_COMMANDS = ('ps aux', 'ls -la /usr/bin', 'env', 'git log --stat -n 100')
+
+
+def time_process(cmd, runs, env=None):
+    """
+    多次运行命令并记录每次从启动到退出的耗时
+
+    Args:
+        cmd (list): 命令参数
+        runs (int): 运行次数
+        env (dict, optional): 环境变量
+
+    Returns:
+        list[float]: 每次耗时（毫秒）
+    """
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE, env=env)
+        elapsed = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            raise RuntimeError(f"命令执行失败: {' '.join(cmd)}\n"
+                               f"{result.stderr.decode(errors='replace')}")
+        samples.append(elapsed)
+    return samples
+
+
+def bench_cold_start(runs=20, command='echo benchmark', target_ms=150):
+    """
+    测量 dispatch.py 的冷启动耗时（进程启动 → 消息发布 → 进程退出）
+
+    同时测量解释器空启动和导入 celery 的耗时作为参照；
+    常驻派发守护进程运行时，额外测量经由守护进程派发的耗时。
+
+    Args:
+        runs (int): 每项测量的运行次数
+        command (str): 派发的命令
+        target_ms (float): 目标耗时（毫秒）
+
+    Returns:
+        dict: 各项耗时汇总（毫秒）
+    """
+    python = sys.executable
+    dispatch_script = str(skill_dir / "scripts" / "dispatch.py")
+
+    cases = {
+        'python_startup': [python, '-c', 'pass'],
+        'import_celery': [python, '-c', 'import celery, kombu.transport.redis'],
+        'dispatch_bg': [python, dispatch_script, command, '--bg', '--no-daemon'],
+    }
+
+    from celery_tasks.dispatch_client import DaemonClient
+    client = DaemonClient.connect()
+    if client is not None:
+        client.close()
+        cases['dispatch_bg_daemon'] = [python, dispatch_script, command, '--bg']
+
+    results = {}
+    for name, cmd in cases.items():
+        print(f"  测量 {name} ({runs} 次)...")
+        results[name] = summarize(time_process(cmd, runs))
+
+    p50 = min(summary['p50'] for name, summary in results.items()
+              if name.startswith('dispatch_bg'))
+    results['target_ms'] = target_ms
+    results['meets_target'] = p50 is not None and p50 <= target_ms
+    return results
+
+
+def roundtrip_workloads(large_bytes):
+    """
+    roundtrip 测试的任务：ping、输出极少的命令、大输出命令
+
+    Returns:
+        dict: {名称: (任务名, 任务参数)}
+    """
+    large = f'"{sys.executable}" -c "import sys; sys.stdout.write(\'x\' * {large_bytes})"'
+    return {
+        'ping': ('ping', {}),
+        'trivial': ('execute_command', {
+            'command': 'echo benchmark', 'timeout': 60,
+            'command_prefix': 'benchmark:trivial',
+        }),
+        'large_output': ('execute_command', {
+            'command': large, 'timeout': 60,
+            'command_prefix': 'benchmark:large_output',
+        }),
+    }
+
+
+def pool_unavailable(pool, in_memory):
+    """
+    检查并发池能否使用
+
+    Returns:
+        str | None: 不可用的原因，可用时为 None
+    """
+    import importlib.util
+
+    if in_memory and pool not in IN_MEMORY_POOLS:
+        return 'in-memory 模式只支持 solo'
+    if pool == 'prefork' and platform.system() == 'Windows':
+        return 'Windows 不支持 prefork'
+    if pool == 'gevent' and importlib.util.find_spec('gevent') is None:
+        return '未安装 gevent'
+    return None
+
+
+def start_benchmark_worker(pool, concurrency, profile):
+    """
+    启动只消费基准测试队列的 Worker 子进程
+
+    Returns:
+        tuple: (subprocess.Popen, 保存 Worker 输出的临时文件)
+    """
+    import tempfile
+
+    env = os.environ.copy()
+    env['CELERY_TASK_SERIALIZATION'] = profile
+    env['CELERY_TASK_NTFY_ENABLED'] = '0'
+    cmd = [
+        sys.executable, '-m', 'celery', '-A', 'celery_tasks.worker', 'worker',
+        f'--pool={pool}', f'--concurrency={concurrency}',
+        f'--queues={BENCHMARK_QUEUE}', f'--hostname=benchmark-{pool}@%h',
+        '--loglevel=WARNING', '--without-gossip', '--without-mingle',
+    ]
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(cmd, cwd=skill_dir, env=env, stdin=subprocess.DEVNULL,
+                               stdout=log, stderr=subprocess.STDOUT)
+    return process, log
+
+
+def stop_benchmark_worker(process, log):
+    """停止 Worker 子进程，返回其输出（出错时用于排查）"""
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    log.seek(0)
+    output = log.read().decode('utf-8', errors='replace')
+    log.close()
+    return output
+
+
+def task_failed(name, result, value):
+    """任务是否失败（execute_command 返回码非 0 也算失败）"""
+    if result.failed():
+        return True
+    return name == 'execute_command' and (
+        not isinstance(value, dict) or value.get('returncode') != 0)
+
+
+def measure_roundtrip(app, name, kwargs, options, runs, tasks, timeout):
+    """
+    测量一种任务的往返延迟和吞吐量
+
+    延迟：逐个派发并等待结果（派发 → 结果返回）；
+    吞吐量：一次派发 tasks 个任务，等待全部完成。
+
+    Returns:
+        dict: tasks_per_sec、errors 及延迟汇总 latency_ms
+    """
+    def roundtrip(results):
+        value = results.get(timeout=timeout, interval=0.001, propagate=False)
+        failed = task_failed(name, results, value)
+        # 删除结果，避免大量基准测试结果留在结果后端
+        results.forget()
+        return failed
+
+    errors = 0
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        errors += roundtrip(app.send_task(name, kwargs=kwargs, **options))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    pending = [app.send_task(name, kwargs=kwargs, **options) for _ in range(tasks)]
+    for result in pending:
+        errors += roundtrip(result)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'tasks_per_sec': tasks / elapsed if elapsed > 0 else None,
+        'errors': errors,
+        'latency_ms': summarize(latencies),
+    }
+
+
+def use_in_memory_broker():
+    """
+    切换到进程内的 Broker/结果后端（必须在导入 celery_tasks.settings 之前调用）
+
+    Worker 的辅助统计（心跳、指标、延迟分解）仍写入 Redis；安装了 fakeredis 时
+    改用进程内的 fakeredis，不需要运行 Redis。
+    """
+    os.environ['CELERY_BROKER_URL'] = 'memory://'
+    os.environ['CELERY_RESULT_BACKEND'] = 'cache+memory://'
+
+    from celery_tasks import redis_client
+    try:
+        import fakeredis
+    except ImportError:
+        print("  ⚠ 未安装 fakeredis，Worker 写入辅助统计时会报错（不影响测量）")
+        return
+    redis_client._clients[redis_client.REDIS_URL] = fakeredis.FakeRedis()
+
+
+def bench_roundtrip(pools, profiles, runs=100, tasks=200, concurrency=4,
+                    large_bytes=100_000, in_memory=False, timeout=60):
+    """
+    测量 派发 → 执行 → 取回结果 的吞吐量和往返延迟
+
+    对每个（并发池, 序列化/压缩组合）启动一个只消费基准测试队列的 Worker，
+    分别测量 ping、输出极少的命令、大输出命令。使用 Redis 时 Worker 为独立进程；
+    in-memory 模式下 Worker 在当前进程内运行（celery.contrib.testing，solo 池），不需要 Redis。
+
+    Args:
+        pools (list): 并发池
+        profiles (list): 序列化配置名称（settings.SERIALIZATION_PROFILES）
+        runs (int): 延迟测量的任务数（逐个派发）
+        tasks (int): 吞吐量测量的任务数（一次派发）
+        concurrency (int): Worker 并发数
+        large_bytes (int): 大输出命令的输出字节数
+        in_memory (bool): 使用进程内 Broker/结果后端
+        timeout (float): 单个任务的等待超时（秒）
+
+    Returns:
+        dict: cases（每个组合、任务的结果）和 skipped（跳过的组合及原因）
+    """
+    from celery_tasks.serialization import profile_unavailable, register_profiles
+
+    # 基准测试的任务不发送完成通知
+    os.environ['CELERY_TASK_NTFY_ENABLED'] = '0'
+    register_profiles()
+
+    if in_memory:
+        use_in_memory_broker()
+        from celery.contrib.testing.worker import start_worker
+        from celery_tasks.worker import app
+        # 内存 Broker 默认每秒轮询一次，会掩盖真实延迟
+        app.conf.broker_transport_options = {'polling_interval': 0.001}
+    else:
+        from celery_tasks.client import get_client_app
+        from celery_tasks.redis_client import get_redis
+        get_redis().ping()
+        app = get_client_app()
+
+    workloads = roundtrip_workloads(large_bytes)
+    results = {
+        'mode': 'memory' if in_memory else 'redis',
+        'concurrency': concurrency,
+        'runs': runs,
+        'tasks': tasks,
+        'large_bytes': large_bytes,
+        'cases': [],
+        'skipped': [],
+    }
+
+    for pool in pools:
+        for profile in profiles:
+            serializer = SERIALIZATION_PROFILES[profile][0]
+            reason = pool_unavailable(pool, in_memory) or profile_unavailable(profile)
+            if reason:
+                print(f"  跳过 {pool}/{profile}: {reason}")
+                results['skipped'].append({'pool': pool, 'profile': profile, 'reason': reason})
+                continue
+
+            options = {'queue': BENCHMARK_QUEUE, 'serializer': serializer}
+            # 结果中不记录序列化方式，客户端须与 Worker 使用相同的结果序列化配置；
+            # 结果后端在创建时读取这些配置，切换组合后重新创建
+            app.conf.update(
+                accept_content=sorted({'json', serializer}),
+                result_accept_content=sorted({'json', profile}),
+                result_serializer=profile,
+            )
+            app._backend = app._get_backend()
+            print(f"  测量 {pool}/{profile}...")
+
+            if in_memory:
+                worker = start_worker(app, pool=pool, concurrency=concurrency,
+                                      perform_ping_check=False, queues=[BENCHMARK_QUEUE])
+                worker.__enter__()
+            else:
+                process, log = start_benchmark_worker(pool, concurrency, profile)
+
+            try:
+                # 预热：等待 Worker 就绪（首个任务返回）
+                app.send_task('ping', **options).get(timeout=WORKER_READY_TIMEOUT)
+                for workload, (name, kwargs) in workloads.items():
+                    case = measure_roundtrip(app, name, kwargs, options, runs, tasks, timeout)
+                    case.update(pool=pool, profile=profile, workload=workload)
+                    results['cases'].append(case)
+            except Exception as e:
+                reason = f'{type(e).__name__}: {e}'
+                print(f"  ✗ {pool}/{profile} 失败: {reason}")
+                if not in_memory and process.poll() is not None:
+                    print(stop_benchmark_worker(process, log)[-2000:])
+                results['skipped'].append({'pool': pool, 'profile': profile, 'reason': reason})
+            finally:
+                if in_memory:
+                    worker.__exit__(None, None, None)
+                else:
+                    stop_benchmark_worker(process, log)
+
+    return results
+
+
+def print_roundtrip(results):
+    """打印 roundtrip 测试结果"""
+    print(f"\n  {'池':<8} {'序列化':<13} {'任务':<13} {'吞吐(/s)':>9} "
+          f"{'p50(ms)':>9} {'p99(ms)':>9} {'错误':>5}")
+    for case in results['cases']:
+        latency = case['latency_ms']
+        tasks_per_sec = case['tasks_per_sec'] or 0
+        print(f"  {case['pool']:<8} {case['profile']:<13} {case['workload']:<13} "
+              f"{tasks_per_sec:>9.1f} {latency.get('p50') or 0:>9.1f} "
+              f"{latency.get('p99') or 0:>9.1f} {case['errors']:>5}")
+
+
+def bench_exec_overhead(runs=200, command='uname -s'):
+    """
+    测量 execute_command 启动子进程的开销：经由 shell 与直接执行
+
+    shell:     每次复制 os.environ，经由 /bin/sh 执行（原有方式）
+    argv:      缓存的基础环境，直接执行（未指定 cwd，POSIX 上使用 posix_spawn）
+    argv_cwd:  同上但指定 cwd（无法使用 posix_spawn，使用 vfork）
+
+    Args:
+        runs (int): 每种方式的运行次数
+        command (str): 测量的命令（不能包含 shell 语法或以内置命令开头）
+
+    Returns:
+        dict: 各方式每次执行的耗时汇总（毫秒）及直接执行节省的时间
+    """
+    from celery_tasks.command_utils import prepare_command
+    from celery_tasks.worker import run_captured, task_env
+
+    args, options = prepare_command(command, 'auto', task_env())
+    if options['shell']:
+        raise RuntimeError(f"命令包含 shell 语法、是内置命令或程序不存在，无法直接执行: {command}")
+
+    def shell_once():
+        run_captured(command, shell=True, env=os.environ.copy())
+
+    def argv_once(cwd=None):
+        env = task_env()
+        args, options = prepare_command(command, 'auto', env)
+        run_captured(args, cwd=cwd, env=env, **options)
+
+    cases = {
+        'shell': shell_once,
+        'argv': argv_once,
+        'argv_cwd': lambda: argv_once(os.getcwd()),
+    }
+
+    results = {'command': command, 'executable': options.get('executable')}
+    for name, func in cases.items():
+        print(f"  测量 {name} ({runs} 次)...")
+        func()  # 预热
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = summarize(samples)
+
+    results['saved_ms'] = results['shell']['p50'] - results['argv']['p50']
+    return results
+
+
+def command_result_meta(command):
+    """
+    执行命令，按 Worker 写入结果后端的格式（result_extended）构造任务元数据
+
+    Returns:
+        dict: 与结果后端中的 celery-task-meta-<id> 相同结构的元数据
+    """
+    import uuid
+    from datetime import datetime, timezone
+
+    start = time.time()
+    completed = subprocess.run(command, shell=True, capture_output=True)
+    duration = time.time() - start
+    task_id = str(uuid.uuid4())
+    return {
+        'status': 'SUCCESS',
+        'result': {
+            'command': command,
+            'cwd': os.getcwd(),
+            'platform': platform.system(),
+            'skill_python': sys.executable,
+            'exec_mode': 'shell',
+            'success': completed.returncode == 0,
+            'returncode': completed.returncode,
+            'stdout': completed.stdout.decode('utf-8', errors='replace'),
+            'stderr': completed.stderr.decode('utf-8', errors='replace'),
+            'duration': round(duration, 3),
+            'timeline': {'started': start, 'subprocess_start': start, 'subprocess_end': start + duration},
+        },
+        'traceback': None,
+        'children': [],
+        'date_done': datetime.now(timezone.utc).isoformat(),
+        'task_id': task_id,
+        'name': 'execute_command',
+        'args': [],
+        'kwargs': {'command': command, 'timeout': 300},
+        'worker': f'celery@{platform.node()}',
+        'retries': 0,
+        'queue': 'default',
+    }
+
+
+def sample_stored_results(count):
+    """
+    从结果后端抽样读取已保存的任务结果（按当前序列化配置解码）
+
+    Returns:
+        list[dict]: 任务元数据
+    """
+    import redis
+    from celery_tasks.result_waiter import TASK_META_PREFIX, decode_meta
+    from celery_tasks.settings import RESULT_BACKEND
+
+    client = redis.Redis.from_url(RESULT_BACKEND)
+    metas = []
+    for key in client.scan_iter(match=TASK_META_PREFIX + '*', count=1000):
+        payload = client.get(key)
+        if not payload:
+            continue
+        try:
+            metas.append(decode_meta(payload))
+        except Exception:
+            # 以其他序列化配置写入的结果
+            continue
+        if len(metas) >= count:
+            break
+    return metas
+
+
+def bench_serializers(profiles, runs=20, commands=SERIALIZER_COMMANDS, from_redis=0):
+    """
+    测量各序列化配置编码/解码真实结果负载的耗时和写入 Redis 的字节数
+
+    负载为执行 commands 得到的结果（按 Worker 的结果格式构造），或从结果后端抽样的已有结果；
+    编码和解码经由 kombu（与 Worker 写入、客户端读取的路径相同）。
+
+    Args:
+        profiles (list): 序列化配置名称
+        runs (int): 每种配置编码/解码全部负载的次数
+        commands (list): 生成负载的命令
+        from_redis (int): 从结果后端抽样的结果数（0 表示执行 commands）
+
+    Returns:
+        dict: payloads（负载数量和 json 字节数）、cases（每种配置的结果）和 skipped
+    """
+    from kombu.serialization import dumps, loads
+    from celery_tasks.serialization import profile_unavailable, register_profiles
+
+    register_profiles()
+
+    if from_redis:
+        print(f"  从结果后端抽样 {from_redis} 个结果...")
+        metas = sample_stored_results(from_redis)
+    else:
+        metas = []
+        for command in commands:
+            print(f"  执行 {command}...")
+            metas.append(command_result_meta(command))
+    if not metas:
+        raise RuntimeError('没有可用的结果负载')
+
+    results = {'payloads': len(metas), 'runs': runs, 'cases': [], 'skipped': []}
+    baseline = None
+    for profile in profiles:
+        reason = profile_unavailable(profile)
+        if reason:
+            print(f"  跳过 {profile}: {reason}")
+            results['skipped'].append({'profile': profile, 'reason': reason})
+            continue
+
+        print(f"  测量 {profile} ({runs} 次)...")
+        encoded = [dumps(meta, serializer=profile) for meta in metas]
+        stored = sum(len(payload.encode('utf-8') if isinstance(payload, str) else payload)
+                     for _, _, payload in encoded)
+        lossless = all(
+            loads(payload, content_type, encoding, accept=[content_type]) == meta
+            for (content_type, encoding, payload), meta in zip(encoded, metas)
+        )
+
+        encode_ms, decode_ms = [], []
+        for _ in range(runs):
+            start = time.perf_counter()
+            for meta in metas:
+                dumps(meta, serializer=profile)
+            encode_ms.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            for content_type, encoding, payload in encoded:
+                loads(payload, content_type, encoding, accept=[content_type])
+            decode_ms.append((time.perf_counter() - start) * 1000)
+
+        case = {
+            'profile': profile,
+            'bytes': stored,
+            'encode_ms': summarize(encode_ms),
+            'decode_ms': summarize(decode_ms),
+            'lossless': lossless,
+        }
+        if profile == 'json':
+            baseline = stored
+        results['cases'].append(case)
+
+    baseline = baseline or (results['cases'][0]['bytes'] if results['cases'] else None)
+    for case in results['cases']:
+        case['ratio'] = round(case['bytes'] / baseline, 3) if baseline else None
+    return results
+
+
+def print_serializers(results):
+    """打印 serializers 测试结果"""
+    print(f"\n  负载: {results['payloads']} 个结果，耗时为编码/解码全部负载一次（p50）")
+    print(f"  {'配置':<14} {'Redis 字节':>12} {'相对大小':>8} {'编码(ms)':>10} "
+          f"{'解码(ms)':>10} {'无损':>4}")
+    for case in results['cases']:
+        print(f"  {case['profile']:<14} {case['bytes']:>12,} {case['ratio'] or 0:>8.3f} "
+              f"{case['encode_ms']['p50']:>10.2f} {case['decode_ms']['p50']:>10.2f} "
+              f"{'是' if case['lossless'] else '否':>4}")
+
+
+def print_summary(name, summary, unit='ms'):
+    """打印一组耗时汇总"""
+    if not isinstance(summary, dict) or not summary.get('count'):
+        return
+    print(f"  {name:<20} p50 {summary['p50']:>9.1f}{unit}  "
+          f"p95 {summary['p95']:>9.1f}{unit}  "
+          f"min {summary['min']:>9.1f}{unit}  max {summary['max']:>9.1f}{unit}")
+
+
+def git_revision():
+    """获取当前提交（用于对比不同版本的结果）"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True,
+                              cwd=skill_dir).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def write_report(benchmark, results, output=None):
+    """输出 JSON 报告"""
+    report = {
+        'benchmark': benchmark,
+        'revision': git_revision(),
+        'platform': platform.system(),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n报告已写入: {output}")
+    return report
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="Celery 任务派发性能基准测试")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    cold = subparsers.add_parser('cold-start', help='dispatch.py 冷启动耗时（需 Redis 和 Worker 运行）')
+    cold.add_argument('--runs', '-n', type=int, default=20, help='运行次数')
+    cold.add_argument('--command', default='echo benchmark', help='派发的命令')
+    cold.add_argument('--target-ms', type=float, default=150, help='目标耗时（毫秒）')
+    cold.add_argument('--output', '-o', metavar='FILE', help='JSON 报告输出路径')
+
+    roundtrip = subparsers.add_parser(
+        'roundtrip', help='派发 → 执行 → 取回结果的吞吐量和 p50/p99 延迟（按并发池、序列化方式）')
+    roundtrip.add_argument('--pools', default=','.join(ROUNDTRIP_POOLS),
+                           help='并发池，逗号分隔（默认全部，不可用的自动跳过）')
+    roundtrip.add_argument('--profiles', default=','.join(SERIALIZATION_PROFILES),
+                           help=f'序列化配置，逗号分隔（可选: {", ".join(SERIALIZATION_PROFILES)}）')
+    roundtrip.add_argument('--runs', '-n', type=int, default=100, help='延迟测量的任务数（逐个派发）')
+    roundtrip.add_argument('--tasks', type=int, default=200, help='吞吐量测量的任务数（一次派发）')
+    roundtrip.add_argument('--concurrency', '-c', type=int, default=4, help='Worker 并发数')
+    roundtrip.add_argument('--large-bytes', type=int, default=100_000, help='大输出命令的输出字节数')
+    roundtrip.add_argument('--in-memory', action='store_true',
+                           help='使用进程内 Broker/结果后端（不需要 Redis，只支持 solo 池）')
+    roundtrip.add_argument('--output', '-o', metavar='FILE', help='JSON 报告输出路径')
+
+    serializers = subparsers.add_parser(
+        'serializers', help='各序列化配置编码/解码真实结果的耗时和写入 Redis 的字节数')
+    serializers.add_argument('--profiles', default=','.join(SERIALIZATION_PROFILES),
+                             help=f'序列化配置，逗号分隔（可选: {", ".join(SERIALIZATION_PROFILES)}）')
+    serializers.add_argument('--runs', '-n', type=int, default=20, help='每种配置的测量次数')
+    serializers.add_argument('--command', action='append', metavar='CMD',
+                             help='生成负载的命令（可多次指定，默认 ps aux、ls -la /usr/bin 等）')
+    serializers.add_argument('--from-redis', type=int, default=0, metavar='N',
+                             help='改为从结果后端抽样 N 个已保存的结果作为负载')
+    serializers.add_argument('--output', '-o', metavar='FILE', help='JSON 报告输出路径')
+
+    overhead = subparsers.add_parser(
+        'exec-overhead', help='子进程启动开销：经由 shell 与直接执行（posix_spawn/vfork）对比')
+    overhead.add_argument('--runs', '-n', type=int, default=200, help='每种方式的运行次数')
+    overhead.add_argument('--command', default='uname -s', help='测量的命令（不含 shell 语法，不是内置命令）')
+    overhead.add_argument('--output', '-o', metavar='FILE', help='JSON 报告输出路径')
+
+    args = parser.parse_args()
+
+    print(f"\n{'='*60}")
+    print(f"性能基准测试: {args.benchmark}")
+    print(f"{'='*60}")
+
+    if args.benchmark == 'cold-start':
+        results = bench_cold_start(args.runs, args.command, args.target_ms)
+        print()
+        for name in ('python_startup', 'import_celery', 'dispatch_bg', 'dispatch_bg_daemon'):
+            print_summary(name, results.get(name))
+        mark = '✓' if results['meets_target'] else '✗'
+        print(f"\n{mark} dispatch p50 目标: {args.target_ms:.0f}ms")
+    elif args.benchmark == 'roundtrip':
+        pools = [p.strip() for p in args.pools.split(',') if p.strip()]
+        profiles = [p.strip() for p in args.profiles.split(',') if p.strip()]
+        for name in pools:
+            if name not in ROUNDTRIP_POOLS:
+                parser.error(f"未知的并发池: {name}")
+        for name in profiles:
+            if name not in SERIALIZATION_PROFILES:
+                parser.error(f"未知的序列化配置: {name}")
+        try:
+            results = bench_roundtrip(pools, profiles, args.runs, args.tasks, args.concurrency,
+                                      args.large_bytes, args.in_memory)
+        except Exception as e:
+            print(f"\n✗ 无法运行基准测试: {e}")
+            sys.exit(1)
+        print_roundtrip(results)
+    elif args.benchmark == 'serializers':
+        profiles = [p.strip() for p in args.profiles.split(',') if p.strip()]
+        for name in profiles:
+            if name not in SERIALIZATION_PROFILES:
+                parser.error(f"未知的序列化配置: {name}")
+        try:
+            results = bench_serializers(profiles, args.runs, args.command or SERIALIZER_COMMANDS,
+                                        args.from_redis)
+        except Exception as e:
+            print(f"\n✗ 无法运行基准测试: {e}")
+            sys.exit(1)
+        print_serializers(results)
+    elif args.benchmark == 'exec-overhead':
+        try:
+            results = bench_exec_overhead(args.runs, args.command)
+        except RuntimeError as e:
+            print(f"\n✗ {e}")
+            sys.exit(1)
+        print()
+        for name in ('shell', 'argv', 'argv_cwd'):
+            print_summary(name, results[name])
+        print(f"\n直接执行每个任务节省 {results['saved_ms']:.2f}ms（p50，程序: {results['executable']}）")
+
+    write_report(args.benchmark, results, args.output)
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -108,6 +108,34 @@ def check_celery_worker_ping():
         return False, []
 
 
+def check_worker_heartbeat():
+    """读取 Worker 写入 Redis 的心跳"""
+    try:
+        from celery_tasks.heartbeat import read_heartbeat
+        import time
+
+        heartbeat = read_heartbeat()
+        if heartbeat:
+            age = time.time() - heartbeat.get('timestamp', 0)
+            return True, f"{heartbeat.get('hostname')}（{age:.0f} 秒前）"
+        return False, None
+    except Exception:
+        return False, None
+
+
+def check_scheduler():
+    """读取延迟任务调度器的心跳和待调度条目数"""
+    try:
+        from celery_tasks.scheduler import stats
+
+        info = stats()
+        if info['heartbeat']:
+            return True, f"{info['heartbeat'].get('hostname')}，待调度 {info['pending']} 个"
+        return False, f"待调度 {info['pending']} 个" if info['pending'] else None
+    except Exception:
+        return False, None
+
+
 def check_flower(host='localhost', port=5555, timeout=2):
     """检查 Flower 是否运行"""
     try:
@@ -165,13 +193,25 @@ def main():
     print("Celery Worker:")
     worker_process = check_celery_worker()
     worker_ping, workers = check_celery_worker_ping()
+    worker_heartbeat, heartbeat_detail = check_worker_heartbeat()
     print_status("进程", worker_process)
     print_status("响应", worker_ping, f"Worker: {', '.join(workers) if workers else '无'}")
+    print_status("心跳", worker_heartbeat, heartbeat_detail)
     if not worker_ping:
         all_ok = False
         print("\n  启动命令: python scripts/worker.py")
     print()
 
+    # 检查延迟任务调度器（可选服务，未运行时 --delay/--eta 使用 Celery countdown/eta）
+    print("延迟任务调度器:")
+    scheduler_status, scheduler_detail = check_scheduler()
+    print_status("服务", scheduler_status, scheduler_detail)
+    if not scheduler_status:
+        if scheduler_detail:
+            print(f"    {scheduler_detail}")
+        print("\n  启动命令: python scripts/scheduler.py")
+    print()
+
     # 检查 Flower（可选服务）
     print("Flower 监控:")
     flower_status = check_flower()
@@ -7,6 +7,8 @@ Celery 任务派发脚本
 import os
 import sys
 import json
+import time
+import contextlib
 import argparse
 import platform
 from pathlib import Path
@@ -17,6 +19,11 @@ from datetime import datetime, timedelta
 skill_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(skill_dir))
 
+from celery_tasks.client import (
+    build_batch_signatures, build_route_options, build_schedule_options, defer_to_scheduler,
+    get_client_app, schedule_delay
+)
+
 
 def get_skill_env():
     """获取技能虚拟环境"""
@@ -36,19 +43,104 @@ def get_python_executable():
         return venv_dir / "bin" / "python"
 
 
-def import_worker():
-    """导入 worker 模块"""
+def ensure_flower(wait=True):
+    """
+    确保 Flower 监控运行，未运行时自动在后台启动
+
+    Args:
+        wait: 是否等待 Flower 启动完成（最多 5 秒）
+
+    Returns:
+        bool: Flower 是否已在运行
+    """
+    import socket
+    import subprocess
+
+    flower_ok = False
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(1 if wait else 0.2)
+        flower_ok = sock.connect_ex(('localhost', 5555)) == 0
+        sock.close()
+    except Exception:
+        pass
+
+    if flower_ok:
+        print("  ✓ Flower 监控: 运行中 (http://localhost:5555)")
+        return True
+
+    print("  ⚠ Flower 监控: 未运行，正在自动启动...")
+    # 自动启动 Flower
+    try:
+        start_script = skill_dir / "scripts" / "start_monitoring.py"
+        subprocess.Popen(
+            [sys.executable, str(start_script)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=subprocess.CREATE_NO_WINDOW if platform.system() == "Windows" else 0
+        )
+        if not wait:
+            print("  ⚠ Flower 启动中，请稍后访问 http://localhost:5555")
+            return False
+
+        # 等待 Flower 启动
+        for _ in range(10):
+            time.sleep(0.5)
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.settimeout(0.5)
+                if sock.connect_ex(('localhost', 5555)) == 0:
+                    sock.close()
+                    print("  ✓ Flower 监控: 已启动 (http://localhost:5555)")
+                    flower_ok = True
+                    break
+                sock.close()
+            except Exception:
+                continue
+        if not flower_ok:
+            print("  ⚠ Flower 启动中，请稍后访问 http://localhost:5555")
+    except Exception as e:
+        print(f"  ✗ Flower 启动失败: {e}")
+
+    return flower_ok
+
+
+def check_services_fast():
+    """
+    通过 Worker 心跳快速检查服务状态（一次 Redis GET）
+
+    Returns:
+        bool: 心跳有效时返回 True；Redis 不可用或没有心跳时返回 False，
+            调用方应回退到完整检查
+    """
     try:
-        from celery_tasks import worker
-        return worker.app
-    except ImportError as e:
-        raise RuntimeError(f"无法导入 worker 模块: {e}")
+        from celery_tasks.heartbeat import read_heartbeat
+        heartbeat = read_heartbeat()
+    except Exception:
+        return False
+
+    if not heartbeat:
+        return False
+
+    age = time.time() - heartbeat.get('timestamp', 0)
+
+    print(f"\n{'='*60}")
+    print("检查服务状态（心跳）")
+    print(f"{'='*60}")
+    print("  ✓ Redis/Memurai: 运行中")
+    print(f"  ✓ Celery Worker: 运行中 ({heartbeat.get('hostname')}, {age:.0f} 秒前心跳)")
+    # 快速路径不等待 Flower 启动
+    ensure_flower(wait=False)
+    print(f"{'='*60}\n")
+    return True
 
 
 def check_services_status():
-    """检查服务状态"""
+    """检查服务状态（优先使用 Worker 心跳，未命中时执行完整检查）"""
     import socket
-    import subprocess
+
+    if check_services_fast():
+        return True
 
     print(f"\n{'='*60}")
     print("检查服务状态")
@@ -76,8 +168,7 @@ def check_services_status():
     # 检查 Celery Worker
     worker_ok = False
     try:
-        from celery_tasks import worker
-        inspector = worker.app.control.inspect(timeout=3)
+        inspector = get_client_app().control.inspect(timeout=3)
         stats = inspector.stats()
         worker_ok = stats is not None and len(stats) > 0
         if worker_ok:
@@ -90,48 +181,7 @@ def check_services_status():
         print("    启动: python scripts/worker.py")
 
     # 检查 Flower（默认启动）
-    flower_ok = False
-    try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(1)
-        flower_ok = sock.connect_ex(('localhost', 5555)) == 0
-        sock.close()
-    except Exception:
-        pass
-
-    if flower_ok:
-        print("  ✓ Flower 监控: 运行中 (http://localhost:5555)")
-    else:
-        print("  ⚠ Flower 监控: 未运行，正在自动启动...")
-        # 自动启动 Flower
-        try:
-            skill_dir = Path(__file__).parent.parent
-            start_script = skill_dir / "scripts" / "start_monitoring.py"
-            subprocess.Popen(
-                [sys.executable, str(start_script)],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                creationflags=subprocess.CREATE_NO_WINDOW if platform.system() == "Windows" else 0
-            )
-            # 等待 Flower 启动
-            import time
-            for _ in range(10):
-                time.sleep(0.5)
-                try:
-                    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    sock.settimeout(0.5)
-                    if sock.connect_ex(('localhost', 5555)) == 0:
-                        sock.close()
-                        print("  ✓ Flower 监控: 已启动 (http://localhost:5555)")
-                        flower_ok = True
-                        break
-                    sock.close()
-                except Exception:
-                    continue
-            if not flower_ok:
-                print("  ⚠ Flower 启动中，请稍后访问 http://localhost:5555")
-        except Exception as e:
-            print(f"  ✗ Flower 启动失败: {e}")
+    ensure_flower(wait=True)
 
     print(f"{'='*60}\n")
 
@@ -143,7 +193,238 @@ def check_services_status():
     return True
 
 
-def dispatch_command(command, delay=None, eta=None, background=False, **kwargs):
+def load_batch_specs(source):
+    """
+    读取批量命令描述
+
+    每行一个任务，支持两种写法：
+      - JSON 对象: {"command": "...", "cwd": "...", "timeout": 60, "env": {"K": "V"}}
+        （也可包含 cache、cache_key、cache_ttl、cache_inputs 等缓存字段）
+      - 纯文本: 整行作为命令
+    空行和以 # 开头的行会被忽略。
+
+    Args:
+        source: 文件路径，'-' 表示从标准输入读取
+
+    Returns:
+        list[dict]: 任务描述列表
+    """
+    if source == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+    specs = []
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        if line.startswith('{'):
+            try:
+                spec = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"第 {lineno} 行 JSON 解析失败: {e}")
+        else:
+            spec = {'command': line}
+
+        if not spec.get('command'):
+            raise ValueError(f"第 {lineno} 行缺少 command 字段")
+        specs.append(spec)
+
+    return specs
+
+
+def dispatch_batch(source, delay=None, eta=None, timeout=300, cwd=None, wait=False,
+                   queue=None, priority=None, scheduler=True):
+    """
+    批量派发命令执行任务
+
+    所有任务组成一个 Celery group，通过同一个 Broker 连接一次性发布，
+    服务检查也只执行一次。
+
+    Args:
+        source: 批量文件路径（'-' 表示标准输入）
+        delay: 延迟秒数（作用于全部任务）
+        eta: 指定执行时间（作用于全部任务）
+        timeout: 默认命令超时时间（单条任务可覆盖）
+        cwd: 默认工作目录（单条任务可覆盖）
+        wait: 派发后是否等待全部任务完成
+        queue: 默认队列（单条任务可覆盖，未指定时按超时路由）
+        priority: 默认优先级（0 最高，9 最低；单条任务可覆盖）
+        scheduler: 延迟任务是否交给调度器（调度器未运行时使用 countdown/eta）
+
+    Returns:
+        list[str]: 全部任务 ID（与输入顺序一致）
+    """
+    try:
+        specs = load_batch_specs(source)
+    except (OSError, ValueError) as e:
+        print(f"\n✗ 读取批量文件失败: {e}")
+        return None
+
+    if not specs:
+        print("\n✗ 批量文件中没有任务")
+        return None
+
+    # 检查服务状态（整个批次只检查一次）
+    if not check_services_status():
+        return None
+
+    app = get_client_app()
+    from celery import group
+
+    signatures = build_batch_signatures(
+        app, specs, timeout=timeout, cwd=cwd,
+        options=build_route_options(queue, priority)
+    )
+
+    print(f"\n{'='*60}")
+    print("批量派发任务")
+    print(f"{'='*60}")
+    print(f"任务数: {len(signatures)}")
+    if queue:
+        print(f"队列: {queue}")
+    if delay:
+        print(f"延迟: {delay} 秒")
+    elif eta:
+        print(f"执行时间: {eta}")
+
+    start_time = time.time()
+    # 延迟任务优先交给调度器（一次管道写入），到期时才发布到队列
+    task_ids = defer_to_scheduler(signatures, delay, eta) if scheduler else None
+    if task_ids:
+        elapsed = time.time() - start_time
+        print(f"\n✓ 已将 {len(task_ids)} 个任务交给调度器（耗时 {elapsed:.3f} 秒）")
+    else:
+        group_result = group(signatures).apply_async(**build_schedule_options(delay, eta))
+        elapsed = time.time() - start_time
+        task_ids = [r.id for r in group_result.results]
+        print(f"\n✓ 已派发 {len(task_ids)} 个任务（耗时 {elapsed:.3f} 秒）")
+        print(f"  Group ID: {group_result.id}")
+    print(f"\n--- 任务 ID ---")
+    for task_id in task_ids:
+        print(task_id)
+
+    print(f"\n🌸 Flower 监控: http://localhost:5555")
+
+    if wait:
+        wait_for_tasks(task_ids)
+    return task_ids
+
+
+def read_task_ids(values):
+    """
+    解析任务 ID 参数（'-' 表示从标准输入读取，忽略非任务 ID 的行）
+
+    Args:
+        values (list[str]): 命令行传入的任务 ID
+
+    Returns:
+        list[str]: 去重后的任务 ID（保持顺序）
+    """
+    import re
+    uuid_pattern = re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$')
+
+    task_ids = []
+    for value in values:
+        if value == '-':
+            task_ids.extend(line.strip() for line in sys.stdin
+                            if uuid_pattern.match(line.strip()))
+        else:
+            task_ids.append(value)
+    return list(dict.fromkeys(task_ids))
+
+
+def wait_for_tasks(task_ids, timeout=None):
+    """
+    并发等待多个任务完成，按完成顺序打印结果并汇总耗时分位数
+
+    Args:
+        task_ids (list[str]): 任务 ID 列表
+        timeout (float, optional): 整体超时（秒）
+
+    Returns:
+        bool: 全部任务成功完成时返回 True
+    """
+    from celery_tasks.result_waiter import wait_all
+    from celery_tasks.stats import summarize
+
+    total = len(task_ids)
+    durations = []
+    counts = {'ok': 0, 'failed': 0}
+
+    print(f"\n{'='*60}")
+    print(f"等待 {total} 个任务完成")
+    print(f"{'='*60}")
+
+    def on_result(task_id, meta, elapsed):
+        result = meta.get('result')
+        done = counts['ok'] + counts['failed'] + 1
+        if meta['status'] == 'SUCCESS' and isinstance(result, dict):
+            ok = result.get('success', False)
+            durations.append(result.get('duration') or 0)
+            detail = (f"返回码 {result.get('returncode')}  {result.get('duration')}秒  "
+                      f"{str(result.get('command', ''))[:50]}")
+        else:
+            ok = meta['status'] == 'SUCCESS'
+            detail = meta['status'] if ok else f"{meta['status']}: {result}"
+        counts['ok' if ok else 'failed'] += 1
+        print(f"[{done}/{total}] {'✓' if ok else '✗'} {task_id}  {detail}  (+{elapsed:.1f}s)")
+
+    try:
+        results = wait_all(task_ids, timeout=timeout, on_result=on_result)
+    except KeyboardInterrupt:
+        print(f"\n已停止等待（任务仍在执行）")
+        return False
+    except Exception as e:
+        print(f"\n✗ 等待结果失败: {e}")
+        return False
+
+    pending = total - len(results)
+    summary = summarize(durations)
+
+    print(f"\n{'='*60}")
+    print(f"完成: {len(results)}/{total}（✓ {counts['ok']} 成功 / ✗ {counts['failed']} 失败"
+          f"{f' / ⏳ {pending} 超时未完成' if pending else ''}）")
+    if summary['count']:
+        print(f"耗时: p50 {summary['p50']:.3f}秒  p95 {summary['p95']:.3f}秒  "
+              f"max {summary['max']:.3f}秒")
+    print(f"{'='*60}\n")
+
+    return counts['failed'] == 0 and pending == 0
+
+
+def follow_task_output(async_result):
+    """
+    实时输出任务的命令输出（读取 Worker 发布的 Redis Stream）
+
+    Args:
+        async_result: 任务的 AsyncResult
+
+    Returns:
+        int | None: 命令返回码（输出流未结束时为 None）
+    """
+    from celery_tasks.output_stream import follow_stream
+
+    print(f"\n--- 实时输出 ---")
+    try:
+        for name, data in follow_stream(async_result.id, is_done=async_result.ready):
+            if name == 'eof':
+                return data
+            target = sys.stderr if name == 'stderr' else sys.stdout
+            target.write(data)
+            target.flush()
+    except KeyboardInterrupt:
+        print(f"\n已停止跟踪（任务仍在执行）")
+    except Exception as e:
+        print(f"\n✗ 读取输出流失败: {e}")
+    return None
+
+
+def dispatch_command(command, delay=None, eta=None, background=False,
+                     follow=False, queue=None, priority=None, scheduler=True, **kwargs):
     """
     派发命令执行任务
 
@@ -152,14 +433,17 @@ def dispatch_command(command, delay=None, eta=None, background=False, **kwargs):
         delay: 延迟秒数
         eta: 指定执行时间 (ISO-8601 格式)
         background: 是否后台派发（不等待结果）
+        follow: 是否实时跟踪命令输出
+        queue: 队列名称（未指定时按超时路由到 fast/default/bulk）
+        priority: 优先级（0 最高，9 最低）
+        scheduler: 延迟任务是否交给调度器（调度器未运行时使用 countdown/eta）
         **kwargs: 其他任务参数
     """
     # 检查服务状态
     if not check_services_status():
         return None
 
-    app = import_worker()
-    from celery_tasks.worker import execute_command
+    app = get_client_app()
 
     # 准备任务参数
     task_args = [command]
@@ -168,20 +452,20 @@ def dispatch_command(command, delay=None, eta=None, background=False, **kwargs):
     # 移除 None 值
     kwargs = {k: v for k, v in kwargs.items() if v is not None}
 
-    # 设置延迟或定时执行
-    if delay:
-        task_options['countdown'] = delay
-    elif eta:
-        # 解析时间并添加时区（修复时区不匹配问题）
-        from zoneinfo import ZoneInfo
-        eta_dt = datetime.fromisoformat(eta)
-        eta_dt = eta_dt.replace(tzinfo=ZoneInfo('Asia/Shanghai'))
-        task_options['eta'] = eta_dt
+    # 实时跟踪输出需要 Worker 以流式方式执行
+    if follow:
+        kwargs['stream'] = True
+
+    task_options.update(build_route_options(queue, priority))
 
     print(f"\n{'='*60}")
     print("派发任务")
     print(f"{'='*60}")
     print(f"命令: {command}")
+    if queue:
+        print(f"队列: {queue}")
+    if priority is not None:
+        print(f"优先级: {priority}")
 
     if delay:
         print(f"延迟: {delay} 秒")
@@ -192,14 +476,26 @@ def dispatch_command(command, delay=None, eta=None, background=False, **kwargs):
     elif eta:
         print(f"执行时间: {eta}")
 
-    # 派发任务
-    async_result = execute_command.apply_async(
-        args=task_args,
-        kwargs=kwargs,
-        **task_options
-    )
+    # 延迟任务优先交给调度器，到期时才发布到队列
+    deferred = None
+    if scheduler:
+        signature = app.signature('execute_command', args=task_args, kwargs=kwargs, **task_options)
+        deferred = defer_to_scheduler([signature], delay, eta)
 
-    print(f"\n✓ 任务已派发")
+    if deferred:
+        from celery.result import AsyncResult
+        async_result = AsyncResult(deferred[0], app=app)
+        print(f"\n✓ 任务已交给调度器（到期时发布到队列）")
+    else:
+        # 派发任务（设置延迟或定时执行）
+        task_options.update(build_schedule_options(delay, eta))
+        async_result = app.send_task(
+            'execute_command',
+            args=task_args,
+            kwargs=kwargs,
+            **task_options
+        )
+        print(f"\n✓ 任务已派发")
     print(f"  任务 ID: {async_result.id}")
     print(f"  状态: {async_result.state}")
 
@@ -215,62 +511,680 @@ def dispatch_command(command, delay=None, eta=None, background=False, **kwargs):
 
     # 等待结果
     print(f"\n等待执行...")
+    if follow:
+        follow_task_output(async_result)
+
     try:
-        timeout = kwargs.get('timeout', 300) + (delay or 0) + 10
+        timeout = kwargs.get('timeout', 300) + schedule_delay(delay, eta) + 10
         result = async_result.get(timeout=timeout)
+        print_task_result(result, async_result.id, follow=follow)
+    except Exception as e:
+        print(f"\n✗ 获取结果失败: {e}")
+        return None
+
+    return async_result.id
 
-        print(f"\n{'='*60}")
-        print("执行完成")
-        print(f"{'='*60}")
-        print(f"成功: {result['success']}")
-        print(f"返回码: {result['returncode']}")
-        print(f"耗时: {result['duration']} 秒")
 
-        if result.get('stdout'):
-            print(f"\n--- 输出 ---")
-            print(result['stdout'][:1000])
-            if len(result['stdout']) > 1000:
-                print(f"\n... (已截断，完整输出 {len(result['stdout'])} 字符)")
+def schedule_cron(command, expr, queue=None, priority=None, **kwargs):
+    """
+    添加 cron 周期任务（由调度器按表达式发布，每次触发生成新的任务 ID）
 
-        if result.get('stderr'):
-            print(f"\n--- 错误 ---")
-            print(result['stderr'])
+    Args:
+        command: 要执行的命令
+        expr: 五段式 cron 表达式（分 时 日 月 周，按 Asia/Shanghai 时区）
+        queue: 队列名称
+        priority: 优先级
+        **kwargs: 其他任务参数
+
+    Returns:
+        str | None: 调度条目 ID，表达式无效或 Redis 不可用时为 None
+    """
+    from celery_tasks import scheduler
 
+    app = get_client_app()
+    signature = app.signature(
+        'execute_command', args=[command],
+        kwargs={k: v for k, v in kwargs.items() if v is not None},
+        **build_route_options(queue, priority)
+    )
+    try:
+        entry = scheduler.add_cron(signature, expr)
+        heartbeat = scheduler.read_heartbeat()
+    except ValueError as e:
+        print(f"\n✗ cron 表达式无效: {expr}（{e}）")
+        return None
     except Exception as e:
-        print(f"\n✗ 获取结果失败: {e}")
+        print(f"\n✗ 写入调度器失败: {e}")
         return None
 
-    return async_result.id
+    print(f"\n{'='*60}")
+    print("添加周期任务")
+    print(f"{'='*60}")
+    print(f"命令: {command}")
+    print(f"cron: {expr}")
+    print(f"条目 ID: {entry['id']}")
+    print(f"下次执行: {datetime.fromtimestamp(entry['due']).strftime('%Y-%m-%d %H:%M:%S')}")
+    if heartbeat is None:
+        print(f"\n⚠ 调度器未运行，启动后才会触发: python scripts/scheduler.py")
+    print(f"\n查看/取消: python scripts/scheduler.py --list --cron | --cancel {entry['id']}")
+    return entry['id']
 
 
-def check_task_status(task_id):
+def print_task_result(result, task_id, follow=False):
+    """
+    打印命令执行结果
+
+    Args:
+        result (dict): execute_command 的返回值
+        task_id (str): 任务 ID
+        follow (bool): 是否已实时输出过（已输出时不再打印 stdout/stderr）
+    """
+    print(f"\n{'='*60}")
+    print("执行完成")
+    print(f"{'='*60}")
+    print(f"成功: {result['success']}")
+    print(f"返回码: {result['returncode']}")
+    print(f"耗时: {result['duration']} 秒")
+    if result.get('cache') == 'hit':
+        print(f"缓存: 命中（原执行耗时 {result.get('original_duration')} 秒）")
+    elif result.get('cache') == 'miss':
+        print(f"缓存: 未命中{'（结果已缓存）' if result.get('cache_stored') else ''}")
+
+    # 实时跟踪时输出已经打印过
+    if result.get('stdout') and not follow:
+        print(f"\n--- 输出 ---")
+        print(result['stdout'][:1000])
+        if len(result['stdout']) > 1000:
+            print(f"\n... (已截断，完整输出 {len(result['stdout'])} 字符)")
+        if result.get('stdout_blob'):
+            print(f"\n完整输出已转存 ({result['stdout_blob']['size']} 字节)，"
+                  f"使用 --task-id {task_id} --full 查看")
+
+    if result.get('stderr') and not follow:
+        print(f"\n--- 错误 ---")
+        print(result['stderr'])
+
+
+# --exec 取值 → execute_command 的 shell 参数
+EXEC_MODES = {'shell': True, 'argv': False, 'auto': 'auto'}
+
+
+def build_task_kwargs(args):
+    """
+    根据命令行参数生成 execute_command 的关键字参数（直接派发与守护进程共用）
+
+    Returns:
+        dict: 省略未指定的参数
+    """
+    kwargs = {
+        'timeout': args.timeout,
+        'cwd': args.cwd,
+        'blob_threshold': args.blob_threshold,
+        'cache_key': args.cache_key,
+        'cache_ttl': args.cache_ttl,
+        'cache_env': args.cache_env,
+        'cache_inputs': args.cache_input,
+    }
+    if args.cache or args.cache_key or args.cache_input:
+        kwargs['cache'] = True
+    if args.cache_hash:
+        kwargs['cache_input_mode'] = 'hash'
+    if args.dedupe:
+        kwargs['singleflight'] = True
+    if args.exec_mode:
+        kwargs['shell'] = EXEC_MODES[args.exec_mode]
+    if args.no_warm:
+        kwargs['warm'] = False
+    return {k: v for k, v in kwargs.items() if v is not None}
+
+
+# 等待守护进程返回结果时，套接字超时比等待期限多出的秒数
+DAEMON_WAIT_MARGIN = 5
+
+
+def run_via_daemon(client, args):
+    """
+    通过常驻派发守护进程处理请求（本进程不导入 celery）
+
+    Args:
+        client (DaemonClient): 守护进程客户端
+        args: 命令行参数
+
+    Returns:
+        bool: 已处理返回 True；需要回退到本地处理时返回 False
+            （实时跟踪、完整输出等需要直接读取 Redis 的场景，或 Worker 心跳缺失）
+    """
+    from celery_tasks.dispatch_client import DaemonError
+
+    if args.follow or args.full or args.wait:
+        return False
+
+    try:
+        # 查询任务状态
+        if args.task_id:
+            response = client.request('status', task_id=args.task_id)
+            print_task_status(
+                args.task_id,
+                response['state'],
+                task_result=response.get('result'),
+                error=response.get('error'),
+            )
+            return True
+
+        # 服务检查：守护进程缓存的 Worker 心跳
+        health = client.request('health')
+        if not health.get('worker'):
+            return False
+
+        # 批量派发
+        if args.batch:
+            try:
+                specs = load_batch_specs(args.batch)
+            except (OSError, ValueError) as e:
+                print(f"\n✗ 读取批量文件失败: {e}")
+                sys.exit(1)
+            response = client.request(
+                'batch', specs=specs, timeout=args.timeout, cwd=args.cwd,
+                delay=args.delay, eta=args.eta, scheduler=not args.no_scheduler,
+                options=build_route_options(args.queue, args.priority)
+            )
+            if response.get('scheduled'):
+                print(f"\n✓ 已将 {len(response['task_ids'])} 个任务交给调度器（守护进程）")
+            else:
+                print(f"\n✓ 已派发 {len(response['task_ids'])} 个任务（守护进程）")
+                print(f"  Group ID: {response['group_id']}")
+            print(f"\n--- 任务 ID ---")
+            for task_id in response['task_ids']:
+                print(task_id)
+            return True
+
+        if not args.command:
+            return False
+
+        response = client.request(
+            'submit', command=args.command, kwargs=build_task_kwargs(args),
+            delay=args.delay, eta=args.eta, scheduler=not args.no_scheduler,
+            options=build_route_options(args.queue, args.priority)
+        )
+        task_id = response['task_id']
+
+        if response.get('scheduled'):
+            print(f"\n✓ 任务已交给调度器（守护进程，到期时发布到队列）")
+        else:
+            print(f"\n✓ 任务已派发（守护进程）")
+        print(f"  任务 ID: {task_id}")
+
+        if args.bg:
+            print(f"\n使用以下命令查询结果:")
+            print(f"  python scripts/dispatch.py --task-id {task_id}")
+            return True
+
+        print(f"\n等待执行...")
+        # wait_timeout 是守护进程的等待期限；timeout 是本地套接字超时，稍长于等待期限
+        wait_timeout = args.timeout + schedule_delay(args.delay, args.eta) + 10
+        response = client.request('wait', task_id=task_id, wait_timeout=wait_timeout,
+                                  timeout=wait_timeout + DAEMON_WAIT_MARGIN)
+        if isinstance(response.get('result'), dict):
+            print_task_result(response['result'], task_id)
+        else:
+            print(f"\n✗ 任务执行失败: {response.get('error', response['state'])}")
+        return True
+
+    except DaemonError as e:
+        print(f"\n✗ 守护进程请求失败: {e}")
+        sys.exit(1)
+    finally:
+        client.close()
+
+
+def load_full_output(task_result, name):
+    """
+    获取完整输出：已转存到 Blob 存储的输出按需读取，否则直接使用结果中的输出
+
+    Args:
+        task_result (dict): 任务结果
+        name (str): stdout 或 stderr
+    """
+    ref = task_result.get(f'{name}_blob')
+    if not ref:
+        return task_result.get(name) or ''
+
+    from celery_tasks.blob_store import get_text
+    return get_text(ref)
+
+
+def check_task_status(task_id, follow=False, full=False):
     """检查任务状态"""
-    app = import_worker()
+    app = get_client_app()
     from celery.result import AsyncResult
 
     result = AsyncResult(task_id, app=app)
 
+    if follow and not result.ready():
+        follow_task_output(result)
+
+    state = result.state
+    info, task_result, error = None, None, None
+    if result.ready():
+        try:
+            task_result = result.get(timeout=10)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+    else:
+        info = result.info
+
+    print_task_status(task_id, state, info=info, task_result=task_result, error=error, full=full)
+
+
+def print_task_status(task_id, state, info=None, task_result=None, error=None, full=False):
+    """
+    显示任务状态（本地查询与守护进程查询共用）
+
+    Args:
+        task_id (str): 任务 ID
+        state (str): 结果后端中的任务状态
+        info: 未完成任务的附加信息
+        task_result: 已完成任务的返回值（execute_command 的结果或其他任务的返回值）
+        error (str, optional): 任务失败或读取结果失败的原因
+        full (bool): 是否显示完整输出（包括转存到 Blob 存储的输出）
+    """
+    # 结果已过期（Redis 中查不到，状态为 PENDING）时从本地任务历史读取
+    if state == 'PENDING':
+        from celery_tasks import history
+        record = history.get_task(task_id) if history.HISTORY_DB.exists() else None
+        if record is not None:
+            print(f"\n{'='*60}")
+            print("任务状态（结果后端中已过期，来自本地任务历史）")
+            print(f"{'='*60}")
+            print_history_record(record, full=full)
+            return
+
     print(f"\n{'='*60}")
     print("任务状态")
     print(f"{'='*60}")
     print(f"任务 ID: {task_id}")
-    print(f"状态: {result.state}")
-    print(f"信息: {result.info}")
+    print(f"状态: {state}")
+    if info is not None:
+        print(f"信息: {info}")
+    if error:
+        print(f"错误: {error}")
 
-    if result.ready():
-        print(f"\n任务已完成，获取结果...")
+    # 非 execute_command 任务（如 ping）直接显示返回值
+    if not isinstance(task_result, dict) or 'returncode' not in task_result:
+        if task_result is not None:
+            print(f"结果: {task_result}")
+        return
+
+    print(f"成功: {task_result.get('success')}")
+    print(f"返回码: {task_result['returncode']}")
+
+    if full:
+        for name, label in (('stdout', '输出'), ('stderr', '错误')):
+            text = load_full_output(task_result, name)
+            if text:
+                print(f"\n--- {label} ---")
+                print(text)
+        return
+
+    if task_result.get('stdout'):
+        print(f"\n输出: {task_result['stdout'][:500]}")
+    for name in ('stdout', 'stderr'):
+        ref = task_result.get(f'{name}_blob')
+        if ref:
+            print(f"\n{name} 完整输出已转存 ({ref['size']} 字节)，使用 --full 查看")
+
+
+# 相对时间单位（--since 6h 等）→ 秒
+TIME_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def parse_time_spec(value):
+    """
+    解析历史查询的时间：相对时间（30m、6h、7d）或本地时间（YYYY-MM-DD [HH:MM[:SS]]）
+
+    Returns:
+        float: 时间戳
+    """
+    value = value.strip()
+    unit = TIME_UNITS.get(value[-1:].lower())
+    if unit and value[:-1].replace('.', '', 1).isdigit():
+        return time.time() - float(value[:-1]) * unit
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无法解析时间: {value}（示例: 6h、7d、2026-01-31 08:00）")
+
+
+def format_timestamp(timestamp):
+    """格式化时间戳（本地时间）"""
+    if timestamp is None:
+        return '-'
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def print_history_record(record, full=False):
+    """打印一条历史记录的详细信息"""
+    print(f"任务 ID: {record['task_id']}")
+    print(f"命令: {record['command']}")
+    print(f"工作目录: {record.get('cwd')}")
+    print(f"完成时间: {format_timestamp(record['finished_at'])}")
+    print(f"状态: {record['status']}")
+    print(f"返回码: {record['returncode']}")
+    print(f"耗时: {record['duration']} 秒")
+    print(f"队列: {record.get('queue') or '-'}  Worker: {record.get('worker') or '-'}")
+
+    for name, label in (('stdout', '输出'), ('stderr', '错误')):
+        if full:
+            try:
+                text = load_full_output(record, name)
+            except Exception as e:
+                text = record.get(name) or ''
+                print(f"\n⚠ 读取完整{label}失败（{e}），显示历史中保存的内容")
+        else:
+            text = record.get(name) or ''
+        if not text:
+            continue
+        print(f"\n--- {label} ---")
+        if not full and len(text) > 1000:
+            print(text[:1000])
+            print(f"\n... (已截断，共 {len(text)} 字符，使用 --full 查看)")
+        else:
+            print(text)
+
+
+def history_main(argv):
+    """
+    dispatch.py history：查询本地任务历史（Worker 写入 data/history.db，不访问 Redis）
+
+    Args:
+        argv (list): history 之后的命令行参数
+    """
+    from celery_tasks import history
+
+    parser = argparse.ArgumentParser(
+        prog='dispatch.py history',
+        description='查询本地任务历史（不受结果过期时间限制）',
+        epilog='示例: dispatch.py history --failed --since 6h --match timeout',
+    )
+    parser.add_argument('--since', type=parse_time_spec, metavar='TIME',
+                        help='完成时间不早于（6h、7d 或 2026-01-31 08:00）')
+    parser.add_argument('--until', type=parse_time_spec, metavar='TIME',
+                        help='完成时间早于')
+    parser.add_argument('--status', metavar='STATUS',
+                        help=f"状态，逗号分隔（{', '.join(history.STATUSES)}）")
+    parser.add_argument('--failed', action='store_true',
+                        help='所有未成功的任务（failed、timeout、error）')
+    parser.add_argument('--returncode', '--rc', type=int, metavar='N', help='返回码')
+    parser.add_argument('--prefix', help='命令前缀（如 "make build"）')
+    parser.add_argument('--match', '-m', metavar='TEXT',
+                        help='在命令和 stdout/stderr 中搜索（多个词须全部出现，不区分大小写）')
+    parser.add_argument('--limit', '-n', type=int, default=20, help='显示条数（默认 20）')
+    parser.add_argument('--task-id', metavar='ID', help='显示指定任务的详细记录')
+    parser.add_argument('--full', action='store_true',
+                        help='与 --task-id 一起使用，输出完整 stdout/stderr（按需读取 Blob）')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出')
+    parser.add_argument('--stats', action='store_true', help='显示历史数据库统计')
+    parser.add_argument('--prune', type=parse_time_spec, metavar='TIME',
+                        help='删除完成时间早于 TIME 的记录（如 90d）')
+    args = parser.parse_args(argv)
+
+    statuses = [s.strip() for s in (args.status or '').split(',') if s.strip()]
+    for status in statuses:
+        if status not in history.STATUSES:
+            parser.error(f"未知的状态: {status}（可选: {', '.join(history.STATUSES)}）")
+    if args.failed:
+        statuses = sorted(set(statuses) | {'failed', 'timeout', 'error'})
+
+    if not history.HISTORY_DB.exists():
+        print(f"\n暂无任务历史（Worker 执行命令后写入 {history.HISTORY_DB}）")
+        return
+
+    if args.prune is not None:
+        count = history.prune(args.prune)
+        print(f"✓ 已删除 {count} 条 {format_timestamp(args.prune)} 之前的记录")
+        return
+
+    if args.stats:
+        info = history.stats()
+        if args.json:
+            print(json.dumps(info, ensure_ascii=False, indent=2))
+            return
+        print(f"\n{'='*60}")
+        print("任务历史统计")
+        print(f"{'='*60}")
+        print(f"数据库: {info['path']}（{info['size_bytes'] / 1024 / 1024:.1f} MB，"
+              f"全文索引: {'FTS5' if info['fts'] else '无，使用 LIKE'}）")
+        print(f"记录数: {info['count']}")
+        print(f"时间范围: {format_timestamp(info['oldest'])} ~ {format_timestamp(info['newest'])}")
+        for status, count in sorted(info['by_status'].items()):
+            print(f"  {status:<8} {count}")
+        print(f"{'='*60}\n")
+        return
+
+    if args.task_id:
+        record = history.get_task(args.task_id)
+        if record is None:
+            print(f"\n✗ 历史中没有任务 {args.task_id}")
+            sys.exit(1)
+        if args.json:
+            print(json.dumps(record, ensure_ascii=False, indent=2))
+            return
+        print(f"\n{'='*60}")
+        print("任务历史")
+        print(f"{'='*60}")
+        print_history_record(record, full=args.full)
+        return
+
+    start = time.perf_counter()
+    records = history.search(
+        since=args.since,
+        until=args.until,
+        statuses=statuses,
+        returncode=args.returncode,
+        prefix=args.prefix,
+        match=args.match,
+        limit=args.limit,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        print(json.dumps(records, ensure_ascii=False, indent=2))
+        return
+
+    print(f"\n{'='*60}")
+    print("任务历史（最新的在前）")
+    print(f"{'='*60}")
+    if not records:
+        print("没有匹配的记录")
+    for record in records:
+        mark = '✓' if record['success'] else '✗'
+        duration = record['duration'] if record['duration'] is not None else 0
+        print(f"{format_timestamp(record['finished_at'])}  {mark} {record['status']:<7} "
+              f"{record['returncode'] if record['returncode'] is not None else '-':>4}  "
+              f"{duration:>8.2f}s  {record['command'][:60]}")
+        print(f"{'':<21}{record['task_id']}")
+    print(f"\n共 {len(records)} 条（查询 {elapsed:.1f}ms），"
+          f"使用 history --task-id <ID> 查看详情")
+    print(f"{'='*60}\n")
+
+
+# 工作流节点状态的显示符号
+NODE_MARKS = {'success': '✓', 'failed': '✗', 'error': '✗', 'skipped': '⊘', 'pending': '⏳'}
+
+
+def print_workflow_report(workflow, results, submitted):
+    """
+    打印工作流各节点耗时和关键路径
+
+    Args:
+        workflow (dict): load_workflow 的返回值
+        results (dict): {节点名称: 节点结果}
+        submitted (float): 派发时间戳（各节点时间相对该时刻）
+    """
+    from celery_tasks.workflow import critical_path
+
+    nodes = workflow['nodes']
+    width = max(len(name) for name in nodes)
+
+    print(f"\n{'='*60}")
+    print(f"工作流报告: {workflow['name']}")
+    print(f"{'='*60}")
+    print(f"{'节点':<{width}}  {'状态':<8} {'返回码':>6} {'开始':>8} {'结束':>8} {'耗时':>8}")
+
+    finished = []
+    for name in nodes:
+        node = results.get(name) or {'status': 'pending'}
+        timeline = node.get('timeline') or {}
+        started = timeline.get('started')
+        ended = timeline.get('notified')
+        if ended is None and started is not None and node.get('duration') is not None:
+            ended = started + node['duration']
+        if ended is not None:
+            finished.append(ended)
+
+        def offset(timestamp):
+            return f"+{timestamp - submitted:.2f}s" if timestamp is not None else '-'
+
+        duration = f"{node['duration']:.2f}s" if node.get('duration') is not None else '-'
+        returncode = node.get('returncode')
+        status = f"{NODE_MARKS[node['status']]} {node['status']}"
+        print(f"{name:<{width}}  {status:<8} {returncode if returncode is not None else '-':>6} "
+              f"{offset(started):>8} {offset(ended):>8} {duration:>8}")
+        if node['status'] == 'skipped':
+            print(f"{'':<{width}}  ↳ 依赖失败: {', '.join(node['blocked_by'])}")
+        elif node.get('allowed'):
+            print(f"{'':<{width}}  ↳ allow_failure: 不影响依赖它的节点")
+        elif node['status'] in ('failed', 'error') and node.get('stderr'):
+            print(f"{'':<{width}}  ↳ {node['stderr'].strip().splitlines()[-1][:80]}")
+
+    path, total = critical_path(nodes, results)
+    wall = max(finished) - submitted if finished else 0
+    print(f"\n关键路径: {' → '.join(path)}（命令耗时合计 {total:.2f}s）")
+    print(f"总耗时: {wall:.2f}s（排队、调度和结果传递 {max(wall - total, 0):.2f}s）")
+
+    counts = {}
+    for node in results.values():
+        counts[node['status']] = counts.get(node['status'], 0) + 1
+    print("节点: " + '  '.join(f"{NODE_MARKS[s]} {counts[s]} {s}" for s in NODE_MARKS if s in counts))
+    print(f"{'='*60}\n")
+
+
+def workflow_main(argv):
+    """
+    dispatch.py workflow：按 DAG 描述派发 chain / group / chord，等待并报告各节点耗时
+
+    Args:
+        argv (list): workflow 之后的命令行参数
+    """
+    from celery_tasks import workflow as dag
+
+    parser = argparse.ArgumentParser(
+        prog='dispatch.py workflow',
+        description='按依赖图派发命令：无依赖关系的节点并行执行，节点失败时跳过依赖它的节点',
+        epilog='示例: dispatch.py workflow pipeline.yml --timeout 600',
+    )
+    parser.add_argument('file', help='工作流文件（YAML 或 JSON）')
+    parser.add_argument('--timeout', '-t', type=int, default=300,
+                        help='节点默认超时时间（秒，默认 300）')
+    parser.add_argument('--cwd', help='节点默认工作目录')
+    parser.add_argument('--queue', '-q', metavar='NAME', help='节点默认队列（默认按超时路由）')
+    parser.add_argument('--priority', type=int, choices=range(10), metavar='0-9',
+                        help='节点默认优先级（0 最高，9 最低）')
+    parser.add_argument('--dry-run', action='store_true', help='只显示执行计划，不派发')
+    parser.add_argument('--bg', '--background', action='store_true',
+                        help='派发后不等待（输出各节点任务 ID）')
+    parser.add_argument('--wait-timeout', type=float, metavar='SECONDS',
+                        help='等待整个工作流的超时时间（秒）')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出各节点结果')
+    args = parser.parse_args(argv)
+
+    try:
+        workflow = dag.load_workflow(args.file)
+    except (OSError, ValueError) as e:
+        print(f"\n✗ 读取工作流失败: {e}")
+        sys.exit(1)
+
+    nodes = workflow['nodes']
+    tree, waits = dag.plan_workflow(nodes)
+    extra = dag.extra_waits(nodes, waits)
+
+    # --json 时进度信息输出到 stderr，stdout 只有 JSON 结果
+    progress = contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext()
+    with progress:
+        print(f"\n{'='*60}")
+        print(f"工作流: {workflow['name']}（{len(nodes)} 个节点）")
+        print(f"{'='*60}")
+        print(f"执行计划: {dag.describe_plan(tree)}")
+        for name, deps in extra.items():
+            print(f"  ⚠ {name} 额外等待: {', '.join(deps)}（依赖关系无法精确表示为 chain/group）")
+
+        if args.dry_run:
+            return
+
+        if not check_services_status():
+            sys.exit(1)
+
+        app = get_client_app()
+        canvas, task_ids, tree, waits = dag.build_canvas(
+            app, workflow, timeout=args.timeout, cwd=args.cwd,
+            options=build_route_options(args.queue, args.priority),
+        )
+
+        # 派发时刻（各节点时间相对该时刻）
+        submitted = time.time()
+
+        def submit():
+            nonlocal submitted
+            submitted = time.time()
+            canvas.apply_async()
+
+        def on_node(name, node):
+            elapsed = time.time() - submitted
+            detail = (f"依赖失败: {', '.join(node['blocked_by'])}" if node['status'] == 'skipped'
+                      else f"返回码 {node.get('returncode')}  {node.get('duration')}秒")
+            print(f"{NODE_MARKS[node['status']]} {name}  {detail}  (+{elapsed:.1f}s)")
+
+        if args.bg:
+            submit()
+            print(f"✓ 已派发（{(time.time() - submitted) * 1000:.1f}ms）")
+            for name, task_id in task_ids.items():
+                print(f"  {name}: {task_id}")
+            print(f"\n查询节点结果: python scripts/dispatch.py --task-id <task-id>")
+            return
+
+        import asyncio
+
+        print("")
         try:
-            task_result = result.get(timeout=10)
-            print(f"成功: {task_result['success']}")
-            print(f"返回码: {task_result['returncode']}")
-            if task_result.get('stdout'):
-                print(f"\n输出: {task_result['stdout'][:500]}")
-        except Exception as e:
-            print(f"获取结果失败: {e}")
+            # 先订阅全部节点的结果再派发，不会错过很快结束的节点
+            results = asyncio.run(dag.wait_for_nodes(
+                task_ids, waits, timeout=args.wait_timeout, on_node=on_node,
+                on_subscribed=submit,
+            ))
+        except KeyboardInterrupt:
+            print(f"\n已停止等待（工作流仍在执行）")
+            sys.exit(1)
+
+    if args.json:
+        print(json.dumps({'workflow': workflow['name'], 'task_ids': task_ids, 'nodes': results},
+                         ensure_ascii=False, indent=2))
+    else:
+        print_workflow_report(workflow, results, submitted)
+
+    if any(node['status'] != 'success' and not node.get('allowed') for node in results.values()):
+        sys.exit(1)
 
 
 def main():
     """主函数"""
+    # 子命令：查询本地任务历史、DAG 工作流（在解析派发参数之前分发）
+    if len(sys.argv) > 1 and sys.argv[1] == 'history':
+        history_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == 'workflow':
+        workflow_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         description="Celery 任务派发工具",
         formatter_class=argparse.RawDescriptionHelpFormatter
@@ -289,25 +1203,115 @@ def main():
                        help='查询指定任务的状态')
     parser.add_argument('--cwd', metavar='DIR',
                        help='工作目录')
+    parser.add_argument('--batch', metavar='FILE',
+                       help='批量派发（JSON Lines 文件，- 表示标准输入）')
+    parser.add_argument('--follow', '-f', action='store_true',
+                       help='实时跟踪命令输出（可与 --task-id 一起使用）')
+    parser.add_argument('--full', action='store_true',
+                       help='与 --task-id 一起使用，输出完整 stdout/stderr（按需读取 Blob）')
+    parser.add_argument('--blob-threshold', type=int, metavar='BYTES',
+                       help='输出超过该字节数时转存到 Blob 存储（默认 256KB）')
+    parser.add_argument('--exec', dest='exec_mode', choices=sorted(EXEC_MODES),
+                       help='执行方式：shell（默认，经由 /bin/sh）、argv（直接执行，按 shlex 拆分参数）、'
+                            'auto（命令不含管道、重定向、变量等 shell 语法时直接执行）')
+    parser.add_argument('--no-warm', action='store_true',
+                       help='不使用 Worker 的预热解释器池，按普通方式启动 Python 脚本')
+    parser.add_argument('--queue', '-q', metavar='NAME',
+                       help='指定队列（fast/default/bulk，默认按 --timeout 自动路由）')
+    parser.add_argument('--priority', type=int, choices=range(10), metavar='0-9',
+                       help='任务优先级（0 最高，9 最低，默认 5）')
+    parser.add_argument('--cache', action='store_true',
+                       help='启用执行缓存：相同命令、工作目录和输入时直接返回缓存结果')
+    parser.add_argument('--cache-key', metavar='KEY',
+                       help='自定义缓存键（隐含 --cache）')
+    parser.add_argument('--cache-ttl', type=int, metavar='SECONDS',
+                       help='缓存时间（默认 3600 秒）')
+    parser.add_argument('--cache-env', action='append', metavar='NAME',
+                       help='计入缓存指纹的环境变量名（可多次指定）')
+    parser.add_argument('--cache-input', action='append', metavar='PATH',
+                       help='计入缓存指纹的输入文件（可多次指定，隐含 --cache）')
+    parser.add_argument('--cache-hash', action='store_true',
+                       help='按内容哈希（而非修改时间）判断输入文件是否变化')
+    parser.add_argument('--dedupe', action='store_true',
+                       help='单飞去重：相同命令正在执行时等待并共用其结果，不重复执行')
+    parser.add_argument('--wait-all', nargs='+', metavar='ID',
+                       help='并发等待多个任务完成（- 表示从标准输入读取任务 ID）')
+    parser.add_argument('--wait', action='store_true',
+                       help='与 --batch 一起使用，派发后等待全部任务完成')
+    parser.add_argument('--wait-timeout', type=float, metavar='SECONDS',
+                       help='--wait-all 的整体等待超时（默认一直等待）')
+    parser.add_argument('--no-daemon', action='store_true',
+                       help='不使用常驻派发守护进程，直接连接 Broker')
+    parser.add_argument('--cron', metavar='EXPR',
+                       help='按 cron 表达式周期执行（如 "*/5 * * * *"，由调度器 scripts/scheduler.py 触发）')
+    parser.add_argument('--no-scheduler', action='store_true',
+                       help='--delay/--eta 不使用调度器，直接以 Celery countdown/eta 发布')
 
     args = parser.parse_args()
 
+    # 周期任务：写入调度器（不需要 Worker 在线）
+    if args.cron:
+        if not args.command:
+            parser.error("--cron 需要指定命令")
+        if args.delay or args.eta:
+            parser.error("--cron 不能与 --delay/--eta 同时使用")
+        if schedule_cron(args.command, args.cron, queue=args.queue, priority=args.priority,
+                         **build_task_kwargs(args)) is None:
+            sys.exit(1)
+        return
+
+    # 常驻守护进程运行时，作为瘦客户端转发请求
+    if not args.no_daemon and (args.command or args.batch or args.task_id):
+        from celery_tasks.dispatch_client import DaemonClient
+        client = DaemonClient.connect()
+        if client is not None and run_via_daemon(client, args):
+            return
+
+    # 并发等待多个任务
+    if args.wait_all:
+        task_ids = read_task_ids(args.wait_all)
+        if not task_ids:
+            parser.error("没有需要等待的任务 ID")
+        if not wait_for_tasks(task_ids, timeout=args.wait_timeout):
+            sys.exit(1)
+        return
+
     # 查询任务状态
     if args.task_id:
-        check_task_status(args.task_id)
+        check_task_status(args.task_id, follow=args.follow, full=args.full)
+        return
+
+    # 批量派发
+    if args.batch:
+        task_ids = dispatch_batch(
+            args.batch,
+            delay=args.delay,
+            eta=args.eta,
+            timeout=args.timeout,
+            cwd=args.cwd,
+            wait=args.wait,
+            queue=args.queue,
+            priority=args.priority,
+            scheduler=not args.no_scheduler
+        )
+        if task_ids is None:
+            sys.exit(1)
         return
 
     # 派发任务
     if not args.command:
-        parser.error("需要指定命令或使用 --task-id 查询任务")
+        parser.error("需要指定命令、--batch 文件或使用 --task-id 查询任务")
 
     dispatch_command(
         command=args.command,
         delay=args.delay,
         eta=args.eta,
         background=args.bg,
-        timeout=args.timeout,
-        cwd=args.cwd
+        follow=args.follow,
+        queue=args.queue,
+        priority=args.priority,
+        scheduler=not args.no_scheduler,
+        **build_task_kwargs(args)
     )
 
 
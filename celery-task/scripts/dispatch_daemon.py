@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+"""
+常驻派发守护进程
+长期持有 Broker/结果后端连接池，通过 Unix 域套接字（Windows 上为本机 TCP）
+接收 dispatch.py 的派发和查询请求，使 shell 循环中的每次派发只需几毫秒
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+import socketserver
+from pathlib import Path
+
+
+# 添加技能路径
+skill_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(skill_dir))
+
+from celery_tasks.client import (
+    build_batch_signatures, build_schedule_options, defer_to_scheduler, get_client_app
+)
+from celery_tasks.dispatch_client import DaemonClient, daemon_address, use_unix_socket
+from celery_tasks.settings import DISPATCH_PORT, DISPATCH_SOCKET
+
+
+# 健康检查结果缓存时间（秒）
+HEALTH_CACHE_SECONDS = 2
+
+# wait 请求轮询结果的间隔（秒）
+WAIT_POLL_INTERVAL = 0.1
+
+
+class Dispatcher:
+    """持有 Celery 客户端和连接池，处理各类请求"""
+
+    def __init__(self):
+        self.app = get_client_app()
+        self.started_at = time.time()
+        self.submitted = 0
+        # 结果后端的 pubsub 订阅不是线程安全的，发布操作串行执行（单次仅毫秒级）
+        self._publish_lock = threading.Lock()
+        self._health = None
+        self._health_checked = 0
+
+        # 预先建立 Broker 连接，首个请求无需等待连接
+        with self.app.producer_or_acquire() as producer:
+            producer.connection.ensure_connection(max_retries=3)
+
+    def op_ping(self, request):
+        """守护进程状态"""
+        return {
+            'pid': os.getpid(),
+            'uptime': round(time.time() - self.started_at, 1),
+            'submitted': self.submitted,
+        }
+
+    def op_health(self, request):
+        """通过 Worker 心跳检查服务状态（结果短暂缓存）"""
+        now = time.time()
+        if self._health is None or now - self._health_checked > HEALTH_CACHE_SECONDS:
+            from celery_tasks.heartbeat import read_heartbeat
+            try:
+                heartbeat = read_heartbeat()
+                self._health = {'redis': True, 'worker': heartbeat}
+            except Exception:
+                self._health = {'redis': False, 'worker': None}
+            self._health_checked = now
+        return dict(self._health)
+
+    def op_submit(self, request):
+        """派发单个命令（延迟任务优先交给调度器）"""
+        options = dict(request.get('options') or {})
+        if request.get('scheduler', True):
+            signature = self.app.signature(
+                'execute_command', args=[request['command']],
+                kwargs=request.get('kwargs') or {}, **options
+            )
+            deferred = defer_to_scheduler([signature], request.get('delay'), request.get('eta'))
+            if deferred:
+                self.submitted += 1
+                return {'task_id': deferred[0], 'scheduled': True}
+
+        options.update(build_schedule_options(request.get('delay'), request.get('eta')))
+        with self._publish_lock:
+            async_result = self.app.send_task(
+                'execute_command',
+                args=[request['command']],
+                kwargs=request.get('kwargs') or {},
+                **options
+            )
+            self.submitted += 1
+        return {'task_id': async_result.id}
+
+    def op_batch(self, request):
+        """批量派发（一个 group，一次发布；延迟任务优先交给调度器）"""
+        from celery import group
+
+        signatures = build_batch_signatures(
+            self.app, request['specs'],
+            timeout=request.get('timeout', 300),
+            cwd=request.get('cwd'),
+            options=request.get('options'),
+        )
+        if request.get('scheduler', True):
+            task_ids = defer_to_scheduler(signatures, request.get('delay'), request.get('eta'))
+            if task_ids:
+                self.submitted += len(task_ids)
+                return {'task_ids': task_ids, 'scheduled': True}
+
+        options = build_schedule_options(request.get('delay'), request.get('eta'))
+        with self._publish_lock:
+            group_result = group(signatures).apply_async(**options)
+            self.submitted += len(signatures)
+        return {
+            'group_id': group_result.id,
+            'task_ids': [r.id for r in group_result.results],
+        }
+
+    def _task_meta(self, task_id):
+        """读取任务状态（直接读取结果后端，线程安全）"""
+        meta = self.app.backend.get_task_meta(task_id)
+        response = {'task_id': task_id, 'state': meta['status']}
+        if meta['status'] == 'SUCCESS':
+            response['result'] = meta['result']
+        elif meta['status'] in ('FAILURE', 'REVOKED'):
+            response['error'] = repr(meta['result'])
+        return response
+
+    def op_status(self, request):
+        """查询任务状态"""
+        return self._task_meta(request['task_id'])
+
+    def op_wait(self, request):
+        """等待任务完成（wait_timeout 为等待期限，与客户端的套接字超时无关）"""
+        deadline = time.time() + float(request.get('wait_timeout', 300))
+        while True:
+            response = self._task_meta(request['task_id'])
+            if response['state'] in ('SUCCESS', 'FAILURE', 'REVOKED'):
+                return response
+            if time.time() >= deadline:
+                raise TimeoutError('等待任务结果超时')
+            time.sleep(WAIT_POLL_INTERVAL)
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """逐行读取 JSON 请求并返回 JSON 响应"""
+
+    def handle(self):
+        dispatcher = self.server.dispatcher
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                op = request.get('op')
+                if op == 'shutdown':
+                    response = {'ok': True}
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                else:
+                    handler = getattr(dispatcher, f'op_{op}', None)
+                    if handler is None:
+                        raise ValueError(f'未知操作: {op}')
+                    response = {'ok': True, **handler(request)}
+            except Exception as e:
+                response = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+
+            self.wfile.write(json.dumps(response, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+if use_unix_socket():
+    class DispatchServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+else:
+    class DispatchServer(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+
+def create_server():
+    """创建监听套接字（Unix 域套接字仅当前用户可访问）"""
+    if use_unix_socket():
+        socket_path = Path(DISPATCH_SOCKET)
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if socket_path.exists():
+            # 旧守护进程仍在运行时不覆盖
+            client = DaemonClient.connect()
+            if client is not None:
+                client.close()
+                raise RuntimeError(f"守护进程已在运行: {socket_path}")
+            socket_path.unlink()
+        old_umask = os.umask(0o077)
+        try:
+            return DispatchServer(str(socket_path), RequestHandler)
+        finally:
+            os.umask(old_umask)
+    return DispatchServer(('127.0.0.1', DISPATCH_PORT), RequestHandler)
+
+
+def run_daemon():
+    """启动守护进程（前台运行）"""
+    print(f"\n{'='*60}")
+    print("启动常驻派发守护进程")
+    print(f"{'='*60}")
+
+    try:
+        server = create_server()
+    except (RuntimeError, OSError) as e:
+        print(f"\n✗ 启动失败: {e}")
+        sys.exit(1)
+
+    try:
+        server.dispatcher = Dispatcher()
+    except Exception as e:
+        server.server_close()
+        print(f"\n✗ 无法连接 Broker: {e}")
+        sys.exit(1)
+
+    print(f"监听地址: {daemon_address()}")
+    print(f"PID: {os.getpid()}")
+    print(f"\n按 Ctrl+C 停止守护进程")
+    print(f"{'='*60}\n")
+
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, lambda *_: threading.Thread(
+            target=server.shutdown, daemon=True).start())
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if use_unix_socket() and os.path.exists(DISPATCH_SOCKET):
+            os.unlink(DISPATCH_SOCKET)
+        print("\n守护进程已停止")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="常驻派发守护进程")
+    parser.add_argument('--status', action='store_true', help='查看守护进程状态')
+    parser.add_argument('--stop', action='store_true', help='停止守护进程')
+
+    args = parser.parse_args()
+
+    if args.status or args.stop:
+        client = DaemonClient.connect()
+        if client is None:
+            print(f"✗ 守护进程未运行 ({daemon_address()})")
+            sys.exit(1)
+        try:
+            if args.stop:
+                client.request('shutdown')
+                print("✓ 守护进程已停止")
+            else:
+                info = client.request('ping')
+                print(f"✓ 守护进程运行中 ({daemon_address()})")
+                print(f"  PID: {info['pid']}")
+                print(f"  运行时间: {info['uptime']} 秒")
+                print(f"  已派发: {info['submitted']} 个任务")
+        finally:
+            client.close()
+        return
+
+    run_daemon()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+#!/usr/bin/env python
+"""
+压测脚本
+按目标速率（开环）或固定并发数（闭环）持续派发 execute_command，运行指定时长后报告
+实际吞吐量、延迟分布、错误率以及 Redis 内存和队列积压的变化，
+用于评估单台主机加当前 Redis 配置能承载的任务速率
+"""
+
+import sys
+import time
+import random
+import asyncio
+import argparse
+from uuid import uuid4
+from pathlib import Path
+from functools import partial
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 添加技能路径
+skill_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(skill_dir))
+
+from celery_tasks.stats import summarize
+
+
+# 未指定 --mix / --command 时的负载
+DEFAULT_COMMAND = 'echo loadgen'
+
+# Redis 内存和队列积压的采样间隔（秒）
+SAMPLE_INTERVAL = 1.0
+
+# 结果分类
+OUTCOMES = ('ok', 'failed', 'timeout', 'error', 'pending')
+
+# 发布消息的线程数（apply_async 是同步调用，不在事件循环中执行，以免拖慢开环节拍）
+PUBLISH_THREADS = 4
+
+
+def load_mix(app, mix_file=None, commands=None, timeout=300, cwd=None, options=None):
+    """
+    读取负载组合
+
+    mix 文件与 dispatch.py --batch 的格式相同（每行一个 JSON 对象或纯文本命令），
+    JSON 对象额外支持 weight（权重，默认 1）和 name（报告中的名称，默认取命令前缀）。
+
+    Args:
+        app: Celery 应用
+        mix_file (str, optional): mix 文件路径
+        commands (list[str], optional): 命令（权重均为 1）
+        timeout (int): 默认命令超时时间
+        cwd (str, optional): 默认工作目录
+        options (dict, optional): 默认派发选项 queue/priority
+
+    Returns:
+        list[dict]: 每种负载的 name、weight、signature
+    """
+    from dispatch import load_batch_specs
+    from celery_tasks.client import build_batch_signatures
+    from celery_tasks.command_utils import command_prefix
+
+    specs = load_batch_specs(mix_file) if mix_file else []
+    specs += [{'command': command} for command in commands or []]
+    if not specs:
+        specs = [{'command': DEFAULT_COMMAND}]
+
+    signatures = build_batch_signatures(app, specs, timeout=timeout, cwd=cwd, options=options)
+    mix = []
+    for spec, signature in zip(specs, signatures):
+        weight = float(spec.get('weight', 1))
+        if weight <= 0:
+            raise ValueError(f"权重必须大于 0: {spec['command']}")
+        mix.append({
+            'name': spec.get('name') or command_prefix(spec['command']),
+            'weight': weight,
+            'signature': signature,
+        })
+    return mix
+
+
+def classify(meta):
+    """
+    按任务元数据判断结果
+
+    Returns:
+        str: ok（返回码 0）、failed（返回码非 0）、timeout（命令超时）、error（任务异常或被撤销）
+    """
+    if meta.get('status') != 'SUCCESS':
+        return 'error'
+    result = meta.get('result')
+    if not isinstance(result, dict):
+        return 'error'
+    if result.get('returncode') == 0:
+        return 'ok'
+    return 'timeout' if result.get('returncode') == -2 else 'failed'
+
+
+class LoadStats:
+    """按负载名称汇总派发数、结果和延迟"""
+
+    def __init__(self):
+        self.sent = Counter()
+        self.outcomes = defaultdict(Counter)
+        self.latencies = defaultdict(list)
+        self.send_lag = []
+        self.first_send = None
+        self.last_send = None
+        self.last_done = None
+
+    def on_sent(self, name, now, lag=0.0):
+        self.sent[name] += 1
+        self.send_lag.append(lag)
+        self.first_send = self.first_send if self.first_send is not None else now
+        self.last_send = now
+
+    def on_done(self, name, started_at, future):
+        if future.cancelled():
+            return
+        now = time.monotonic()
+        self.outcomes[name][classify(future.result())] += 1
+        self.latencies[name].append(now - started_at)
+        self.last_done = now
+
+    def on_pending(self, name, count=1):
+        self.outcomes[name]['pending'] += count
+
+
+class Sampler:
+    """定期采样 Redis 内存占用和 Broker 队列积压"""
+
+    def __init__(self, queues):
+        from celery_tasks.redis_client import get_redis
+        self.client = get_redis()
+        self.queues = queues
+        self.samples = []
+        self.error = None
+
+    def sample(self):
+        from celery_tasks.autoscale import queue_depth
+        memory = self.client.info('memory')
+        self.samples.append({
+            'time': time.monotonic(),
+            'used_memory': memory.get('used_memory', 0),
+            'queue_depth': queue_depth(self.queues),
+        })
+
+    async def run(self, stop):
+        while not stop.is_set():
+            try:
+                await asyncio.to_thread(self.sample)
+            except Exception as e:
+                # 只提示一次（如 Redis 兼容服务不支持 INFO）
+                if self.error is None:
+                    print(f'[loadgen] Sample error: {e}', file=sys.stderr)
+                self.error = str(e)
+            try:
+                await asyncio.wait_for(stop.wait(), SAMPLE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        memory = [s['used_memory'] for s in self.samples]
+        depth = [s['queue_depth'] for s in self.samples]
+        return {
+            'memory_start': memory[0],
+            'memory_end': memory[-1],
+            'memory_peak': max(memory),
+            'memory_growth': memory[-1] - memory[0],
+            'queue_depth_max': max(depth),
+            'queue_depth_end': depth[-1],
+        }
+
+
+async def run_load(mix, duration, rate=None, concurrency=None, timeout=300, drain=30,
+                   seed=None, queues=None):
+    """
+    运行压测
+
+    开环（rate）：按固定间隔派发，不等待结果；延迟从计划派发时间开始计算，
+    派发跟不上时滞后的时间同样计入延迟（避免协调遗漏），并单独记录派发滞后；
+    闭环（concurrency）：每个并发槽等待上一个任务完成后再派发下一个，延迟从派发开始计算。
+    结束派发后最多等待 drain 秒，仍未完成的任务计为 pending。
+
+    Args:
+        mix (list[dict]): 负载组合（load_mix 的返回值）
+        duration (float): 派发时长（秒）
+        rate (float, optional): 目标派发速率（任务/秒）
+        concurrency (int, optional): 并发数
+        timeout (float): 闭环模式下单个任务的最长等待（秒）
+        drain (float): 结束派发后等待未完成任务的时间（秒）
+        seed (int, optional): 随机种子（负载选择可重复）
+        queues (list[str], optional): 采样积压的队列
+
+    Returns:
+        tuple: (LoadStats, 采样汇总, 派发阶段耗时, 总耗时)
+    """
+    from celery_tasks.result_waiter import ResultWatcher
+    from celery_tasks.settings import ALL_QUEUES
+
+    chooser = random.Random(seed)
+    weights = [item['weight'] for item in mix]
+    stats = LoadStats()
+    watcher = ResultWatcher()
+    outstanding = {}
+
+    stop_sampling = asyncio.Event()
+    sampler = Sampler(list(queues or ALL_QUEUES))
+    sampling = asyncio.create_task(sampler.run(stop_sampling))
+
+    loop = asyncio.get_running_loop()
+    publisher = ThreadPoolExecutor(max_workers=PUBLISH_THREADS, thread_name_prefix='loadgen-publish')
+    # 开环模式下尚未完成派发的任务
+    submitting = set()
+
+    async def submit(scheduled_at=None):
+        item = chooser.choices(mix, weights)[0]
+        task_id = str(uuid4())
+        # 先订阅再派发，不会漏掉很快完成的任务
+        future = await watcher.watch(task_id, check=False)
+        sent_at = time.monotonic()
+        started_at = sent_at if scheduled_at is None else scheduled_at
+        stats.on_sent(item['name'], sent_at, sent_at - started_at)
+        outstanding[future] = item['name']
+        future.add_done_callback(lambda f: (
+            stats.on_done(item['name'], started_at, f), outstanding.pop(f, None)))
+        try:
+            await loop.run_in_executor(publisher, partial(item['signature'].apply_async,
+                                                          task_id=task_id))
+        except Exception as e:
+            await watcher.forget(task_id)
+            if not future.done():
+                future.set_result({'status': 'FAILURE', 'result': f'派发失败: {e}'})
+        return future
+
+    start = time.monotonic()
+    deadline = start + duration
+    try:
+        if rate:
+            count = 0
+            while True:
+                target = start + count / rate
+                if target >= deadline:
+                    break
+                delay = target - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # 不等待订阅和发布完成，节拍不受派发耗时影响
+                task = asyncio.create_task(submit(scheduled_at=target))
+                submitting.add(task)
+                task.add_done_callback(submitting.discard)
+                count += 1
+            if submitting:
+                await asyncio.gather(*submitting)
+        else:
+            async def slot():
+                while time.monotonic() < deadline:
+                    future = await submit()
+                    try:
+                        await asyncio.wait_for(asyncio.shield(future), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+
+            await asyncio.gather(*(slot() for _ in range(concurrency)))
+        send_elapsed = time.monotonic() - start
+
+        await watcher.refresh()
+        if outstanding:
+            print(f"  派发结束，等待 {len(outstanding)} 个未完成的任务（最多 {drain:.0f} 秒）...")
+            await asyncio.wait(list(outstanding), timeout=drain)
+        for name in list(outstanding.values()):
+            stats.on_pending(name)
+    finally:
+        for task in submitting:
+            task.cancel()
+        publisher.shutdown(wait=False, cancel_futures=True)
+        stop_sampling.set()
+        await sampling
+        await watcher.close()
+        # 最终采样（包含排空阶段）
+        try:
+            await asyncio.to_thread(sampler.sample)
+        except Exception:
+            pass
+
+    return stats, sampler.summary(), send_elapsed, time.monotonic() - start
+
+
+def build_report(stats, sampling, send_elapsed, total_elapsed):
+    """整理压测结果"""
+    from celery_tasks.metrics import DEFAULT_BUCKETS
+
+    all_latencies = [v for values in stats.latencies.values() for v in values]
+    sent = sum(stats.sent.values())
+    completed = len(all_latencies)
+    outcomes = Counter()
+    for counter in stats.outcomes.values():
+        outcomes.update(counter)
+
+    # 完成阶段耗时：首个任务派发 → 最后一个任务完成
+    active = ((stats.last_done or 0) - (stats.first_send or 0)) if completed else 0
+
+    histogram = Counter()
+    for value in all_latencies:
+        histogram[next((str(b) for b in DEFAULT_BUCKETS if value <= b), '+Inf')] += 1
+
+    workloads = {}
+    for name in stats.sent:
+        workloads[name] = {
+            'sent': stats.sent[name],
+            'outcomes': {k: stats.outcomes[name].get(k, 0) for k in OUTCOMES},
+            'latency_ms': summarize([v * 1000 for v in stats.latencies[name]]),
+        }
+
+    return {
+        'sent': sent,
+        'completed': completed,
+        'send_seconds': round(send_elapsed, 3),
+        'total_seconds': round(total_elapsed, 3),
+        'send_rate': sent / send_elapsed if send_elapsed > 0 else None,
+        'throughput': completed / active if active > 0 else None,
+        'send_lag_ms': summarize([v * 1000 for v in stats.send_lag]),
+        'outcomes': {k: outcomes.get(k, 0) for k in OUTCOMES},
+        'error_rate': (sent - outcomes.get('ok', 0)) / sent if sent else None,
+        'latency_ms': summarize([v * 1000 for v in all_latencies]),
+        'latency_histogram': {
+            str(b): histogram.get(str(b), 0) for b in list(DEFAULT_BUCKETS) + ['+Inf']
+        },
+        'workloads': workloads,
+        'redis': sampling,
+    }
+
+
+def format_bytes(value):
+    """格式化字节数（可为负）"""
+    sign = '-' if value < 0 else ''
+    value = abs(value)
+    for unit in ('B', 'K', 'M', 'G'):
+        if value < 1024 or unit == 'G':
+            return f"{sign}{value:.0f}{unit}" if unit == 'B' else f"{sign}{value:.1f}{unit}"
+        value /= 1024
+
+
+def print_report(report):
+    """打印压测结果"""
+    latency = report['latency_ms']
+    outcomes = report['outcomes']
+    print(f"\n派发: {report['sent']} 个，{report['send_rate'] or 0:.1f}/秒"
+          f"（派发滞后 p99 {report['send_lag_ms'].get('p99') or 0:.1f}ms）")
+    print(f"完成: {report['completed']} 个，吞吐量 {report['throughput'] or 0:.1f}/秒")
+    print(f"结果: ✓ {outcomes['ok']} 成功 / ✗ {outcomes['failed']} 失败 / "
+          f"⏱ {outcomes['timeout']} 超时 / ⚠ {outcomes['error']} 异常 / "
+          f"⏳ {outcomes['pending']} 未完成  错误率 {(report['error_rate'] or 0) * 100:.2f}%")
+    if latency.get('count'):
+        print(f"延迟: p50 {latency['p50']:.1f}ms  p95 {latency['p95']:.1f}ms  "
+              f"p99 {latency['p99']:.1f}ms  max {latency['max']:.1f}ms")
+
+    histogram = report['latency_histogram']
+    total = sum(histogram.values())
+    if total:
+        print("\n延迟分布（秒）:")
+        for bucket, count in histogram.items():
+            if count:
+                bar = '█' * max(1, round(count / total * 40))
+                print(f"  ≤ {bucket:>6}  {count:>7}  {bar}")
+
+    if len(report['workloads']) > 1:
+        print("\n按负载:")
+        for name, workload in report['workloads'].items():
+            summary = workload['latency_ms']
+            failed = workload['sent'] - workload['outcomes']['ok']
+            print(f"  {name[:24]:<24} 派发 {workload['sent']:>6}  失败 {failed:>5}  "
+                  f"p50 {summary.get('p50') or 0:>8.1f}ms  p99 {summary.get('p99') or 0:>8.1f}ms")
+
+    redis = report['redis']
+    if redis:
+        print(f"\nRedis 内存: {format_bytes(redis['memory_start'])} → {format_bytes(redis['memory_end'])}"
+              f"（增长 {format_bytes(redis['memory_growth'])}，峰值 {format_bytes(redis['memory_peak'])}）")
+        print(f"队列积压: 最高 {redis['queue_depth_max']}，结束时 {redis['queue_depth_end']}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description="Celery 任务压测：按速率或并发数持续派发 execute_command",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  # 开环：每秒 50 个任务，持续 60 秒
+  %(prog)s --rate 50 --duration 60
+
+  # 闭环：保持 16 个任务同时执行，按 mix 文件的权重混合负载
+  %(prog)s --concurrency 16 --duration 120 --mix loadgen.jsonl
+        """
+    )
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--rate', '-r', type=float, help='目标派发速率（任务/秒，开环）')
+    mode.add_argument('--concurrency', '-c', type=int, help='同时执行的任务数（闭环）')
+    parser.add_argument('--duration', '-d', type=float, default=60, help='派发时长（秒，默认 60）')
+    parser.add_argument('--mix', metavar='FILE',
+                        help='负载组合文件（dispatch.py --batch 格式，可带 weight、name 字段）')
+    parser.add_argument('--command', action='append', dest='commands', metavar='CMD',
+                        help=f'负载命令（可多次指定，权重相同；默认 "{DEFAULT_COMMAND}"）')
+    parser.add_argument('--timeout', '-t', type=int, default=300, help='命令超时时间（秒）')
+    parser.add_argument('--cwd', help='工作目录')
+    parser.add_argument('--queue', '-q', help='指定队列（默认按超时路由）')
+    parser.add_argument('--priority', type=int, choices=range(10), metavar='0-9', help='任务优先级')
+    parser.add_argument('--drain', type=float, default=30, help='结束派发后等待未完成任务的时间（秒）')
+    parser.add_argument('--seed', type=int, help='随机种子（负载选择可重复）')
+    parser.add_argument('--output', '-o', metavar='FILE', help='JSON 报告输出路径')
+
+    args = parser.parse_args()
+    if args.rate is not None and args.rate <= 0:
+        parser.error('--rate 必须大于 0')
+    if args.concurrency is not None and args.concurrency <= 0:
+        parser.error('--concurrency 必须大于 0')
+
+    from benchmark import write_report
+    from celery_tasks.client import build_route_options, get_client_app
+    from celery_tasks.heartbeat import read_heartbeat
+    from celery_tasks.settings import ALL_QUEUES
+
+    try:
+        if not read_heartbeat():
+            print("\n✗ 未检测到 Worker 心跳，请先启动 Worker")
+            sys.exit(1)
+    except Exception as e:
+        print(f"\n✗ 无法连接 Redis: {e}")
+        sys.exit(1)
+
+    app = get_client_app()
+    options = build_route_options(args.queue, args.priority)
+    try:
+        mix = load_mix(app, args.mix, args.commands, args.timeout, args.cwd, options)
+    except (OSError, ValueError) as e:
+        print(f"\n✗ 读取负载失败: {e}")
+        sys.exit(1)
+
+    mode = f"开环 {args.rate:g}/秒" if args.rate else f"闭环 并发 {args.concurrency}"
+    print(f"\n{'='*60}")
+    print(f"压测: {mode}，持续 {args.duration:g} 秒")
+    print(f"{'='*60}")
+    total_weight = sum(item['weight'] for item in mix)
+    for item in mix:
+        print(f"  {item['weight'] / total_weight * 100:>5.1f}%  {item['name']}")
+
+    queues = [args.queue] if args.queue else list(ALL_QUEUES)
+    try:
+        stats, sampling, send_elapsed, total_elapsed = asyncio.run(run_load(
+            mix, args.duration, rate=args.rate, concurrency=args.concurrency,
+            timeout=args.timeout, drain=args.drain, seed=args.seed, queues=queues,
+        ))
+    except KeyboardInterrupt:
+        print("\n已停止压测（已派发的任务仍在执行）")
+        sys.exit(1)
+
+    report = build_report(stats, sampling, send_elapsed, total_elapsed)
+    report.update(mode='open' if args.rate else 'closed', rate=args.rate,
+                  concurrency=args.concurrency, duration=args.duration)
+    print_report(report)
+    write_report('loadgen', report, args.output)
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
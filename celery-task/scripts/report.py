@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""
+运行统计报告脚本
+汇总 Worker 写入 Redis 的统计数据：资源占用最多的命令、各阶段延迟分布
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+
+# 添加技能路径
+skill_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(skill_dir))
+
+
+# usage 报告的排序字段
+USAGE_SORT_KEYS = {
+    'cpu': lambda row: row['cpu_user'] + row['cpu_system'],
+    'wall': lambda row: row['wall'],
+    'count': lambda row: row['count'],
+    'rss': lambda row: row['max_rss_kb'],
+    'io': lambda row: row['block_in'] + row['block_out'],
+}
+
+
+def format_kb(kb):
+    """格式化内存大小"""
+    if kb >= 1024 * 1024:
+        return f"{kb / 1024 / 1024:.1f}G"
+    if kb >= 1024:
+        return f"{kb / 1024:.1f}M"
+    return f"{kb:.0f}K"
+
+
+def report_usage(sort='cpu', top=20, as_json=False, reset=False):
+    """
+    按命令前缀汇总资源占用
+
+    Args:
+        sort (str): 排序字段（cpu、wall、count、rss、io）
+        top (int): 显示的前缀数量
+        as_json (bool): 以 JSON 输出
+        reset (bool): 输出后清空统计
+    """
+    from celery_tasks.resource_usage import read_usage, reset_usage
+
+    try:
+        rows = read_usage()
+    except Exception as e:
+        print(f"\n✗ 读取统计失败: {e}")
+        sys.exit(1)
+
+    rows.sort(key=USAGE_SORT_KEYS[sort], reverse=True)
+    rows = rows[:top]
+
+    if as_json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else:
+        print(f"\n{'='*60}")
+        print(f"资源占用（按命令前缀，排序: {sort}）")
+        print(f"{'='*60}")
+        if not rows:
+            print("暂无统计数据（Worker 执行命令后自动记录）")
+        else:
+            total_cpu = sum(r['cpu_user'] + r['cpu_system'] for r in rows) or 1
+            print(f"{'前缀':<28} {'次数':>6} {'墙钟(s)':>10} {'CPU(s)':>10} {'CPU%':>6} "
+                  f"{'峰值RSS':>8} {'块I/O':>10} {'切换':>10}")
+            for r in rows:
+                cpu = r['cpu_user'] + r['cpu_system']
+                print(f"{r['prefix'][:28]:<28} {r['count']:>6.0f} {r['wall']:>10.1f} "
+                      f"{cpu:>10.1f} {cpu / total_cpu * 100:>5.1f}% "
+                      f"{format_kb(r['max_rss_kb']):>8} "
+                      f"{r['block_in'] + r['block_out']:>10.0f} "
+                      f"{r['ctx_voluntary'] + r['ctx_involuntary']:>10.0f}")
+            print(f"\nCPU% 为该前缀占所列命令总 CPU 时间的比例；CPU 时间包含子进程树")
+        print(f"{'='*60}\n")
+
+    if reset:
+        count = reset_usage()
+        print(f"✓ 已清空 {count} 个命令前缀的统计")
+
+
+def report_latency(last=1000, prefix=None, as_json=False):
+    """
+    汇总最近任务各阶段的延迟分位数
+
+    Args:
+        last (int): 统计最近多少个任务
+        prefix (str, optional): 只统计该命令前缀的任务
+        as_json (bool): 以 JSON 输出
+    """
+    from celery_tasks.stats import summarize
+    from celery_tasks.timeline import PHASES, phase_durations, recent_timelines
+
+    try:
+        timelines = recent_timelines(last)
+    except Exception as e:
+        print(f"\n✗ 读取时间线失败: {e}")
+        sys.exit(1)
+
+    if prefix:
+        timelines = [t for t in timelines if t.get('command_prefix') == prefix]
+
+    samples = {name: [] for name, *_ in PHASES}
+    for timeline in timelines:
+        for name, seconds in phase_durations(timeline).items():
+            samples[name].append(seconds * 1000)
+    summaries = {name: summarize(values) for name, values in samples.items()}
+
+    if as_json:
+        print(json.dumps({'tasks': len(timelines), 'phases_ms': summaries},
+                         ensure_ascii=False, indent=2))
+        return
+
+    print(f"\n{'='*60}")
+    print(f"延迟分解（最近 {len(timelines)} 个任务{f'，前缀: {prefix}' if prefix else ''}）")
+    print(f"{'='*60}")
+    if not timelines:
+        print("暂无数据（Worker 执行 execute_command 后自动记录）")
+    else:
+        print(f"{'阶段':<16} {'样本':>6} {'p50(ms)':>10} {'p95(ms)':>10} {'p99(ms)':>10} {'max(ms)':>10}")
+        for name, label, *_ in PHASES:
+            summary = summaries[name]
+            if not summary.get('count'):
+                continue
+            print(f"{label:<16} {summary['count']:>6} {summary['p50']:>10.1f} "
+                  f"{summary['p95']:>10.1f} {summary['p99']:>10.1f} {summary['max']:>10.1f}")
+        print(f"\n排队: 发布（或 ETA）→ Worker 收到；Worker 调度: 收到 → 开始执行；")
+        print(f"执行准备: 开始 → 启动子进程；收尾与通知: 子进程结束 → 通知入队")
+    print(f"{'='*60}\n")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="Celery 任务运行统计报告")
+    subparsers = parser.add_subparsers(dest='report', required=True)
+
+    usage = subparsers.add_parser('usage', help='按命令前缀汇总 CPU、内存、I/O 占用')
+    usage.add_argument('--sort', choices=sorted(USAGE_SORT_KEYS), default='cpu',
+                       help='排序字段（默认 cpu）')
+    usage.add_argument('--top', type=int, default=20, help='显示的前缀数量')
+    usage.add_argument('--json', action='store_true', help='以 JSON 输出')
+    usage.add_argument('--reset', action='store_true', help='输出后清空统计')
+
+    latency = subparsers.add_parser('latency', help='最近任务各阶段（排队、调度、子进程、通知）延迟分位数')
+    latency.add_argument('--last', type=int, default=1000, help='统计最近多少个任务（最多 1000）')
+    latency.add_argument('--prefix', help='只统计指定命令前缀的任务')
+    latency.add_argument('--json', action='store_true', help='以 JSON 输出')
+
+    args = parser.parse_args()
+
+    if args.report == 'usage':
+        report_usage(sort=args.sort, top=args.top, as_json=args.json, reset=args.reset)
+    elif args.report == 'latency':
+        report_latency(last=args.last, prefix=args.prefix, as_json=args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+延迟任务调度器
+把 --delay/--eta 任务和 --cron 周期任务保存在 Redis 有序集合中，到期时才发布到队列，
+Worker 不再预取并在内存中持有大量 ETA 任务（见 celery_tasks/scheduler.py）
+"""
+
+import sys
+import json
+import signal
+import argparse
+import threading
+from datetime import datetime
+from pathlib import Path
+
+
+# 添加技能路径
+skill_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(skill_dir))
+
+from celery_tasks import scheduler
+
+
+def format_timestamp(timestamp):
+    """格式化时间戳（本地时间）"""
+    if timestamp is None:
+        return '-'
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def print_status():
+    """显示调度器状态和待调度条目统计"""
+    info = scheduler.stats()
+    heartbeat = info['heartbeat']
+
+    print(f"\n{'='*60}")
+    print("调度器状态")
+    print(f"{'='*60}")
+    if heartbeat:
+        print(f"✓ 运行中: {heartbeat['hostname']} (PID {heartbeat['pid']})，"
+              f"启动于 {format_timestamp(heartbeat['started_at'])}")
+        print(f"  已发布: {heartbeat['released']}  最大延迟: {heartbeat['max_lag'] * 1000:.0f}ms")
+    else:
+        print("✗ 未运行（--delay/--eta 任务直接以 Celery countdown/eta 发布）")
+    print(f"待调度: {info['pending']}  已到期未发布: {info['overdue']}  发布中: {info['inflight']}")
+    print(f"最早到期: {format_timestamp(info['next_due'])}")
+    print(f"{'='*60}\n")
+    return heartbeat is not None
+
+
+def print_entries(limit, cron_only=False, as_json=False):
+    """按到期时间列出待调度的条目"""
+    entries = scheduler.list_entries(limit=limit, cron_only=cron_only)
+    if as_json:
+        print(json.dumps(entries, ensure_ascii=False, indent=2))
+        return
+
+    print(f"\n{'='*60}")
+    print("周期任务" if cron_only else "待调度条目（最早到期的在前）")
+    print(f"{'='*60}")
+    if not entries:
+        print("没有待调度的条目")
+    for entry in entries:
+        command = (entry.get('args') or [''])[0]
+        if isinstance(command, list):
+            command = ' '.join(command)
+        kind = f"cron {entry['cron']}" if entry.get('cron') else '一次性'
+        print(f"{format_timestamp(entry['due'])}  {kind:<18} {str(command)[:50]}")
+        print(f"{'':<21}{entry['id']}")
+    print(f"{'='*60}\n")
+
+
+def run_scheduler(batch, lease):
+    """启动调度器（前台运行）"""
+    from celery_tasks.client import get_client_app
+
+    print(f"\n{'='*60}")
+    print("启动延迟任务调度器")
+    print(f"{'='*60}")
+
+    try:
+        heartbeat = scheduler.read_heartbeat()
+        app = get_client_app()
+        instance = scheduler.Scheduler(app, batch=batch, lease=lease)
+    except Exception as e:
+        print(f"\n✗ 无法连接 Redis: {e}")
+        sys.exit(1)
+
+    if heartbeat:
+        # 条目由 Lua 脚本原子领取，多个调度器同时运行不会重复发布
+        print(f"⚠ 已有调度器在运行: {heartbeat['hostname']} (PID {heartbeat['pid']})，本实例将共同调度")
+
+    info = scheduler.stats()
+    print(f"待调度: {info['pending']}（已到期: {info['overdue']}）")
+    print(f"每批领取: {batch}  租约: {lease} 秒")
+    print(f"\n按 Ctrl+C 停止调度器")
+    print(f"{'='*60}\n")
+
+    stop = threading.Event()
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    try:
+        instance.run(stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        instance.stop()
+        print(f"\n调度器已停止（共发布 {instance.released} 个任务）")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description="延迟任务调度器：到期时才把任务发布到队列",
+        epilog="示例: scheduler.py（前台运行）| scheduler.py --list --cron | scheduler.py --cancel <ID>",
+    )
+    parser.add_argument('--status', action='store_true', help='查看调度器状态')
+    parser.add_argument('--list', action='store_true', help='列出待调度的条目')
+    parser.add_argument('--cron', action='store_true', help='与 --list 一起使用，只列出周期任务')
+    parser.add_argument('--limit', '-n', type=int, default=20, help='--list 显示条数（默认 20）')
+    parser.add_argument('--json', action='store_true', help='--list 以 JSON 输出')
+    parser.add_argument('--cancel', metavar='ID', help='取消调度条目（任务 ID 或周期任务条目 ID）')
+    parser.add_argument('--batch', type=int, default=scheduler.CLAIM_BATCH,
+                        help=f'每次领取的最大条目数（默认 {scheduler.CLAIM_BATCH}）')
+    parser.add_argument('--lease', type=int, default=scheduler.CLAIM_LEASE,
+                        help=f'领取后确认发布的租约（秒，默认 {scheduler.CLAIM_LEASE}）')
+
+    args = parser.parse_args()
+
+    if args.status:
+        if not print_status():
+            sys.exit(1)
+        return
+
+    if args.list:
+        print_entries(args.limit, cron_only=args.cron, as_json=args.json)
+        return
+
+    if args.cancel:
+        if scheduler.cancel(args.cancel):
+            print(f"✓ 已取消: {args.cancel}")
+        else:
+            print(f"✗ 调度器中没有条目 {args.cancel}（可能已发布）")
+            sys.exit(1)
+        return
+
+    run_scheduler(args.batch, args.lease)
+
+
+if __name__ == "__main__":
+    main()
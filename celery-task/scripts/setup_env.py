@@ -61,7 +61,7 @@ def setup_skill_env():
                    capture_output=True)
 
     # 安装依赖
-    dependencies = ["celery", "redis", "flower"]
+    dependencies = ["celery", "redis", "flower", "zstandard", "msgpack", "pyyaml"]
     print(f"\n安装依赖: {', '.join(dependencies)}")
 
     for dep in dependencies:
@@ -11,6 +11,13 @@ import subprocess
 from pathlib import Path
 
 
+# 添加技能路径
+skill_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(skill_dir))
+
+from celery_tasks.settings import ALL_QUEUES
+
+
 def get_skill_env():
     """获取技能虚拟环境路径"""
     skill_dir = Path(__file__).parent.parent
@@ -34,32 +41,53 @@ def get_python_executable(venv_dir):
         return venv_dir / "bin" / "python"
 
 
-def start_worker(log_level="info", enable_events=True, concurrency="solo"):
-    """
-    启动 Celery Worker
-
-    Args:
-        log_level: 日志级别 (debug, info, warning, error)
-        enable_events: 是否启用事件追踪（Flower 监控需要）
-        concurrency: 并发模式 (solo, prefork, eventlet, gevent)
-    """
-    venv_dir = get_skill_env()
-    python_exe = get_python_executable(venv_dir)
-
-    # 构建 celery 命令
+def build_worker_command(python_exe, log_level="info", enable_events=True, concurrency="solo",
+                         queues=ALL_QUEUES, processes=None, hostname=None):
+    """构建 celery worker 启动命令"""
     cmd = [
         str(python_exe),
         "-m", "celery",
         "-A", "celery_tasks.worker",  # 使用技能中的 worker 模块
         "worker",
         "-l", log_level,
-        f"--pool={concurrency}"
+        f"--pool={concurrency}",
+        "-Q", ",".join(queues),
     ]
 
+    if processes and concurrency != "solo":
+        cmd.extend(["-c", str(processes)])
+
+    if hostname:
+        cmd.extend(["-n", hostname])
+
     # 启用事件追踪（用于 Flower 监控）
     if enable_events:
         cmd.append("-E")
 
+    return cmd
+
+
+def start_worker(log_level="info", enable_events=True, concurrency="solo",
+                 queues=ALL_QUEUES, processes=None, hostname=None):
+    """
+    启动 Celery Worker
+
+    Args:
+        log_level: 日志级别 (debug, info, warning, error)
+        enable_events: 是否启用事件追踪（Flower 监控需要）
+        concurrency: 并发模式 (solo, prefork, threads, eventlet, gevent)
+        queues: 消费的队列（按顺序优先消费前面的队列）
+        processes: 并发数（solo 池忽略）
+        hostname: Worker 节点名称（同一台机器运行多个 Worker 时需要区分）
+    """
+    venv_dir = get_skill_env()
+    python_exe = get_python_executable(venv_dir)
+
+    # 构建 celery 命令
+    cmd = build_worker_command(
+        python_exe, log_level, enable_events, concurrency, queues, processes, hostname
+    )
+
     print(f"\n{'='*60}")
     print("启动 Celery Worker")
     print(f"{'='*60}")
@@ -68,6 +96,7 @@ def start_worker(log_level="info", enable_events=True, concurrency="solo"):
     print(f"日志级别: {log_level}")
     print(f"事件追踪: {'启用' if enable_events else '禁用'}")
     print(f"并发模式: {concurrency}")
+    print(f"队列: {', '.join(queues)}")
     print(f"\n命令: {' '.join(cmd)}")
     print(f"\n按 Ctrl+C 停止 Worker")
     print(f"{'='*60}\n")
@@ -82,6 +111,132 @@ def start_worker(log_level="info", enable_events=True, concurrency="solo"):
         sys.exit(1)
 
 
+def start_autoscaled_worker(minimum, maximum, log_level="info", enable_events=True,
+                            queues=ALL_QUEUES, hostname=None, interval=5,
+                            target_drain=None):
+    """
+    以自动扩缩容模式启动 Worker（prefork 池）
+
+    Worker 以 minimum 个子进程启动，当前进程作为监督者，每隔 interval 秒
+    根据队列积压和最近任务耗时调用 pool_grow / pool_shrink，子进程数保持在
+    [minimum, maximum] 之间。
+
+    Args:
+        minimum: 最小子进程数
+        maximum: 最大子进程数
+        log_level: 日志级别
+        enable_events: 是否启用事件追踪
+        queues: 消费的队列
+        hostname: Worker 节点名称（默认 autoscale@<主机名>）
+        interval: 检查间隔（秒）
+        target_drain: 期望消化积压的时间（秒）
+    """
+    import time
+    import socket
+    from celery_tasks.autoscale import TARGET_DRAIN_SECONDS, Autoscaler
+    from celery_tasks.client import get_client_app
+
+    venv_dir = get_skill_env()
+    python_exe = get_python_executable(venv_dir)
+
+    hostname = hostname or "autoscale@%h"
+    node_name = hostname.replace("%h", socket.gethostname())
+    cmd = build_worker_command(
+        python_exe, log_level, enable_events, "prefork", queues, minimum, node_name
+    )
+
+    print(f"\n{'='*60}")
+    print("启动 Celery Worker（自动扩缩容）")
+    print(f"{'='*60}")
+    print(f"Python: {python_exe}")
+    print(f"节点: {node_name}")
+    print(f"队列: {', '.join(queues)}")
+    print(f"子进程数: {minimum} ~ {maximum}")
+    print(f"检查间隔: {interval} 秒")
+    print(f"\n命令: {' '.join(cmd)}")
+    print(f"\n按 Ctrl+C 停止 Worker")
+    print(f"{'='*60}\n")
+
+    autoscaler = Autoscaler(
+        get_client_app(), node_name, queues, minimum, maximum,
+        target_drain=target_drain or TARGET_DRAIN_SECONDS,
+    )
+    process = subprocess.Popen(cmd)
+    try:
+        while process.poll() is None:
+            time.sleep(interval)
+            try:
+                autoscaler.step()
+            except Exception as e:
+                # Broker 暂时不可用时跳过本轮
+                print(f"[autoscale] Check error: {e}", file=sys.stderr)
+    except KeyboardInterrupt:
+        process.terminate()
+        process.wait()
+        print("\n\nWorker 已停止")
+        return
+
+    if process.returncode:
+        print(f"\n✗ Worker 异常退出: 返回码 {process.returncode}")
+        sys.exit(1)
+
+
+def start_supervised_workers(spec_file=None, log_level="info", enable_events=True,
+                             log_file=None):
+    """
+    按声明式配置启动并监督多个 Worker
+
+    Args:
+        spec_file: 配置文件（默认 config/workers.yml）
+        log_level: 日志级别
+        enable_events: 是否启用事件追踪
+        log_file: 汇总日志文件（默认只输出到终端）
+    """
+    from celery_tasks.supervisor import SPEC_FILE, load_specs, supervise
+
+    venv_dir = get_skill_env()
+    python_exe = get_python_executable(venv_dir)
+
+    try:
+        specs, restart = load_specs(spec_file)
+    except (OSError, ValueError) as e:
+        print(f"\n✗ 读取 Worker 配置失败: {e}")
+        sys.exit(1)
+
+    print(f"\n{'='*60}")
+    print("启动多 Worker 监督")
+    print(f"{'='*60}")
+    print(f"配置文件: {spec_file or SPEC_FILE}")
+    print(f"Python: {python_exe}")
+    for spec in specs:
+        cpus = ','.join(str(c) for c in sorted(spec['cpus'])) if spec['cpus'] else '不绑定'
+        print(f"  [{spec['name']}] 队列: {','.join(spec['queues'])}  "
+              f"池: {spec['pool']}  并发: {spec['concurrency'] or '默认'}  CPU: {cpus}")
+    if log_file:
+        print(f"汇总日志: {log_file}")
+    print(f"\n按 Ctrl+C 停止全部 Worker")
+    print(f"{'='*60}\n")
+
+    def build_command(spec):
+        return build_worker_command(
+            python_exe, log_level, enable_events, spec['pool'], spec['queues'],
+            spec['concurrency'], f"{spec['name']}@%h"
+        )
+
+    supervise(specs, restart, build_command, log_file=log_file)
+
+
+def parse_bounds(value):
+    """解析 --autoscale MIN,MAX"""
+    try:
+        minimum, maximum = (int(v) for v in value.split(","))
+    except ValueError:
+        raise ValueError(f"格式应为 MIN,MAX: {value}")
+    if minimum < 1 or maximum < minimum:
+        raise ValueError(f"需要 1 <= MIN <= MAX: {value}")
+    return minimum, maximum
+
+
 def main():
     """主函数"""
     import argparse
@@ -93,8 +248,32 @@ def main():
     parser.add_argument("--no-events", action="store_true",
                        help="禁用事件追踪（Flower 将无法监控）")
     parser.add_argument("--pool", default="solo",
-                       choices=["solo", "prefork", "eventlet", "gevent"],
+                       choices=["solo", "prefork", "threads", "eventlet", "gevent"],
                        help="并发池类型")
+    parser.add_argument("-Q", "--queues", default=",".join(ALL_QUEUES),
+                       help="消费的队列，逗号分隔，靠前的优先（默认 fast,default,bulk）")
+    parser.add_argument("-c", "--concurrency", type=int,
+                       help="并发数（prefork/threads 池）")
+    parser.add_argument("-n", "--hostname",
+                       help="Worker 节点名称，如 fast@%%h")
+    parser.add_argument("--supervise", nargs="?", const="", metavar="FILE",
+                       help="按配置文件启动并监督多个 Worker（默认 config/workers.yml）")
+    parser.add_argument("--log-file", metavar="FILE",
+                       help="与 --supervise 一起使用，汇总日志同时写入该文件")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                       help="启动 Prometheus 指标端点 http://<host>:PORT/metrics")
+    parser.add_argument("--metrics-host", metavar="HOST",
+                       help="指标端点监听地址（默认 127.0.0.1；0.0.0.0 监听所有网卡）")
+    parser.add_argument("--warm", action="store_true",
+                       help="启用预热解释器池：Python 脚本命令在预先导入模块的 zygote 中 fork 执行")
+    parser.add_argument("--warm-preload", metavar="MODULES",
+                       help="预热池预先导入的模块，逗号分隔（如 pandas,numpy，隐含 --warm）")
+    parser.add_argument("--autoscale", metavar="MIN,MAX",
+                       help="按队列积压自动调整 prefork 子进程数")
+    parser.add_argument("--scale-interval", type=float, default=5,
+                       help="自动扩缩容检查间隔（秒，默认 5）")
+    parser.add_argument("--target-drain", type=float,
+                       help="期望消化队列积压的时间（秒，默认 30）")
 
     args = parser.parse_args()
 
@@ -103,10 +282,56 @@ def main():
     if system == "Windows" and args.pool != "solo":
         print("⚠ 警告: Windows 上推荐使用 solo pool")
 
+    queues = [q.strip() for q in args.queues.split(",") if q.strip()]
+
+    # 指标端点端口和监听地址通过环境变量传给 Worker 进程
+    if args.metrics_port:
+        os.environ["CELERY_TASK_METRICS_PORT"] = str(args.metrics_port)
+    if args.metrics_host:
+        os.environ["CELERY_TASK_METRICS_HOST"] = args.metrics_host
+
+    # 预热解释器池同样通过环境变量传给 Worker 进程（zygote 由 Worker 主进程启动）
+    if args.warm or args.warm_preload:
+        if system == "Windows":
+            parser.error("预热解释器池依赖 fork，Windows 不支持")
+        os.environ["CELERY_TASK_WARM"] = "1"
+        if args.warm_preload:
+            os.environ["CELERY_TASK_WARM_PRELOAD"] = args.warm_preload
+
+    if args.supervise is not None:
+        start_supervised_workers(
+            spec_file=args.supervise or None,
+            log_level=args.log_level,
+            enable_events=not args.no_events,
+            log_file=args.log_file
+        )
+        return
+
+    if args.autoscale:
+        if system == "Windows":
+            parser.error("自动扩缩容需要 prefork 池，Windows 不支持")
+        try:
+            minimum, maximum = parse_bounds(args.autoscale)
+        except ValueError as e:
+            parser.error(str(e))
+        start_autoscaled_worker(
+            minimum, maximum,
+            log_level=args.log_level,
+            enable_events=not args.no_events,
+            queues=queues,
+            hostname=args.hostname,
+            interval=args.scale_interval,
+            target_drain=args.target_drain
+        )
+        return
+
     start_worker(
         log_level=args.log_level,
         enable_events=not args.no_events,
-        concurrency=args.pool
+        concurrency=args.pool,
+        queues=queues,
+        processes=args.concurrency,
+        hostname=args.hostname
     )
 
 
@@ -0,0 +1,25 @@
+"""
+测试公共配置
+测试只覆盖不依赖 Broker/Worker 的纯函数、Lua 脚本和守护进程协议；
+Lua 脚本测试使用 fakeredis（需要 lupa），未安装时跳过。
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+
+# 技能目录（与 scripts/*.py 相同，直接导入 celery_tasks）
+SKILL_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(SKILL_DIR))
+
+
+@pytest.fixture
+def redis_client():
+    """内存中的 Redis（支持 EVALSHA 执行 Lua 脚本）"""
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    client = fakeredis.FakeRedis()
+    yield client
+    client.flushall()
@@ -0,0 +1,42 @@
+"""Blob 存储：内容寻址、文本编码随引用保存"""
+
+import pytest
+
+from celery_tasks import blob_store
+
+
+@pytest.fixture(autouse=True)
+def blob_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, 'BLOB_DIR', tmp_path / 'blobs')
+
+
+def test_round_trip_keeps_encoding():
+    text = '编码测试 ' * 100
+    ref = blob_store.put_bytes(text.encode('gbk'), encoding='gbk')
+
+    assert ref['encoding'] == 'gbk'
+    assert ref['size'] == len(text.encode('gbk'))
+    assert blob_store.get_text(ref) == text
+    assert blob_store.get_bytes(ref) == text.encode('gbk')
+
+
+def test_identical_content_is_stored_once():
+    first = blob_store.put_bytes(b'same')
+    second = blob_store.put_bytes(b'same')
+
+    assert first == second
+    assert 'encoding' not in first
+    assert len(list(blob_store.BLOB_DIR.rglob('*'))) == 2  # 一个分目录和一个文件
+
+
+def test_offload_text_keeps_preview(monkeypatch):
+    monkeypatch.setattr(blob_store, 'PREVIEW_HEAD_CHARS', 10)
+    monkeypatch.setattr(blob_store, 'PREVIEW_TAIL_CHARS', 10)
+    text = 'head' + '中' * 1000 + 'tail'
+
+    preview, ref = blob_store.offload_text(text, encoding='utf-8', threshold=100)
+
+    assert ref is not None
+    assert preview.startswith('head') and preview.endswith('tail')
+    assert blob_store.get_text(ref) == text
+    assert blob_store.offload_text('short', threshold=100) == ('short', None)
@@ -0,0 +1,43 @@
+"""命令拆分（shell='auto' 判断能否绕过 /bin/sh 直接执行）"""
+
+import pytest
+
+from celery_tasks.command_utils import command_prefix, split_command
+
+
+@pytest.mark.parametrize('command, argv', [
+    ('python script.py --n 3', ['python', 'script.py', '--n', '3']),
+    ("grep 'a b' file.txt", ['grep', 'a b', 'file.txt']),
+    # 单引号内的 shell 字符按字面处理
+    ("grep '$HOME|*' file.txt", ['grep', '$HOME|*', 'file.txt']),
+    ('git commit -m "fix: done"', ['git', 'commit', '-m', 'fix: done']),
+])
+def test_plain_commands_are_split(command, argv):
+    assert split_command(command) == argv
+
+
+@pytest.mark.parametrize('command', [
+    'ls | wc -l',
+    'make > build.log',
+    'make && make install',
+    'echo hello',
+    'cd /tmp',
+    'FOO=1 python script.py',
+    'python script.py $ARGS',
+    'ls *.py',
+    'echo "$HOME"',
+    'python -c "print(`date`)"',
+    'python script.py # comment',
+    "python 'unterminated",
+    '',
+    '   ',
+])
+def test_shell_syntax_needs_a_shell(command):
+    assert split_command(command) is None
+
+
+def test_command_prefix():
+    assert command_prefix('make build -j8') == 'make build'
+    assert command_prefix(['python', 'gen_report.py', '--day', '1']) == 'python gen_report.py'
+    assert command_prefix('/usr/bin/python gen.py --out x') == 'python gen.py'
+    assert command_prefix('ls -la | wc -l') == 'ls'
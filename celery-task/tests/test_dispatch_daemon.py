@@ -0,0 +1,105 @@
+"""常驻派发守护进程的行协议：DaemonClient ↔ RequestHandler ↔ Dispatcher"""
+
+import socket
+import threading
+import time
+import importlib.util
+
+import pytest
+
+pytest.importorskip('celery')
+if not hasattr(socket, 'AF_UNIX'):
+    pytest.skip('需要 Unix 域套接字', allow_module_level=True)
+
+from celery_tasks.dispatch_client import DaemonClient, DaemonError
+from conftest import SKILL_DIR
+
+
+def load_daemon():
+    spec = importlib.util.spec_from_file_location(
+        'dispatch_daemon', SKILL_DIR / 'scripts' / 'dispatch_daemon.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+daemon = load_daemon()
+
+
+class FakeDispatcher(daemon.Dispatcher):
+    """不连接 Broker 的 Dispatcher：任务状态取自 states，记录收到的请求"""
+
+    def __init__(self, states):
+        self.started_at = time.time()
+        self.submitted = 0
+        self.states = states
+        self.requests = []
+
+    def _task_meta(self, task_id):
+        state = self.states.get(task_id, 'PENDING')
+        response = {'task_id': task_id, 'state': state}
+        if state == 'SUCCESS':
+            response['result'] = {'success': True, 'returncode': 0}
+        return response
+
+    def op_wait(self, request):
+        self.requests.append(request)
+        return super().op_wait(request)
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / 'dispatch.sock')
+    server = daemon.DispatchServer(path, daemon.RequestHandler)
+    server.dispatcher = FakeDispatcher({'done': 'SUCCESS'})
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(server.server_address)
+    client = DaemonClient(sock)
+    yield client
+    client.close()
+
+
+def test_ping(client):
+    response = client.request('ping')
+    assert response['ok'] is True
+    assert response['submitted'] == 0
+
+
+def test_wait_returns_finished_result(client):
+    response = client.request('wait', task_id='done', wait_timeout=5, timeout=10)
+    assert response['state'] == 'SUCCESS'
+    assert response['result']['returncode'] == 0
+
+
+def test_wait_timeout_is_sent_in_payload(client, server):
+    # 等待期限随请求发送给守护进程；timeout 只是本地套接字超时，不出现在请求中
+    started = time.monotonic()
+    with pytest.raises(DaemonError, match='TimeoutError'):
+        client.request('wait', task_id='pending', wait_timeout=0.3, timeout=10)
+
+    assert time.monotonic() - started < 5
+    request, = server.dispatcher.requests
+    assert request['wait_timeout'] == 0.3
+    assert 'timeout' not in request
+
+
+def test_errors_keep_the_connection_usable(client):
+    with pytest.raises(DaemonError, match='未知操作'):
+        client.request('nope')
+    with pytest.raises(DaemonError, match='KeyError'):
+        client.request('status')
+    assert client.request('status', task_id='done')['state'] == 'SUCCESS'
+
+
+def test_socket_timeout_bounds_the_client(client):
+    with pytest.raises(DaemonError, match='连接中断'):
+        client.request('wait', task_id='pending', wait_timeout=5, timeout=0.2)
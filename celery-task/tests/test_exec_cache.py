@@ -0,0 +1,59 @@
+"""执行缓存：按总字节数 LRU 淘汰，不缓存超大结果和本机 Blob 引用"""
+
+import pytest
+
+from celery_tasks import exec_cache
+
+
+def result(stdout='ok', **extra):
+    return {'success': True, 'returncode': 0, 'stdout': stdout, 'stderr': '', **extra}
+
+
+def total_bytes(client):
+    return int(client.get(exec_cache.CACHE_BYTES_KEY) or 0)
+
+
+def test_put_and_get(redis_client):
+    assert exec_cache.put('k', result('hello'), client=redis_client)
+    assert exec_cache.get('k', client=redis_client)['stdout'] == 'hello'
+    assert exec_cache.get('missing', client=redis_client) is None
+
+
+def test_skips_blob_refs_and_oversized_results(redis_client, monkeypatch):
+    blob = {'sha256': '0' * 64, 'size': 1, 'codec': 'gzip'}
+    assert not exec_cache.put('blob', result(stdout_blob=blob), client=redis_client)
+
+    monkeypatch.setattr(exec_cache, 'MAX_ENTRY_BYTES', 200)
+    assert not exec_cache.put('big', result('x' * 500), client=redis_client)
+    assert exec_cache.get('blob', client=redis_client) is None
+    assert exec_cache.get('big', client=redis_client) is None
+
+
+def test_evicts_least_recently_used_by_total_bytes(redis_client, monkeypatch):
+    entry_size = len(exec_cache.json.dumps(result('x' * 100)).encode('utf-8'))
+    monkeypatch.setattr(exec_cache, 'MAX_BYTES', entry_size * 3)
+
+    for key in ('a', 'b', 'c'):
+        exec_cache.put(key, result('x' * 100), client=redis_client)
+    # 访问 a 后 b 成为最久未访问的条目
+    exec_cache.get('a', client=redis_client)
+    exec_cache.put('d', result('x' * 100), client=redis_client)
+
+    assert not redis_client.exists(exec_cache.CACHE_KEY_PREFIX + 'b')
+    assert exec_cache.get('b', client=redis_client) is None
+    for key in ('a', 'c', 'd'):
+        assert exec_cache.get(key, client=redis_client) is not None
+    assert total_bytes(redis_client) == entry_size * 3
+
+
+def test_expired_entries_release_their_bytes(redis_client):
+    exec_cache.put('a', result(), client=redis_client)
+    exec_cache.put('a', result('longer output'), client=redis_client)
+    size = total_bytes(redis_client)
+    assert size == len(exec_cache.json.dumps(result('longer output')).encode('utf-8'))
+
+    # 条目过期后，下一次未命中的读取移除索引并扣减总字节数
+    redis_client.delete(exec_cache.CACHE_KEY_PREFIX + 'a')
+    assert exec_cache.get('a', client=redis_client) is None
+    assert total_bytes(redis_client) == 0
+    assert redis_client.zcard(exec_cache.CACHE_LRU_KEY) == 0
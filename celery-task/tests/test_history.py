@@ -0,0 +1,92 @@
+"""任务历史：查询条件、全文搜索、过期清理"""
+
+import time
+
+import pytest
+
+from celery_tasks import history
+
+
+@pytest.fixture
+def conn(tmp_path):
+    return history.connect(tmp_path / 'history.db')
+
+
+def record(conn, task_id, command, stdout='', returncode=0):
+    history.record_result(task_id, {
+        'command': command,
+        'success': returncode == 0,
+        'returncode': returncode,
+        'stdout': stdout,
+        'stderr': '',
+    }, conn=conn)
+
+
+def test_match_clauses_with_fts():
+    query, clauses, params = history.match_clauses('timeout "quoted" ab', fts=True)
+
+    # 不少于 3 个字符的词交给 FTS5（词内引号转义），更短的词使用 LIKE
+    assert query == '"timeout" """quoted"""'
+    assert len(clauses) == 1
+    assert params == ['%ab%'] * 3
+
+
+def test_match_clauses_without_fts_escapes_like_wildcards():
+    query, clauses, params = history.match_clauses('50% a_b', fts=False)
+
+    assert query is None
+    assert len(clauses) == 2
+    assert params == ['%50\\%%'] * 3 + ['%a\\_b%'] * 3
+
+
+def test_search_requires_every_term(conn):
+    record(conn, 't1', 'make build', stdout='Connection timeout while fetching')
+    record(conn, 't2', 'make test', stdout='timeout', returncode=2)
+    record(conn, 't3', 'python report.py', stdout='done')
+
+    found = history.search(match='TIMEOUT fetch', conn=conn)
+    assert [r['task_id'] for r in found] == ['t1']
+
+    found = history.search(match='make', statuses=['failed'], conn=conn)
+    assert [r['task_id'] for r in found] == ['t2']
+
+    # 含 LIKE 通配符的短词按字面匹配
+    record(conn, 't4', 'echo 1%', stdout='1%')
+    assert [r['task_id'] for r in history.search(match='1%', conn=conn)] == ['t4']
+
+
+def test_prune_deletes_in_batches(conn, monkeypatch):
+    monkeypatch.setattr(history, 'PRUNE_BATCH', 3)
+    for i in range(10):
+        record(conn, f'old-{i}', 'echo old', stdout='old output')
+    record(conn, 'new', 'echo new')
+    conn.execute("UPDATE tasks SET finished_at = 0 WHERE task_id LIKE 'old-%'")
+
+    assert history.prune(time.time() - 60, conn=conn) == 10
+    assert [r['task_id'] for r in history.search(conn=conn)] == ['new']
+    # 删除触发器保持全文索引同步
+    assert history.search(match='old output', conn=conn) == []
+
+
+def test_prune_expired_uses_retention_days(conn, monkeypatch):
+    record(conn, 'old', 'echo old')
+    record(conn, 'recent', 'echo recent')
+    conn.execute("UPDATE tasks SET finished_at = ? WHERE task_id = 'old'", (time.time() - 3 * 86400,))
+    conn.execute("UPDATE tasks SET finished_at = ? WHERE task_id = 'recent'", (time.time() - 86400,))
+
+    monkeypatch.setattr(history, 'HISTORY_DAYS', 0)
+    assert history.prune_expired(conn=conn) == 0
+    assert history.prune_expired(days=2, conn=conn) == 1
+    assert history.get_task('recent', conn=conn) is not None
+
+
+def test_prune_due_at_most_once_per_interval(monkeypatch):
+    monkeypatch.setattr(history, 'HISTORY_DAYS', 30)
+    monkeypatch.setattr(history, '_next_prune', 0.0)
+
+    assert history.prune_due(now=100.0)
+    assert not history.prune_due(now=100.0 + history.PRUNE_INTERVAL - 1)
+    assert history.prune_due(now=100.0 + history.PRUNE_INTERVAL)
+
+    monkeypatch.setattr(history, 'HISTORY_DAYS', 0)
+    assert not history.prune_due(now=1e12)
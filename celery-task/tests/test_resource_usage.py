@@ -0,0 +1,36 @@
+"""资源统计：wait4 取得子进程的资源占用，超时时终止并回收子进程"""
+
+import sys
+import time
+import subprocess
+
+import pytest
+
+from celery_tasks import resource_usage
+from celery_tasks.resource_usage import wait_with_usage
+
+pytestmark = pytest.mark.skipif(not resource_usage.HAS_WAIT4, reason='需要 os.wait4')
+
+
+def test_returns_exit_code_and_usage():
+    process = subprocess.Popen([sys.executable, '-c', 'import sys; sys.exit(4)'])
+
+    returncode, usage = wait_with_usage(process, timeout=30)
+
+    assert returncode == 4
+    assert process.returncode == 4
+    assert usage['max_rss_kb'] > 0
+    assert usage['cpu_user'] >= 0
+
+
+def test_timeout_kills_and_reaps_the_process():
+    process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+
+    started = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        wait_with_usage(process, timeout=0.5)
+
+    assert time.monotonic() - started < 10
+    # 已由 wait4 回收，Popen 不会再次 waitpid
+    assert process.returncode == -9
+    assert process.poll() == -9
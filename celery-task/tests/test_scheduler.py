@@ -0,0 +1,101 @@
+"""调度器：cron 下一次触发时间，领取/写回/租约到期的 Lua 脚本"""
+
+import json
+import time
+from datetime import datetime
+
+import pytest
+
+from celery_tasks.scheduler import (
+    CLAIM_SCRIPT, DUE_KEY, ENTRIES_KEY, INFLIGHT_KEY, REQUEUE_SCRIPT, RESCHEDULE_SCRIPT, TIMEZONE,
+    next_cron_time
+)
+
+
+@pytest.fixture
+def celery():
+    """next_cron_time 使用 celery 的 crontab 解析表达式"""
+    return pytest.importorskip('celery')
+
+
+def test_next_cron_time_every_quarter_hour(celery):
+    after = time.time()
+    due = next_cron_time('*/15 * * * *', after)
+
+    assert after < due <= after + 15 * 60
+    assert datetime.fromtimestamp(due, TIMEZONE).minute % 15 == 0
+    assert datetime.fromtimestamp(due, TIMEZONE).second == 0
+
+
+def test_next_cron_time_daily_uses_configured_timezone(celery):
+    after = time.time()
+    due = datetime.fromtimestamp(next_cron_time('30 8 * * *', after), TIMEZONE)
+
+    assert (due.hour, due.minute) == (8, 30)
+    assert 0 < due.timestamp() - after <= 24 * 3600
+
+
+def test_next_cron_time_rejects_invalid_expression(celery):
+    with pytest.raises(ValueError):
+        next_cron_time('61 * * * *')
+
+
+def add(client, entry_id, due):
+    client.hset(ENTRIES_KEY, entry_id, json.dumps({'id': entry_id, 'due': due}))
+    client.zadd(DUE_KEY, {entry_id: due})
+
+
+def test_claim_moves_due_entries_to_inflight(redis_client):
+    claim = redis_client.register_script(CLAIM_SCRIPT)
+    now = 1000.0
+    add(redis_client, 'early', now - 10)
+    add(redis_client, 'due', now)
+    add(redis_client, 'later', now + 10)
+    # 已取消的条目（描述已删除）只从 due 中移除
+    redis_client.zadd(DUE_KEY, {'cancelled': now - 5})
+
+    claimed = claim(keys=[DUE_KEY, INFLIGHT_KEY, ENTRIES_KEY], args=[now, now + 60, 500])
+
+    ids = [value.decode() for value in claimed[0::3]]
+    assert ids == ['early', 'due']
+    assert json.loads(claimed[1])['id'] == 'early'
+    assert float(claimed[2]) == now - 10
+    assert redis_client.zrange(DUE_KEY, 0, -1) == [b'later']
+    assert redis_client.zrange(INFLIGHT_KEY, 0, -1, withscores=True) == [
+        (b'due', now + 60), (b'early', now + 60)]
+
+
+def test_claim_respects_batch_size(redis_client):
+    claim = redis_client.register_script(CLAIM_SCRIPT)
+    for i in range(5):
+        add(redis_client, f'e{i}', i)
+
+    claimed = claim(keys=[DUE_KEY, INFLIGHT_KEY, ENTRIES_KEY], args=[100, 160, 2])
+
+    assert [value.decode() for value in claimed[0::3]] == ['e0', 'e1']
+    assert redis_client.zcard(DUE_KEY) == 3
+
+
+def test_reschedule_skips_cancelled_entries(redis_client):
+    reschedule = redis_client.register_script(RESCHEDULE_SCRIPT)
+    redis_client.hset(ENTRIES_KEY, 'cron', '{}')
+    redis_client.zadd(INFLIGHT_KEY, {'cron': 60, 'cancelled': 60})
+
+    count = reschedule(keys=[DUE_KEY, INFLIGHT_KEY, ENTRIES_KEY],
+                       args=['cron', 3600, 'cancelled', 3600])
+
+    assert count == 1
+    assert redis_client.zrange(DUE_KEY, 0, -1, withscores=True) == [(b'cron', 3600)]
+    assert redis_client.zcard(INFLIGHT_KEY) == 0
+
+
+def test_requeue_returns_expired_leases_to_due(redis_client):
+    requeue = redis_client.register_script(REQUEUE_SCRIPT)
+    redis_client.hset(ENTRIES_KEY, mapping={'expired': '{}', 'leased': '{}'})
+    redis_client.zadd(INFLIGHT_KEY, {'expired': 90, 'leased': 200, 'cancelled': 80})
+
+    count = requeue(keys=[INFLIGHT_KEY, DUE_KEY, ENTRIES_KEY], args=[100, 500])
+
+    assert count == 2
+    assert redis_client.zrange(DUE_KEY, 0, -1, withscores=True) == [(b'expired', 100)]
+    assert redis_client.zrange(INFLIGHT_KEY, 0, -1) == [b'leased']
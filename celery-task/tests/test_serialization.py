@@ -0,0 +1,55 @@
+"""结果序列化：各配置编码后可原样解码、缺少依赖时报告不可用"""
+
+import pytest
+
+from celery_tasks import serialization
+from celery_tasks.settings import SERIALIZATION_PROFILES
+
+RESULT = {
+    'status': 'success',
+    'returncode': 0,
+    'stdout': '输出 output\n' * 200,
+    'stderr': '',
+    'duration': 1.25,
+    'stdout_truncated': False,
+    'stdout_blob': None,
+}
+
+
+@pytest.mark.parametrize('profile', sorted(SERIALIZATION_PROFILES))
+def test_round_trip(profile):
+    reason = serialization.profile_unavailable(profile)
+    if reason:
+        pytest.skip(reason)
+
+    payload = serialization.encode(RESULT, profile)
+
+    assert isinstance(payload, bytes)
+    assert serialization.decode(payload, profile) == RESULT
+
+
+@pytest.mark.parametrize('profile', sorted(p for p, (_, c) in SERIALIZATION_PROFILES.items() if c))
+def test_compressed_profiles_shrink_repetitive_output(profile):
+    reason = serialization.profile_unavailable(profile)
+    if reason:
+        pytest.skip(reason)
+
+    fmt = SERIALIZATION_PROFILES[profile][0]
+    assert len(serialization.encode(RESULT, profile)) < len(serialization.encode(RESULT, fmt)) / 5
+
+
+def test_unserializable_values_become_text():
+    profile = 'json'
+    decoded = serialization.decode(serialization.encode({'raw': b'bytes', 'value': 1.5j}, profile), profile)
+
+    assert decoded == {'raw': 'bytes', 'value': '1.5j'}
+
+
+def test_missing_dependencies_are_reported(monkeypatch):
+    monkeypatch.setitem(serialization.REQUIREMENTS, 'orjson', (None, 'orjson'))
+    monkeypatch.setitem(serialization.REQUIREMENTS, 'lz4', (None, 'lz4'))
+
+    assert serialization.profile_unavailable('orjson+lz4') == 'orjson+lz4 需要安装 orjson, lz4'
+    assert serialization.profile_unavailable('orjson') == 'orjson 需要安装 orjson'
+    assert serialization.profile_unavailable('json+gzip') is None
+    assert serialization.profile_unavailable('bson') == '未知的序列化配置: bson'
@@ -0,0 +1,80 @@
+"""单飞去重：租约只有一个 leader，follower 等到 leader 的结果或在租约消失后接管"""
+
+import threading
+
+import pytest
+
+from celery_tasks import singleflight
+from celery_tasks.singleflight import LEASE_KEY_PREFIX, SingleFlight
+
+RESULT = {'success': True, 'returncode': 0, 'stdout': '输出', 'stderr': ''}
+
+
+@pytest.fixture(autouse=True)
+def fast_poll(monkeypatch):
+    monkeypatch.setattr(singleflight, 'POLL_INTERVAL', 0.05)
+
+
+def lease_holder(client, fingerprint='fp'):
+    holder = client.get(LEASE_KEY_PREFIX + fingerprint)
+    return holder.decode() if holder else None
+
+
+def test_first_task_takes_the_lease(redis_client):
+    leader = SingleFlight('fp', 'task-a', client=redis_client)
+    follower = SingleFlight('fp', 'task-b', client=redis_client)
+    try:
+        assert leader.join(timeout=1) is None
+        assert leader.is_leader
+        assert lease_holder(redis_client) == 'task-a'
+        assert 0 < redis_client.ttl(LEASE_KEY_PREFIX + 'fp') <= singleflight.LEASE_TTL
+
+        # leader 一直未完成：follower 等待超时后返回 None，但不成为 leader
+        assert follower.join(timeout=0.2) is None
+        assert not follower.is_leader
+        assert follower.leader_task_id == 'task-a'
+    finally:
+        leader.complete(RESULT)
+
+
+def test_follower_receives_leader_result(redis_client):
+    leader = SingleFlight('fp', 'task-a', client=redis_client)
+    follower = SingleFlight('fp', 'task-b', client=redis_client)
+    assert leader.join(timeout=1) is None
+
+    received = {}
+    thread = threading.Thread(target=lambda: received.update(result=follower.join(timeout=5)))
+    thread.start()
+    leader.complete(RESULT)
+    thread.join(5)
+
+    assert received['result'] == RESULT
+    assert not follower.is_leader
+    assert lease_holder(redis_client) is None
+
+
+def test_follower_takes_over_when_lease_disappears(redis_client):
+    # 租约属于已退出的 leader，且没有结果
+    redis_client.set(LEASE_KEY_PREFIX + 'fp', 'task-dead', ex=30)
+    follower = SingleFlight('fp', 'task-b', client=redis_client)
+
+    timer = threading.Timer(0.2, redis_client.delete, args=[LEASE_KEY_PREFIX + 'fp'])
+    timer.start()
+    try:
+        assert follower.join(timeout=5) is None
+        assert follower.is_leader
+        assert lease_holder(redis_client) == 'task-b'
+    finally:
+        timer.join()
+        follower.complete(RESULT)
+
+
+def test_complete_keeps_a_lease_taken_over_by_another_task(redis_client):
+    leader = SingleFlight('fp', 'task-a', client=redis_client)
+    assert leader.join(timeout=1) is None
+    redis_client.set(LEASE_KEY_PREFIX + 'fp', 'task-b', ex=30)
+
+    leader.complete(RESULT)
+
+    assert lease_holder(redis_client) == 'task-b'
+    assert redis_client.get(singleflight.RESULT_KEY_PREFIX + 'task-a')
@@ -0,0 +1,21 @@
+"""Worker 进程守护：CPU 绑定限制在可用核心内"""
+
+import os
+
+import pytest
+
+from celery_tasks.supervisor import available_cpus
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'sched_getaffinity'), reason='平台不支持 CPU 亲和性')
+
+
+def test_available_cpus():
+    allowed = os.sched_getaffinity(0)
+    missing = max(allowed) + 1000
+
+    assert available_cpus(None) is None
+    assert available_cpus(set()) is None
+    assert available_cpus(set(allowed)) == allowed
+    assert available_cpus({min(allowed), missing}) == {min(allowed)}
+    # 配置的核心全部不可用时不绑定
+    assert available_cpus({missing}) is None
@@ -0,0 +1,125 @@
+"""预热解释器池：哪些命令进入预热池，以及 Worker ↔ zygote 的 fork 往返"""
+
+import os
+import sys
+import stat
+import time
+import subprocess
+
+import pytest
+
+from celery_tasks import warm_pool
+from celery_tasks.warm_pool import SOCKET_ENV, run_warm, warm_argv
+
+PYTHON = sys.executable
+
+
+@pytest.mark.parametrize('command, expected', [
+    ([PYTHON, 'script.py', 'a b'], ['script.py', 'a b']),
+    ([PYTHON, '-m', 'package.module', '--flag'], ['-m', 'package.module', '--flag']),
+    (f'"{PYTHON}" script.py --name "x y"', ['script.py', '--name', 'x y']),
+])
+def test_warm_argv_accepts_skill_python(command, expected):
+    if not os.path.basename(PYTHON).startswith('python'):
+        pytest.skip('解释器文件名不以 python 开头')
+    assert warm_argv(command) == expected
+
+
+@pytest.mark.parametrize('command', [
+    [PYTHON],
+    [PYTHON, '-m'],
+    [PYTHON, '-u', 'script.py'],
+    [PYTHON, '-c', 'print(1)'],
+    ['ls', '-la'],
+    [os.path.join(os.path.dirname(PYTHON), 'python-missing'), 'script.py'],
+])
+def test_warm_argv_rejects_other_commands(command):
+    assert warm_argv(command) is None
+
+
+def test_warm_argv_rejects_python_outside_the_skill_venv(tmp_path):
+    other = tmp_path / 'python3'
+    other.write_text('#!/bin/sh\n')
+    other.chmod(0o755)
+
+    assert warm_argv([str(other), 'script.py']) is None
+    assert warm_argv('python3 script.py', env={'PATH': str(tmp_path)}) is None
+
+
+@pytest.fixture
+def zygote(monkeypatch):
+    if not warm_pool.HAS_WARM_POOL:
+        pytest.skip('当前平台不支持预热池')
+    # start_zygote 写入的 Socket 路径在测试结束后移除
+    monkeypatch.delenv(SOCKET_ENV, raising=False)
+    path = warm_pool.start_zygote(preload=[])
+    try:
+        deadline = time.monotonic() + 10
+        while not os.path.exists(path):
+            assert time.monotonic() < deadline, 'zygote 未能启动'
+            time.sleep(0.05)
+        yield path
+    finally:
+        warm_pool.stop_zygote()
+    assert not os.path.exists(os.path.dirname(path))
+
+
+def test_socket_is_private(zygote):
+    assert stat.S_IMODE(os.stat(os.path.dirname(zygote)).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(zygote).st_mode) & 0o077 == 0
+
+
+def test_round_trip(zygote, tmp_path):
+    script = tmp_path / 'script.py'
+    script.write_text(
+        'import os, sys\n'
+        'print("argv", sys.argv[1:], os.getcwd() == os.environ["EXPECTED_CWD"])\n'
+        'print("socket", os.environ.get("CELERY_TASK_WARM_SOCKET"))\n'
+        'print("错误输出", file=sys.stderr)\n'
+        'sys.exit(3)\n',
+        encoding='utf-8',
+    )
+    env = {k: v for k, v in os.environ.items() if k != SOCKET_ENV}
+    env.update(EXPECTED_CWD=str(tmp_path), PYTHONIOENCODING='utf-8')
+
+    result = run_warm(['script.py', 'a b'], cwd=str(tmp_path), env=env)
+
+    assert result['returncode'] == 3
+    assert result['stdout'] == "argv ['a b'] True\nsocket None\n"
+    assert result['stderr'] == '错误输出\n'
+    assert result['resources']['max_rss_kb'] > 0
+
+
+def test_run_module(zygote, tmp_path):
+    result = run_warm(['-m', 'json.tool'], cwd=str(tmp_path))
+
+    assert result['returncode'] == 1
+    assert 'Expecting value' in result['stderr']
+
+
+def test_timeout_kills_script_and_keeps_partial_output(zygote, tmp_path):
+    script = tmp_path / 'slow.py'
+    script.write_text(
+        'import subprocess, sys, time\n'
+        'print("partial", flush=True)\n'
+        'subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])\n'
+        'time.sleep(60)\n',
+        encoding='utf-8',
+    )
+
+    started = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired) as excinfo:
+        run_warm(['slow.py'], cwd=str(tmp_path), timeout=1)
+
+    # 进程组被终止：脚本启动的子进程不会让读取线程一直等待
+    assert time.monotonic() - started < warm_pool.READER_JOIN_TIMEOUT
+    assert excinfo.value.output == b'partial\n'
+
+
+def test_unavailable_without_zygote(tmp_path, monkeypatch):
+    monkeypatch.delenv(SOCKET_ENV, raising=False)
+
+    with pytest.raises(warm_pool.WarmPoolUnavailable):
+        run_warm(['script.py'])
+    with pytest.raises(warm_pool.WarmPoolUnavailable):
+        run_warm(['script.py'], socket_path=str(tmp_path / 'missing.sock'))
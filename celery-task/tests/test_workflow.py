@@ -0,0 +1,88 @@
+"""工作流依赖图的串并联分解"""
+
+import json
+
+import pytest
+
+from celery_tasks.workflow import (
+    describe_plan, extra_waits, load_workflow, plan_workflow, topological_order
+)
+
+
+def make_nodes(**needs):
+    """make_nodes(a=[], b=['a']) → {名称: {'command': ..., 'needs': [...]}}"""
+    return {name: {'command': f'echo {name}', 'needs': list(deps)} for name, deps in needs.items()}
+
+
+def test_diamond_is_chain_of_group():
+    nodes = make_nodes(fetch=[], a=['fetch'], b=['fetch'], report=['a', 'b'])
+    tree, waits = plan_workflow(nodes)
+
+    assert tree == ('chain', [
+        ('node', 'fetch'),
+        ('group', [('node', 'a'), ('node', 'b')]),
+        ('node', 'report'),
+    ])
+    assert describe_plan(tree) == '(fetch → [a | b] → report)'
+    assert waits == {'fetch': set(), 'a': {'fetch'}, 'b': {'fetch'}, 'report': {'fetch', 'a', 'b'}}
+    assert extra_waits(nodes, waits) == {}
+
+
+def test_independent_branches_run_in_parallel():
+    nodes = make_nodes(a=[], b=['a'], c=[], d=['c'])
+    tree, waits = plan_workflow(nodes)
+
+    assert tree == ('group', [
+        ('chain', [('node', 'a'), ('node', 'b')]),
+        ('chain', [('node', 'c'), ('node', 'd')]),
+    ])
+    assert waits['d'] == {'c'}
+    assert extra_waits(nodes, waits) == {}
+
+
+def test_non_series_parallel_graph_reports_extra_waits():
+    # N 形依赖无法精确分解：按层切分后 c 多等待了 b
+    nodes = make_nodes(a=[], b=[], c=['a'], d=['a', 'b'])
+    tree, waits = plan_workflow(nodes)
+
+    assert describe_plan(tree) == '([a | b] → [c | d])'
+    assert extra_waits(nodes, waits) == {'c': ['b']}
+
+
+def test_every_node_waits_for_its_declared_needs():
+    nodes = make_nodes(a=[], b=['a'], c=['a'], d=['b'], e=['b', 'c'], f=['d', 'e'], g=[])
+    tree, waits = plan_workflow(nodes)
+
+    for name, node in nodes.items():
+        assert set(node['needs']) <= waits[name]
+    assert sorted(waits) == sorted(nodes)
+
+
+def test_cycle_is_rejected():
+    with pytest.raises(ValueError, match='环'):
+        topological_order(make_nodes(a=['c'], b=['a'], c=['b']))
+
+
+def test_load_workflow_applies_defaults_and_validates(tmp_path):
+    path = tmp_path / 'build.json'
+    path.write_text(json.dumps({
+        'defaults': {'timeout': 60},
+        'nodes': {
+            'fetch': {'command': 'echo fetch'},
+            'report': {'command': 'echo report', 'needs': 'fetch', 'timeout': 5},
+        },
+    }), encoding='utf-8')
+
+    workflow = load_workflow(path)
+    assert workflow['name'] == 'build'
+    assert workflow['nodes']['fetch'] == {'timeout': 60, 'command': 'echo fetch', 'needs': []}
+    assert workflow['nodes']['report']['needs'] == ['fetch']
+    assert workflow['nodes']['report']['timeout'] == 5
+
+    path.write_text(json.dumps({'nodes': {'a': {'command': 'x', 'needs': ['missing']}}}))
+    with pytest.raises(ValueError, match='missing'):
+        load_workflow(path)
+
+    path.write_text(json.dumps({'nodes': {'a': {'command': 'x', 'retries': 3}}}))
+    with pytest.raises(ValueError, match='retries'):
+        load_workflow(path)